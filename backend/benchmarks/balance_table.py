@@ -0,0 +1,82 @@
+"""Dict-loop vs columnar portfolio aggregation.
+
+Run with ``python -m benchmarks.balance_table`` from ``backend/``.
+"""
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.services.balance_table import BalanceTable
+
+
+def _loop_aggregates(balances: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The asset tracker's original per-request loops, the baseline being compared against"""
+    total_value = sum(balance.get("balance_usd", 0) for balance in balances if balance.get("balance_usd"))
+    asset_allocation: Dict[str, float] = {}
+    network_distribution: Dict[str, float] = {}
+    for balance in balances:
+        usd_value = balance.get("balance_usd", 0)
+        if usd_value > 0:
+            symbol = balance.get("token_symbol", "UNKNOWN")
+            network = balance.get("network", "unknown")
+            asset_allocation[symbol] = asset_allocation.get(symbol, 0) + usd_value
+            network_distribution[network] = network_distribution.get(network, 0) + usd_value
+    return {"total": total_value, "by_symbol": asset_allocation, "by_network": network_distribution}
+
+
+def _random_balances(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    networks = ["ethereum", "polygon", "bsc", "arbitrum", "optimism", "solana", "bitcoin"]
+    symbols = [f"TOKEN{i}" for i in range(500)]
+    balances = []
+    for _ in range(count):
+        amount = rng.random() * 100
+        price = rng.random() * 50
+        balances.append({
+            "network": rng.choice(networks),
+            "token_symbol": rng.choice(symbols),
+            "balance": amount,
+            "balance_usd": amount * price,
+        })
+    return balances
+
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000), repeat: int = 3) -> List[Dict[str, Any]]:
+    """Compare the dict loops with columnar aggregation at several sizes"""
+    def best_of(fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    results = []
+    for size in sizes:
+        balances = _random_balances(size)
+        build = best_of(lambda: BalanceTable.from_balances(balances, keep_extras=False))
+        table = BalanceTable.from_balances(balances, keep_extras=False)
+        loops = best_of(lambda: _loop_aggregates(balances))
+        columnar = best_of(lambda: (table.total_usd(), table.by_symbol(), table.by_network()))
+
+        expected = _loop_aggregates(balances)
+        if not np.isclose(expected["total"], table.total_usd()):
+            raise RuntimeError(f"Columnar total {table.total_usd()} disagrees with loop total {expected['total']}")
+
+        results.append({
+            "positions": size,
+            "loop_ms": round(loops * 1000, 2),
+            "columnar_ms": round(columnar * 1000, 2),
+            "build_ms": round(build * 1000, 2),
+            "speedup": round(loops / columnar, 1) if columnar else None,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'positions':>10} {'loop ms':>10} {'columnar ms':>12} {'build ms':>10} {'speedup':>8}")
+    for result in benchmark():
+        print(f"{result['positions']:>10} {result['loop_ms']:>10} {result['columnar_ms']:>12} "
+              f"{result['build_ms']:>10} {result['speedup']:>7}x")
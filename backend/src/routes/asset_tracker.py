@@ -1,116 +1,158 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+import asyncio
+import inspect
+import json
 import logging
+import time
+
+from ..services.balance_history import BalanceHistoryStore
+from ..services.balance_table import BalanceTable
+from ..services.conditional_get import check_not_modified
+from ..services.fanout import bounded_gather
+from ..services.portfolio_aggregates import PortfolioAggregates
+from ..services.snapshot_cache import get_wallet_snapshot
+from ..services.transaction_store import TransactionFlowStats, TransactionStore, decode_cursor
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 wallet_manager_service = None
+portfolio_aggregates = PortfolioAggregates()
+transaction_store = TransactionStore()
+balance_history = BalanceHistoryStore()
 
 def set_wallet_manager_service(service):
-    global wallet_manager_service
+    global wallet_manager_service, portfolio_aggregates, transaction_store
     wallet_manager_service = service
+    portfolio_aggregates = PortfolioAggregates()
+    transaction_store = TransactionStore()
+
+async def _get_wallet_status() -> Dict[str, Any]:
+    """Read the shared wallet snapshot and fold new balances and transactions into the indexes"""
+    snapshot = get_wallet_snapshot(wallet_manager_service)
+    status = await snapshot.get()
+    balances = status.get("balances", [])
+    # Keyed on the snapshot version, so a cache hit costs nothing here
+    if portfolio_aggregates.sync(balances, version=snapshot.version):
+        # Written in a worker thread; a bad position or disk error never fails the request
+        balance_history.record_balances_later(status.get("wallet_address", ""), balances)
+    transaction_store.ingest(status.get("recent_transactions", []), version=snapshot.version)
+    return status
 
 @router.get("/balances", summary="💰 Get Asset Balances")
-async def get_asset_balances():
-    """Get all asset balances across networks"""
+async def get_asset_balances(request: Request, response: Response):
+    """Get all asset balances across networks (ETag / If-None-Match aware)"""
     try:
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
             
-        status = await wallet_manager_service.get_wallet_status()
+        status = await _get_wallet_status()
+        not_modified = check_not_modified(request, response, "asset-balances", get_wallet_snapshot(wallet_manager_service).etag)
+        if not_modified:
+            return not_modified
         balances = status.get("balances", [])
         
-        # Calculate total USD value
-        total_usd = sum(balance.get("balance_usd", 0) for balance in balances if balance.get("balance_usd"))
-        
-        # Group by network
-        by_network = {}
-        for balance in balances:
-            network = balance.get("network", "unknown")
-            if network not in by_network:
-                by_network[network] = []
-            by_network[network].append(balance)
-            
         return {
             "balances": balances,
-            "total_usd_value": total_usd,
-            "by_network": by_network,
-            "networks": list(by_network.keys()),
-            "total_assets": len(balances)
+            "total_usd_value": portfolio_aggregates.total_usd_value,
+            "by_network": portfolio_aggregates.by_network(),
+            "networks": portfolio_aggregates.networks,
+            "total_assets": portfolio_aggregates.asset_count
         }
         
     except Exception as e:
         logger.error(f"Error getting asset balances: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get asset balances: {e}")
 
+NDJSON_PAGE_SIZE = 500
+DEFAULT_TRANSACTION_LIMIT = 50
+# Largest page a request may ask for; /movements shares it
+MAX_TRANSACTION_LIMIT = 500
+
 @router.get("/transactions", summary="📊 Get Transaction History")
-async def get_transaction_history(limit: int = 50):
-    """Get recent transaction history"""
+async def get_transaction_history(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_TRANSACTION_LIMIT),
+    after: Optional[str] = None,
+    format: str = "json"
+):
+    """Get transaction history, newest first.
+
+    Returns at most ``limit`` transactions (default 50). Pass the returned
+    ``next_cursor`` as ``after`` to fetch the next page. With
+    ``format=ndjson`` the history is streamed one transaction per line,
+    followed by a final stats line; without a ``limit`` it streams
+    everything.
+    """
     try:
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+        if format not in ("json", "ndjson"):
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+        if after:
+            try:
+                decode_cursor(after)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
-        status = await wallet_manager_service.get_wallet_status()
-        transactions = status.get("recent_transactions", [])
+        await _get_wallet_status()
+        
+        if format == "ndjson":
+            return StreamingResponse(
+                _stream_transactions(transaction_store, after, limit),
+                media_type="application/x-ndjson"
+            )
         
-        # Limit results
-        limited_transactions = transactions[:limit]
+        page, next_cursor = transaction_store.page(after, limit or DEFAULT_TRANSACTION_LIMIT)
         
-        # Calculate transaction stats
-        total_sent = sum(tx.get("value", 0) for tx in limited_transactions if tx.get("transaction_type") == "send")
-        total_received = sum(tx.get("value", 0) for tx in limited_transactions if tx.get("transaction_type") == "receive")
+        # Calculate transaction stats in the same pass as the page walk
+        stats = TransactionFlowStats()
+        for tx in page:
+            stats.add(tx)
         
         return {
-            "transactions": limited_transactions,
-            "count": len(limited_transactions),
-            "stats": {
-                "total_sent": total_sent,
-                "total_received": total_received,
-                "net_flow": total_received - total_sent
-            }
+            "transactions": page,
+            "count": stats.count,
+            "stats": stats.as_dict(),
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting transaction history: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get transaction history: {e}")
 
+async def _stream_transactions(store: TransactionStore, after: Optional[str], limit: Optional[int]):
+    """Yield NDJSON lines page by page so a full export never sits in memory"""
+    stats = TransactionFlowStats()
+    next_cursor = after
+    for page, next_cursor in store.iter_pages(after, NDJSON_PAGE_SIZE, limit):
+        for tx in page:
+            stats.add(tx)
+            yield json.dumps(tx, default=str) + "\n"
+    yield json.dumps({"count": stats.count, "stats": stats.as_dict(), "next_cursor": next_cursor}) + "\n"
+
 @router.get("/portfolio", summary="📈 Get Portfolio Overview")
-async def get_portfolio_overview():
-    """Get comprehensive portfolio overview"""
+async def get_portfolio_overview(request: Request, response: Response):
+    """Get comprehensive portfolio overview (ETag / If-None-Match aware)"""
     try:
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
             
-        status = await wallet_manager_service.get_wallet_status()
-        balances = status.get("balances", [])
+        status = await _get_wallet_status()
+        not_modified = check_not_modified(request, response, "asset-portfolio", get_wallet_snapshot(wallet_manager_service).etag)
+        if not_modified:
+            return not_modified
         transactions = status.get("recent_transactions", [])
         
-        # Calculate portfolio metrics
-        total_value = sum(balance.get("balance_usd", 0) for balance in balances if balance.get("balance_usd"))
-        
-        # Asset allocation
-        asset_allocation = {}
-        for balance in balances:
-            symbol = balance.get("token_symbol", "UNKNOWN")
-            usd_value = balance.get("balance_usd", 0)
-            if usd_value > 0:
-                asset_allocation[symbol] = asset_allocation.get(symbol, 0) + usd_value
-                
-        # Network distribution
-        network_distribution = {}
-        for balance in balances:
-            network = balance.get("network", "unknown")
-            usd_value = balance.get("balance_usd", 0)
-            if usd_value > 0:
-                network_distribution[network] = network_distribution.get(network, 0) + usd_value
-                
         return {
-            "total_portfolio_value": total_value,
-            "asset_count": len(balances),
-            "network_count": len(set(b.get("network") for b in balances)),
-            "asset_allocation": asset_allocation,
-            "network_distribution": network_distribution,
+            "total_portfolio_value": portfolio_aggregates.total_usd_value,
+            "asset_count": portfolio_aggregates.asset_count,
+            "network_count": portfolio_aggregates.network_count,
+            "asset_allocation": portfolio_aggregates.asset_allocation,
+            "network_distribution": portfolio_aggregates.network_distribution,
             "recent_activity": len(transactions),
             "wallet_address": status.get("wallet_address"),
             "is_connected": status.get("is_connected", False)
@@ -120,28 +162,188 @@ async def get_portfolio_overview():
         logger.error(f"Error getting portfolio overview: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get portfolio overview: {e}")
 
-@router.get("/movements", summary="📊 Get Asset Movements")
-async def get_asset_movements(hours: int = 24):
-    """Get asset movements and changes over time period"""
+MAX_BATCH_WALLETS = 100
+MAX_BATCH_CONCURRENCY = 32
+MAX_BATCH_TIMEOUT_SECONDS = 60.0
+
+def _accepts_wallet_address(method) -> bool:
+    try:
+        parameters = inspect.signature(method).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == "wallet_address" or p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+async def _fetch_wallet_status(address: str) -> Dict[str, Any]:
+    if _accepts_wallet_address(wallet_manager_service.get_wallet_status):
+        return await wallet_manager_service.get_wallet_status(wallet_address=address)
+    # Single-wallet services can only report the wallet they manage
+    status = await get_wallet_snapshot(wallet_manager_service).get()
+    managed = str(status.get("wallet_address") or "")
+    if address.lower() != managed.lower():
+        raise ValueError(f"Wallet manager only tracks {managed or 'its own wallet'}")
+    return status
+
+@router.post("/portfolio/batch", summary="📚 Get Multi-Wallet Portfolio")
+async def get_batch_portfolio(
+    wallet_addresses: List[str],
+    concurrency: int = Query(8, ge=1, le=MAX_BATCH_CONCURRENCY),
+    timeout: float = Query(10.0, gt=0, le=MAX_BATCH_TIMEOUT_SECONDS),
+):
+    """Get portfolio overviews for many wallets plus combined aggregates.
+
+    Wallet statuses are fetched concurrently (at most ``concurrency`` at a
+    time, each bounded by ``timeout`` seconds). Wallets that fail or time out
+    are reported individually instead of failing the whole request. A
+    wallet service without per-address lookup can only report its own
+    wallet; other addresses come back as per-wallet errors.
+    """
     try:
-        # This would typically track balance changes over time
-        # For now, return current status
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+        if not wallet_addresses:
+            raise HTTPException(status_code=400, detail="No wallet addresses given")
+        if len(wallet_addresses) > MAX_BATCH_WALLETS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_WALLETS} wallets per batch")
             
-        status = await wallet_manager_service.get_wallet_status()
-        transactions = status.get("recent_transactions", [])
+        outcomes = await bounded_gather(
+            wallet_addresses,
+            _fetch_wallet_status,
+            concurrency=concurrency,
+            timeout=timeout
+        )
+        
+        wallets = {}
+        tables = []
+        for address, outcome in outcomes.items():
+            if outcome["status"] != "ok":
+                wallets[address] = outcome
+                continue
+            status = outcome["result"] or {}
+            table = BalanceTable.from_balances(status.get("balances", []), keep_extras=False)
+            tables.append(table)
+            wallets[address] = {
+                "status": "ok",
+                "total_portfolio_value": table.total_usd(),
+                "asset_count": len(table),
+                "network_count": len(table.networks),
+                "asset_allocation": table.by_symbol(),
+                "network_distribution": table.by_network(),
+                "recent_activity": len(status.get("recent_transactions", [])),
+                "is_connected": status.get("is_connected", False),
+                "elapsed_ms": outcome["elapsed_ms"]
+            }
+            
+        combined = BalanceTable.concat(tables)
+        failed = [address for address, wallet in wallets.items() if wallet["status"] != "ok"]
+        
+        return {
+            "wallets": wallets,
+            "combined": {
+                "total_portfolio_value": combined.total_usd(),
+                "asset_count": len(combined),
+                "network_count": len(combined.networks),
+                "asset_allocation": combined.by_symbol(),
+                "network_distribution": combined.by_network()
+            },
+            "wallet_count": len(wallets),
+            "succeeded": len(wallets) - len(failed),
+            "failed": failed,
+            "partial": bool(failed)
+        }
         
-        # Filter transactions by time period (simplified)
-        recent_transactions = transactions[:10]  # Last 10 transactions as proxy
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting batch portfolio: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get batch portfolio: {e}")
+
+MAX_MOVEMENT_HOURS = 24 * 30
+MAX_MOVEMENT_LIMIT = MAX_TRANSACTION_LIMIT
+
+@router.get("/movements", summary="📊 Get Asset Movements")
+async def get_asset_movements(
+    hours: int = Query(24, ge=1, le=MAX_MOVEMENT_HOURS),
+    limit: int = Query(100, ge=1, le=MAX_MOVEMENT_LIMIT),
+    after: Optional[str] = None
+):
+    """Get asset movements over the last ``hours``, newest first.
+
+    Returns at most ``limit`` movements; pass the returned ``next_cursor`` as
+    ``after`` to fetch the next page of the same window.
+    """
+    try:
+        # Balance changes over time are served by /history
+        if not wallet_manager_service:
+            raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+        if after:
+            try:
+                decode_cursor(after)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+        await _get_wallet_status()
+        movements, next_cursor = transaction_store.page(after, limit, since=time.time() - hours * 3600)
         
         return {
             "time_period_hours": hours,
-            "movements": recent_transactions,
-            "movement_count": len(recent_transactions),
+            "movements": movements,
+            "movement_count": len(movements),
+            "next_cursor": next_cursor,
             "message": f"Asset movements for last {hours} hours"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting asset movements: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get asset movements: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get asset movements: {e}")
+
+@router.get("/history", summary="📉 Get Balance History")
+async def get_balance_history(
+    network: str,
+    token: str,
+    wallet: Optional[str] = None,
+    hours: float = 24,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+):
+    """Get value over time for one position.
+
+    ``start``/``end`` are epoch seconds (default: the last ``hours``). Short
+    ranges come from raw points, longer ones from 1-minute or 1-hour rollups.
+    """
+    try:
+        if not wallet_manager_service:
+            raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+            
+        if wallet is None:
+            status = await _get_wallet_status()
+            wallet = status.get("wallet_address", "")
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - hours * 3600
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+            
+        # Waits for any in-progress history write, so keep it off the event loop
+        return await asyncio.to_thread(balance_history.query, wallet, network, token, start, end)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting balance history: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get balance history: {e}")
+
+@router.get("/history/series", summary="🗂️ List Balance History Series")
+async def list_balance_history_series():
+    """List every (wallet, network, token) with recorded history"""
+    try:
+        # Reads one metadata file per series, so keep it off the event loop
+        series = await asyncio.to_thread(balance_history.series)
+        return {
+            "series": series,
+            "count": len(series)
+        }
+        
+    except Exception as e:
+        logger.error(f"Error listing balance history: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to list balance history: {e}")
\ No newline at end of file
@@ -1,22 +1,62 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, Optional, Set
+import asyncio
 import logging
+import time
 
 from ..services.automation_engine import AutomationEngine
+from ..services.cancel_scope import DEFAULT_STOP_DEADLINE_SECONDS, MAX_STOP_DEADLINE_SECONDS, SpawnsInScope, root_scope
+from ..services.health_probes import health_prober
+from ..services.job_scheduler import JobScheduler
+from ..services.profit_ledger import HOUR, DAY, RecordsOwnProfits, profit_ledger
+from ..services.status_aggregator import EngineStatusCollector
+from ..services.status_stream import status_broadcaster
+from ..services.transfer_batcher import QueuesTransfers, transfer_batcher
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # Global automation engine instance (will be injected from main.py)
 automation_engine: AutomationEngine = None
+status_collector: Optional[EngineStatusCollector] = None
+# Longest report window; far larger values overflow the timestamp conversion
+MAX_REPORT_HOURS = 24 * 366 * 10
+# Epoch seconds of 3000-01-01, well inside what datetime accepts
+MAX_TIMESTAMP = 32503680000.0
+
+# Background operations run as tracked jobs; each job type runs at most once at a time
+job_scheduler = JobScheduler(max_concurrent=4, scope=root_scope.child("jobs"))
 
 def set_automation_engine(engine: AutomationEngine):
     """Set the automation engine instance"""
-    global automation_engine
+    global automation_engine, status_collector
     automation_engine = engine
+    status_collector = EngineStatusCollector(engine) if engine else None
+    # The engine lives outside this tree; it opts into each shared service by implementing its protocol
+    if isinstance(engine, RecordsOwnProfits):
+        # Its strategy payouts are only visible inside it, so it appends them to the shared ledger
+        engine.profit_ledger = profit_ledger
+    if isinstance(engine, SpawnsInScope):
+        # Engine subsystems spawn their loops in child scopes of the root
+        engine.task_scope = root_scope
+    if isinstance(engine, QueuesTransfers):
+        # Route the engine's per-source transfers through the shared batcher
+        engine.transfer_batcher = transfer_batcher
+    if status_collector:
+        status_broadcaster.add_source("automation", status_collector.get_status)
+    else:
+        status_broadcaster.remove_source("automation")
+
+def _job_response(job, created: bool) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "job_status": job.status,
+        "deduplicated": not created
+    }
 
 @router.post("/start", summary="🚀 START ALL OPERATIONS - THE MAGIC BUTTON!")
-async def start_all_operations(background_tasks: BackgroundTasks):
+async def start_all_operations():
     """
     🎯 THE MAGIC BUTTON - Start all profit-generating operations!
     
@@ -34,12 +74,13 @@ async def start_all_operations(background_tasks: BackgroundTasks):
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
         # Start all operations in background
-        background_tasks.add_task(automation_engine.start_all_operations)
+        job, created = job_scheduler.submit("start_all_operations", automation_engine.start_all_operations, priority=10)
         
         return {
             "message": "🚀 ALL SYSTEMS ACTIVATED! JAG-OPS is now generating profits!",
             "status": "success",
-            "operations_starting": True
+            "operations_starting": True,
+            **_job_response(job, created)
         }
         
     except Exception as e:
@@ -64,64 +105,162 @@ async def stop_all_operations():
         logger.error(f"Error stopping operations: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to stop operations: {e}")
 
+# Engine stops that overran their deadline; kept referenced until they finish
+_abandoned: Set[asyncio.Task] = set()
+
+def _abandoned_done(task: asyncio.Task):
+    _abandoned.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Abandoned engine emergency stop failed: {task.exception()}")
+
 @router.post("/emergency-stop", summary="🚨 Emergency Stop")
-async def emergency_stop():
-    """Emergency stop all operations immediately"""
+async def emergency_stop(deadline: float = Query(DEFAULT_STOP_DEADLINE_SECONDS, gt=0, le=MAX_STOP_DEADLINE_SECONDS)):
+    """Emergency stop all operations within ``deadline`` seconds.
+
+    Cancels every task in the root task scope (jobs and subsystem loops)
+    while the engine runs its own shutdown. Whatever is still running at the
+    deadline is killed where possible, abandoned, and listed under
+    ``overran``.
+    """
     try:
         if not automation_engine:
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
-        await automation_engine.emergency_stop()
+        async def stop_engine():
+            task = asyncio.ensure_future(automation_engine.emergency_stop())
+            # Unlike wait_for, this returns at the deadline even if the engine swallows cancellation
+            done, _ = await asyncio.wait({task}, timeout=deadline)
+            if done:
+                task.result()
+                return None
+            task.cancel()
+            _abandoned.add(task)
+            task.add_done_callback(_abandoned_done)
+            return {"scope": "engine", "task": "emergency_stop", "running_seconds": deadline, "killed": False}
+
+        job_scheduler.cancel_all()
+        report, engine_overrun = await asyncio.gather(root_scope.cancel(deadline), stop_engine())
+        if engine_overrun:
+            report["overran"].append(engine_overrun)
+            report["within_deadline"] = False
         
         return {
             "message": "🚨 Emergency stop activated - All operations halted",
-            "status": "emergency_stopped"
+            "status": "emergency_stopped" if report["within_deadline"] else "emergency_stopped_with_overruns",
+            "stop": report
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during emergency stop: {e}")
         raise HTTPException(status_code=500, detail=f"Emergency stop failed: {e}")
 
 @router.get("/status", summary="📊 Get System Status")
 async def get_system_status():
-    """Get comprehensive status of all operations and services"""
+    """Get comprehensive status of all operations and services.
+
+    Subsystems are queried concurrently, each within its own time budget;
+    slow ones report their last-known value marked stale. The result is
+    cached briefly so concurrent pollers share one collection.
+    """
     try:
         if not automation_engine:
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
-        status = await automation_engine.get_status()
+        status = await status_collector.get_status()
         return status
         
     except Exception as e:
         logger.error(f"Error getting system status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get status: {e}")
 
+@router.get("/stream", summary="📡 Stream System Status")
+async def stream_system_status():
+    """Server-Sent Events stream of engine, miner, NFT hunter and wallet state.
+
+    Sends a ``snapshot`` event on connect, then ``delta`` events carrying a
+    JSON Merge Patch per changed source. Every connection shares a single
+    producer; clients that fall behind are resynced with a fresh snapshot.
+    """
+    return StreamingResponse(
+        status_broadcaster.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stream/stats", summary="📡 Get Status Stream Stats")
+async def get_stream_stats():
+    """Get subscriber, sequence and dropped-delta counters for the status stream"""
+    return status_broadcaster.stats()
+
 @router.get("/profit-report", summary="💰 Get Profit Report")
-async def get_profit_report():
-    """Get comprehensive profit report from all sources"""
+async def get_profit_report(
+    hours: float = Query(24, gt=0, le=MAX_REPORT_HOURS),
+    start: Optional[float] = Query(None, ge=0, le=MAX_TIMESTAMP),
+    end: Optional[float] = Query(None, ge=0, le=MAX_TIMESTAMP)
+):
+    """Get profit report from all sources for a time window.
+
+    Served from the profit ledger: whole hours and days come from the
+    precomputed rollups, so any window costs a few indexed reads.
+    ``start``/``end`` are epoch seconds (default: the last ``hours``).
+    Mining earnings, contract action profits and Exodus transfers are
+    recorded as they happen; the engine and NFT hunter append their own
+    events when they implement ``RecordsOwnProfits``. Mining
+    earnings count toward the USD totals only for coins the profitability
+    feed prices; the others are kept in their native amount.
+    """
     try:
-        if not automation_engine:
-            raise HTTPException(status_code=500, detail="Automation engine not initialized")
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - hours * 3600
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if end - start > MAX_REPORT_HOURS * 3600:
+            raise HTTPException(status_code=400, detail=f"Window is longer than {MAX_REPORT_HOURS} hours")
             
-        report = await automation_engine.get_profit_report()
-        return report
+        return await profit_ledger.report(start, end)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating profit report: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate profit report: {e}")
 
+@router.get("/profit-report/series", summary="📈 Get Profit Time Series")
+async def get_profit_series(granularity: str = "hour", hours: float = Query(24, gt=0, le=MAX_REPORT_HOURS)):
+    """Get hourly or daily profit buckets from the ledger rollups"""
+    try:
+        if granularity not in ("hour", "day"):
+            raise HTTPException(status_code=400, detail=f"Unsupported granularity: {granularity}")
+            
+        end = time.time()
+        buckets = await profit_ledger.series(end - hours * 3600, end, HOUR if granularity == "hour" else DAY)
+        return {
+            "granularity": granularity,
+            "buckets": buckets,
+            "count": len(buckets)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting profit series: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get profit series: {e}")
+
 @router.post("/optimize", summary="🎯 Optimize Operations")
-async def optimize_operations(background_tasks: BackgroundTasks):
+async def optimize_operations():
     """Optimize all operations for maximum profit"""
     try:
         if not automation_engine:
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
-        background_tasks.add_task(automation_engine.optimize_operations)
+        job, created = job_scheduler.submit("optimize_operations", automation_engine.optimize_operations, priority=1)
         
         return {
             "message": "🎯 Optimization started - Maximizing profits!",
-            "status": "optimizing"
+            "status": "optimizing",
+            **_job_response(job, created)
         }
         
     except Exception as e:
@@ -129,17 +268,23 @@ async def optimize_operations(background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=f"Failed to start optimization: {e}")
 
 @router.post("/transfer-profits", summary="💸 Transfer Profits to Exodus")
-async def transfer_profits_to_exodus(background_tasks: BackgroundTasks):
+async def transfer_profits_to_exodus():
     """Transfer all accumulated profits to Exodus wallet"""
     try:
         if not automation_engine:
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
-        background_tasks.add_task(automation_engine.transfer_profits_to_exodus)
+        async def transfer_and_flush():
+            result = await automation_engine.transfer_profits_to_exodus()
+            # Send whatever the engine queued as one transfer per network/token
+            return {"engine": result, "batches": await transfer_batcher.flush()}
+
+        job, created = job_scheduler.submit("transfer_profits_to_exodus", transfer_and_flush, priority=8)
         
         return {
             "message": "💸 Profit transfer initiated to Exodus wallet",
-            "status": "transferring"
+            "status": "transferring",
+            **_job_response(job, created)
         }
         
     except Exception as e:
@@ -147,23 +292,56 @@ async def transfer_profits_to_exodus(background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=f"Failed to transfer profits: {e}")
 
 @router.post("/execute-strategy", summary="💰 Execute Profit Strategy")
-async def execute_profit_strategy(background_tasks: BackgroundTasks):
+async def execute_profit_strategy():
     """Execute automated profit-maximizing strategy"""
     try:
         if not automation_engine:
             raise HTTPException(status_code=500, detail="Automation engine not initialized")
             
-        background_tasks.add_task(automation_engine.execute_profit_strategy)
+        job, created = job_scheduler.submit("execute_profit_strategy", automation_engine.execute_profit_strategy, priority=5)
         
         return {
             "message": "💰 Profit strategy execution started",
-            "status": "executing"
+            "status": "executing",
+            **_job_response(job, created)
         }
         
     except Exception as e:
         logger.error(f"Error executing profit strategy: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to execute strategy: {e}")
 
+@router.get("/jobs", summary="📋 List Background Jobs")
+async def list_jobs(status: Optional[str] = None):
+    """List tracked background jobs, newest first"""
+    jobs = job_scheduler.list(status)
+    return {
+        "jobs": [job.to_dict() for job in jobs],
+        "count": len(jobs),
+        "stats": job_scheduler.stats()
+    }
+
+@router.get("/jobs/{job_id}", summary="🔎 Get Job Status")
+async def get_job(job_id: str):
+    """Get the status of a background job"""
+    job = job_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}", summary="✋ Cancel Job")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    job = job_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if not job_scheduler.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already {job.status}")
+    return {
+        "message": f"✋ Job {job_id} cancelled",
+        "job_id": job_id,
+        "status": "cancelled"
+    }
+
 @router.get("/health", summary="🏥 Health Check")
 async def health_check():
     """Simple health check endpoint"""
@@ -187,4 +365,21 @@ async def health_check():
         return {
             "status": "unhealthy",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@router.get("/live", summary="💓 Liveness Check")
+async def liveness_check():
+    """Constant-time liveness check: the process is up and serving requests"""
+    return health_prober.liveness()
+
+@router.get("/ready", summary="🚦 Readiness Check")
+async def readiness_check():
+    """Readiness from cached background probes of the injected services.
+
+    Never calls into a service, so it is safe to poll at any frequency.
+    Returns 503 while any service's last probe failed or is stale.
+    """
+    readiness = health_prober.readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
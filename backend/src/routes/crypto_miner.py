@@ -1,15 +1,79 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any, List, Optional
 import logging
 
+from ..services.coin_switcher import CoinSwitchScheduler, default_feed
+from ..services.hashrate_telemetry import hashrate_telemetry
+from ..services.health_probes import health_prober
+from ..services.mining_allocation import apply_coin_set
+from ..services.profit_ledger import MINING, EarningsTracker, profit_ledger
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MAX_BULK_COINS = 50
+MAX_BULK_CONCURRENCY = 16
+MAX_BULK_TIMEOUT_SECONDS = 120.0
+
 crypto_miner_service = None
+coin_switcher: Optional[CoinSwitchScheduler] = None
+# Records mining profits from the earnings totals the miner reports in its status
+mining_earnings: Optional[EarningsTracker] = None
 
 def set_crypto_miner_service(service):
-    global crypto_miner_service
+    global crypto_miner_service, coin_switcher, mining_earnings
     crypto_miner_service = service
+    if mining_earnings is not None:
+        mining_earnings.detach()
+        mining_earnings = None
+    if coin_switcher is not None:
+        coin_switcher.stop()
+    # Without a profitability feed there is nothing to switch on, so the scheduler stays disabled
+    feed = default_feed() if service else None
+    coin_switcher = CoinSwitchScheduler(service, feed, telemetry=hashrate_telemetry) if feed else None
+    if service is not None:
+        mining_earnings = EarningsTracker(profit_ledger, MINING)
+        mining_earnings.attach(_read_mining_earnings)
+    if service:
+        health_prober.register("crypto_miner", service.get_mining_status)
+        hashrate_telemetry.attach(service.get_mining_status)
+    else:
+        health_prober.unregister("crypto_miner")
+        hashrate_telemetry.detach()
+
+async def _start_background_loops():
+    """Start the loops whose service was attached before the event loop ran"""
+    if mining_earnings is not None:
+        mining_earnings.ensure_running()
+    hashrate_telemetry.ensure_running()
+    health_prober.ensure_running()
+
+router.add_event_handler("startup", _start_background_loops)
+
+async def _read_mining_earnings() -> List[Dict[str, Any]]:
+    """Each coin's running earnings total, in the coin, priced from the profitability feed when one is configured"""
+    status = await crypto_miner_service.get_mining_status()
+    prices: Dict[str, Any] = {}
+    if coin_switcher is not None:
+        try:
+            prices = await coin_switcher.feed.fetch()
+        except Exception as e:
+            logger.warning(f"No coin prices for mining earnings: {e}")
+    readings = []
+    for operation in status.get("operations") or []:
+        earnings = operation.get("earnings_total") if isinstance(operation, dict) else None
+        if not isinstance(earnings, (int, float)):
+            continue
+        coin = str(operation.get("coin")).upper()
+        price = (prices.get(coin) or {}).get("price_usd")
+        readings.append({
+            "key": coin,
+            "total": earnings,
+            "currency": coin,
+            "price_usd": float(price) if isinstance(price, (int, float)) else None,
+            "metadata": {"coin": coin},
+        })
+    return readings
 
 @router.get("/status", summary="⛏️ Get Mining Status")
 async def get_mining_status():
@@ -17,6 +81,9 @@ async def get_mining_status():
     try:
         if not crypto_miner_service:
             raise HTTPException(status_code=500, detail="Crypto Miner service not available")
+        if mining_earnings is not None:
+            # Apps that use a lifespan instead of startup events never ran the hook
+            mining_earnings.ensure_running()
             
         status = await crypto_miner_service.get_mining_status()
         return status
@@ -25,6 +92,99 @@ async def get_mining_status():
         logger.error(f"Error getting mining status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get mining status: {e}")
 
+@router.get("/telemetry", summary="📈 Get Hashrate Telemetry")
+async def get_hashrate_telemetry(coin: Optional[str] = None):
+    """Rolling hashrate per coin and worker over 1m/15m/1h windows.
+
+    Each window reports sample count, mean, p5/p50/p95 and the fitted trend
+    (per minute, and as a percentage of the mean across the window); a
+    falling trend points at throttling or a degrading worker.
+    """
+    if not crypto_miner_service:
+        raise HTTPException(status_code=500, detail="Crypto Miner service not available")
+        
+    hashrate_telemetry.ensure_running()
+    return {
+        "coins": hashrate_telemetry.summary(coin.upper() if coin else None),
+        "telemetry": hashrate_telemetry.stats()
+    }
+
+def _require_coin_switcher() -> CoinSwitchScheduler:
+    if not crypto_miner_service:
+        raise HTTPException(status_code=500, detail="Crypto Miner service not available")
+    if not coin_switcher:
+        raise HTTPException(status_code=503, detail="Coin switching is disabled: no profitability feed configured")
+    return coin_switcher
+
+@router.get("/scheduler", summary="🔁 Get Coin Switching Scheduler")
+async def get_coin_switcher():
+    """Get the profitability scheduler's settings, last evaluation and recent switches"""
+    return _require_coin_switcher().stats()
+
+@router.post("/scheduler/start", summary="▶️ Start Coin Switching Scheduler")
+async def start_coin_switcher(
+    max_coins: Optional[int] = None,
+    interval: Optional[float] = None,
+    switch_threshold: Optional[float] = None,
+    min_hold_seconds: Optional[float] = None
+):
+    """Periodically mine the most profitable coins, with hysteresis against flapping"""
+    _require_coin_switcher()
+    if max_coins is not None and max_coins < 1:
+        raise HTTPException(status_code=400, detail="max_coins must be at least 1")
+    if interval is not None and interval <= 0:
+        raise HTTPException(status_code=400, detail="interval must be positive")
+        
+    if max_coins is not None:
+        coin_switcher.max_coins = max_coins
+    if interval is not None:
+        coin_switcher.interval = interval
+    if switch_threshold is not None:
+        coin_switcher.switch_threshold = switch_threshold
+    if min_hold_seconds is not None:
+        coin_switcher.min_hold_seconds = min_hold_seconds
+    coin_switcher.start()
+    return {
+        "message": "🔁 Coin switching scheduler started",
+        "status": "started",
+        "scheduler": coin_switcher.stats()
+    }
+
+@router.post("/scheduler/stop", summary="⏹️ Stop Coin Switching Scheduler")
+async def stop_coin_switcher():
+    """Stop switching coins; whatever is mining keeps running"""
+    _require_coin_switcher().stop()
+    return {
+        "message": "⏹️ Coin switching scheduler stopped",
+        "status": "stopped"
+    }
+
+@router.post("/scheduler/evaluate", summary="🧮 Evaluate Coin Profitability")
+async def evaluate_coin_switch(apply: bool = False):
+    """Score every coin now; with ``apply`` also switch to the chosen set"""
+    try:
+        return await _require_coin_switcher().evaluate(apply=apply)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error evaluating coin profitability: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to evaluate coin profitability: {e}")
+
+@router.get("/workers", summary="🧵 Get Mining Worker Configuration")
+async def get_mining_workers():
+    """Get per-coin worker counts, CPU pinning and live worker processes"""
+    if not crypto_miner_service:
+        raise HTTPException(status_code=500, detail="Crypto Miner service not available")
+    if not hasattr(crypto_miner_service, "worker_config"):
+        raise HTTPException(status_code=404, detail="This miner does not run worker processes")
+        
+    status = await crypto_miner_service.get_mining_status()
+    return {
+        "config": crypto_miner_service.worker_config(),
+        "workers": {op["coin"]: op["workers"] for op in status.get("operations", [])}
+    }
+
 @router.post("/start", summary="🚀 Start Mining")
 async def start_mining():
     """Start mining for all configured coins"""
@@ -61,14 +221,56 @@ async def stop_mining():
         logger.error(f"Error stopping mining: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to stop mining: {e}")
 
+@router.post("/coins", summary="🔀 Set Mined Coins")
+async def set_mining_coins(
+    coins: List[str],
+    concurrency: int = Query(8, ge=1, le=MAX_BULK_CONCURRENCY),
+    timeout: float = Query(30.0, gt=0, le=MAX_BULK_TIMEOUT_SECONDS),
+):
+    """Mine exactly the given set of coins.
+
+    Diffs the set against the coins currently running and issues the needed
+    starts and stops concurrently (each bounded by ``timeout`` seconds). Every
+    coin gets its own outcome and timing; one coin failing doesn't fail the
+    request. An empty list stops everything.
+    """
+    try:
+        if not crypto_miner_service:
+            raise HTTPException(status_code=500, detail="Crypto Miner service not available")
+        if len(coins) > MAX_BULK_COINS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_COINS} coins per request")
+            
+        return await apply_coin_set(crypto_miner_service, coins, concurrency=concurrency, timeout=timeout)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error setting mining coins: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to set mining coins: {e}")
+
 @router.post("/start/{coin}", summary="🚀 Start Mining Specific Coin")
-async def start_mining_coin(coin: str):
-    """Start mining for a specific coin"""
+async def start_mining_coin(coin: str, workers: Optional[int] = None, cpus: Optional[str] = None):
+    """Start mining for a specific coin.
+
+    With a process-pool miner, ``workers`` sets the coin's worker process
+    count and ``cpus`` (comma-separated CPU ids) the CPUs they are pinned to.
+    """
     try:
         if not crypto_miner_service:
             raise HTTPException(status_code=500, detail="Crypto Miner service not available")
             
-        success = await crypto_miner_service.start_mining_coin(coin.upper())
+        options = {}
+        if workers is not None:
+            options["workers"] = workers
+        if cpus is not None:
+            try:
+                options["cpus"] = [int(cpu) for cpu in cpus.split(",") if cpu.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="cpus must be a comma-separated list of CPU ids")
+        if options and not hasattr(crypto_miner_service, "worker_config"):
+            raise HTTPException(status_code=400, detail="This miner does not support worker configuration")
+            
+        success = await crypto_miner_service.start_mining_coin(coin.upper(), **options)
         
         if success:
             return {
@@ -79,6 +281,10 @@ async def start_mining_coin(coin: str):
         else:
             raise HTTPException(status_code=400, detail=f"Failed to start mining {coin}")
             
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error starting mining for {coin}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to start mining {coin}: {e}")
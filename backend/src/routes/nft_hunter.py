@@ -1,33 +1,158 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional
+import inspect
 import logging
 
+from ..services.health_probes import health_prober
+from ..services.opportunity_dedup import OpportunityDeduplicator
+from ..services.opportunity_index import HIGH_VALUE_SCORE, OpportunityIndex, opportunity_key
+from ..services.opportunity_store import opportunity_store
+from ..services.profit_ledger import RecordsOwnProfits, profit_ledger
+from ..services.snapshot_cache import SnapshotCache
+from ..services.source_poller import SourcePoller, load_sources
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # This will be injected from main.py
 nft_hunter_service = None
 
+# Services without their own index or polled sources are mirrored from get_top_opportunities
+# at most this often; a mirrored index only ever holds the service's top INDEX_SYNC_LIMIT
+INDEX_SYNC_LIMIT = 1000
+INDEX_SYNC_SECONDS = 5.0
+# Most opportunities one request may list
+MAX_OPPORTUNITY_LIMIT = 500
+
+opportunity_index: Optional[OpportunityIndex] = None
+opportunity_dedup: Optional[OpportunityDeduplicator] = None
+source_poller: Optional[SourcePoller] = None
+_index_sync: Optional[SnapshotCache] = None
+
 def set_nft_hunter_service(service):
     """Set the NFT hunter service instance"""
-    global nft_hunter_service
+    global nft_hunter_service, opportunity_index, opportunity_dedup, source_poller, _index_sync
     nft_hunter_service = service
+    opportunity_index = None
+    opportunity_dedup = None
+    source_poller = None
+    _index_sync = None
+    if service:
+        if isinstance(service, RecordsOwnProfits):
+            # Claims happen inside the hunter, which appends their value to the shared ledger
+            service.profit_ledger = profit_ledger
+        existing = getattr(service, "opportunity_dedup", None)
+        if isinstance(existing, OpportunityDeduplicator):
+            opportunity_dedup = existing
+        else:
+            opportunity_dedup = OpportunityDeduplicator()
+            if hasattr(service, "opportunity_dedup"):
+                # The service checks each opportunity before scoring and enrichment
+                service.opportunity_dedup = opportunity_dedup
+
+        existing = getattr(service, "source_poller", None)
+        if isinstance(existing, SourcePoller):
+            source_poller = existing
+        else:
+            sources = load_sources()
+            if sources:
+                # Configured sources are polled here and fed straight into the index
+                source_poller = SourcePoller(sources, on_items=_ingest, on_removed=_remove_items)
+                if hasattr(service, "source_poller"):
+                    service.source_poller = source_poller
+
+        existing = getattr(service, "opportunity_index", None)
+        if isinstance(existing, OpportunityIndex):
+            opportunity_index = existing
+        else:
+            opportunity_index = OpportunityIndex()
+            if hasattr(service, "opportunity_index"):
+                # The service maintains the index as it discovers and drops opportunities
+                service.opportunity_index = opportunity_index
+            elif source_poller is None:
+                _index_sync = SnapshotCache(_sync_index, ttl=INDEX_SYNC_SECONDS, stale_while_revalidate=0,
+                                            name="nft_opportunity_index")
+        if opportunity_index.store is None:
+            # Mirrored indexes are persisted too; a sync keeps warm-loaded entries until they expire
+            opportunity_index.store = opportunity_store
+            try:
+                loaded = opportunity_index.warm_load()
+                logger.info(f"Warm-loaded {loaded} NFT opportunities from {opportunity_store.path}")
+            except Exception as e:
+                logger.error(f"Failed to warm-load NFT opportunities: {e}")
+    if service:
+        health_prober.register("nft_hunter", _hunter_status)
+    else:
+        health_prober.unregister("nft_hunter")
+
+async def _sync_index() -> Dict[str, int]:
+    opportunities = await nft_hunter_service.get_top_opportunities(INDEX_SYNC_LIMIT)
+    # A drop's owner keeps it only while the service still reports it
+    live = {opportunity_key(opportunity) for opportunity in opportunities}
+    return opportunity_index.sync(opportunity_dedup.filter_new(opportunities, live))
+
+async def _ingest(source: str, items: List[Dict[str, Any]]):
+    """Index polled items, skipping drops another source already reported before scoring them"""
+    score = getattr(nft_hunter_service, "score_opportunity", None)
+    for item in items:
+        owner = opportunity_dedup.check(item, live=opportunity_index)
+        if owner is not None and owner != opportunity_key(item):
+            continue
+        if score is not None and "score" not in item:
+            scored = score(item)
+            item = await scored if inspect.isawaitable(scored) else scored
+        opportunity_index.upsert(item)
+
+async def _remove_items(source: str, keys: List[str]):
+    """Drop opportunities a source no longer lists instead of waiting for their TTL"""
+    for key in keys:
+        opportunity = opportunity_index.get(key)
+        if opportunity is not None and opportunity.get("source") == source:
+            opportunity_index.remove(key)
+
+async def _get_index() -> OpportunityIndex:
+    if _index_sync is not None:
+        await _index_sync.get()
+    else:
+        opportunity_index.expire()
+    return opportunity_index
+
+def _index_coverage() -> Dict[str, Any]:
+    """How the index is fed, and whether its aggregates are capped"""
+    if _index_sync is None:
+        mode = "maintained" if hasattr(nft_hunter_service, "opportunity_index") else "polled"
+        return {"mode": mode, "capped": False, "limit": None, "sync_seconds": None}
+    return {"mode": "mirrored", "capped": True, "limit": INDEX_SYNC_LIMIT, "sync_seconds": INDEX_SYNC_SECONDS}
+
+async def _hunter_status() -> Dict[str, Any]:
+    return {
+        "is_running": nft_hunter_service.is_running,
+        "sources": list(nft_hunter_service.sources.keys()) if hasattr(nft_hunter_service, 'sources') else []
+    }
 
 @router.get("/opportunities", summary="🎨 Get NFT Opportunities")
-async def get_nft_opportunities(limit: int = 20):
-    """Get discovered NFT opportunities sorted by score"""
+async def get_nft_opportunities(
+    limit: int = Query(20, ge=1, le=MAX_OPPORTUNITY_LIMIT),
+    min_score: Optional[float] = None,
+    source: Optional[str] = None
+):
+    """Get discovered NFT opportunities sorted by score, read from the score index"""
     try:
         if not nft_hunter_service:
             raise HTTPException(status_code=500, detail="NFT Hunter service not available")
             
-        opportunities = await nft_hunter_service.get_top_opportunities(limit)
+        index = await _get_index()
+        opportunities = index.top(limit, min_score=min_score, source=source)
         
         return {
             "opportunities": opportunities,
             "count": len(opportunities),
+            "total_matching": index.count_at_least(min_score, source) if min_score is not None else None,
             "status": "success"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting NFT opportunities: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get opportunities: {e}")
@@ -57,6 +182,8 @@ async def start_nft_hunting():
             raise HTTPException(status_code=500, detail="NFT Hunter service not available")
             
         await nft_hunter_service.start()
+        if source_poller is not None:
+            source_poller.start()
         
         return {
             "message": "🎨 NFT Hunter started - Hunting for free NFTs!",
@@ -75,6 +202,10 @@ async def stop_nft_hunting():
             raise HTTPException(status_code=500, detail="NFT Hunter service not available")
             
         await nft_hunter_service.stop()
+        if source_poller is not None:
+            await source_poller.stop()
+        if opportunity_index is not None and opportunity_index.store is not None:
+            await opportunity_index.store.flush()
         
         return {
             "message": "🛑 NFT Hunter stopped",
@@ -86,62 +217,83 @@ async def stop_nft_hunting():
         raise HTTPException(status_code=500, detail=f"Failed to stop NFT hunter: {e}")
 
 @router.get("/opportunities/top", summary="💎 Get Top Opportunities")
-async def get_top_opportunities(limit: int = 5):
-    """Get the highest scoring NFT opportunities"""
+async def get_top_opportunities(
+    limit: int = Query(5, ge=1, le=MAX_OPPORTUNITY_LIMIT),
+    min_score: float = HIGH_VALUE_SCORE,
+    source: Optional[str] = None
+):
+    """Get up to ``limit`` opportunities scoring at least ``min_score``"""
     try:
         if not nft_hunter_service:
             raise HTTPException(status_code=500, detail="NFT Hunter service not available")
             
-        opportunities = await nft_hunter_service.get_top_opportunities(limit)
-        
-        # Filter for only the highest scores
-        top_opportunities = [opp for opp in opportunities if opp.get("score", 0) >= 8.0]
+        index = await _get_index()
+        top_opportunities = index.top(limit, min_score=min_score, source=source)
         
         return {
             "top_opportunities": top_opportunities,
             "count": len(top_opportunities),
+            "total_premium": index.count_at_least(min_score, source),
             "message": f"Found {len(top_opportunities)} premium opportunities"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting top opportunities: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get top opportunities: {e}")
 
 @router.get("/stats", summary="📈 Get NFT Hunting Statistics")
 async def get_nft_stats():
-    """Get NFT hunting statistics and metrics"""
+    """Get NFT hunting statistics from the score index's running aggregates.
+
+    When the service maintains the index, or configured sources are polled
+    into it, the aggregates cover every tracked opportunity and are updated
+    on each discovery and expiry, so a request costs the same however many
+    are tracked. Otherwise the index mirrors the service: once the
+    ``INDEX_SYNC_SECONDS`` cache expires, a request fetches
+    ``get_top_opportunities(INDEX_SYNC_LIMIT)`` and the aggregates cover
+    only those opportunities. ``coverage`` in the response says which case
+    applies.
+    """
     try:
         if not nft_hunter_service:
             raise HTTPException(status_code=500, detail="NFT Hunter service not available")
             
-        # Get all opportunities to calculate stats
-        all_opportunities = await nft_hunter_service.get_top_opportunities(1000)
-        
-        if not all_opportunities:
-            return {
-                "total_discovered": 0,
-                "average_score": 0,
-                "sources_active": 0,
-                "high_value_count": 0
-            }
-            
-        # Calculate statistics
-        total_discovered = len(all_opportunities)
-        average_score = sum(opp.get("score", 0) for opp in all_opportunities) / total_discovered
-        high_value_count = len([opp for opp in all_opportunities if opp.get("score", 0) >= 8.0])
-        
-        # Get unique sources
-        sources = set(opp.get("source", "") for opp in all_opportunities)
+        index = await _get_index()
+        summary = index.summary()
         
         return {
-            "total_discovered": total_discovered,
-            "average_score": round(average_score, 2),
-            "sources_active": len(sources),
-            "high_value_count": high_value_count,
-            "sources": list(sources),
+            "total_discovered": summary["count"],
+            "average_score": summary["average_score"],
+            "sources_active": len(summary["per_source"]),
+            "high_value_count": summary["high_value_count"],
+            "sources": list(summary["per_source"]),
+            "per_source": summary["per_source"],
+            "score_histogram": summary["score_histogram"],
+            "lifetime_discovered": summary["lifetime_inserted"],
+            "dedup": opportunity_dedup.stats(),
+            "store": index.store.stats() if index.store is not None else None,
+            "coverage": _index_coverage(),
             "is_hunting": nft_hunter_service.is_running
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting NFT stats: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get stats: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get stats: {e}")
+
+@router.get("/sources", summary="🛰️ Get Source Polling Stats")
+async def get_source_polling():
+    """Per-source poll counters, conditional-request hits, rate limiting and current interval"""
+    if source_poller is None:
+        return {"configured": False, "sources": {}}
+    return {"configured": True, **source_poller.stats()}
+
+@router.post("/sources/poll", summary="🔄 Poll All Sources Now")
+async def poll_sources_now():
+    """Poll every configured source once, concurrently"""
+    if source_poller is None:
+        raise HTTPException(status_code=404, detail="No NFT sources configured")
+    return {"results": await source_poller.poll_all(), "stats": source_poller.stats()}
\ No newline at end of file
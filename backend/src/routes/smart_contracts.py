@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, List
 import logging
 
+from ..services.health_probes import health_prober
+from ..services.profit_ledger import CONTRACT, profit_ledger, record_outcome
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -10,6 +13,10 @@ smart_contract_service = None
 def set_smart_contract_service(service):
     global smart_contract_service
     smart_contract_service = service
+    if service:
+        health_prober.register("smart_contracts", service.get_contract_status)
+    else:
+        health_prober.unregister("smart_contracts")
 
 @router.get("/status", summary="🤖 Get Smart Contract Status")
 async def get_contract_status():
@@ -84,6 +91,9 @@ async def execute_contract_action(
         )
         
         if result:
+            # An action that reports profit_usd in its result is a profit event
+            record_outcome(profit_ledger, CONTRACT, result,
+                           metadata={"contract_address": contract_address, "action": action})
             return {
                 "message": f"⚡ Action '{action}' executed successfully",
                 "contract_address": contract_address,
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Dict, Any, Optional
 import logging
 
+from ..services.conditional_get import check_not_modified, conditional_get_stats
+from ..services.health_probes import health_prober, snapshot_probe
+from ..services.snapshot_cache import get_wallet_snapshot
+from ..services.transfer_batcher import transfer_batcher
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -10,21 +15,64 @@ wallet_manager_service = None
 def set_wallet_manager_service(service):
     global wallet_manager_service
     wallet_manager_service = service
+    if service:
+        health_prober.register("wallet_manager", snapshot_probe(get_wallet_snapshot(service)))
+        transfer_batcher.sender = service.transfer_to_exodus
+        transfer_batcher.on_transfer = get_wallet_snapshot(service).invalidate
+        transfer_batcher.price_lookup = _snapshot_price
+    else:
+        health_prober.unregister("wallet_manager")
+        transfer_batcher.sender = None
+        transfer_batcher.on_transfer = None
+        transfer_batcher.price_lookup = None
+
+async def _snapshot_price(network: str, token_symbol: str) -> Optional[float]:
+    """USD price of a token from the shared wallet snapshot, if the wallet holds it"""
+    status = await get_wallet_snapshot(wallet_manager_service).get()
+    for balance in status.get("balances", []):
+        if balance.get("token_symbol") != token_symbol or balance.get("network", network) != network:
+            continue
+        if balance.get("price_usd"):
+            return float(balance["price_usd"])
+        if balance.get("balance") and balance.get("balance_usd") is not None:
+            return float(balance["balance_usd"]) / float(balance["balance"])
+    return None
 
 @router.get("/status", summary="💰 Get Wallet Status")
-async def get_wallet_status():
-    """Get current wallet status, balances, and recent transactions"""
+async def get_wallet_status(request: Request, response: Response):
+    """Get current wallet status, balances, and recent transactions.
+
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    while the wallet snapshot is unchanged.
+    """
     try:
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
             
-        status = await wallet_manager_service.get_wallet_status()
+        snapshot = get_wallet_snapshot(wallet_manager_service)
+        status = await snapshot.get()
+        not_modified = check_not_modified(request, response, "wallet-status", snapshot.etag)
+        if not_modified:
+            return not_modified
         return status
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting wallet status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get wallet status: {e}")
 
+@router.get("/status/cache", summary="🗄️ Get Wallet Status Cache Stats")
+async def get_wallet_status_cache_stats():
+    """Get hit/miss/coalesced counters for the shared wallet status snapshot"""
+    if not wallet_manager_service:
+        raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+        
+    return {
+        **get_wallet_snapshot(wallet_manager_service).stats(),
+        "conditional_get": conditional_get_stats.stats()
+    }
+
 @router.post("/transfer", summary="💸 Send Transaction")
 async def send_transaction(
     to_address: str,
@@ -43,6 +91,7 @@ async def send_transaction(
             token_symbol=token_symbol,
             network=network
         )
+        get_wallet_snapshot(wallet_manager_service).invalidate()
         
         if tx_hash:
             return {
@@ -66,26 +115,100 @@ async def transfer_to_exodus(
     token_symbol: str = "ETH",
     network: str = "ethereum"
 ):
-    """Transfer assets to Exodus wallet"""
+    """Transfer assets to Exodus wallet.
+
+    The transfer is sent right away, in order with any batched automated
+    transfers on the same network; it is never queued, so a restart can't
+    lose an acknowledged request.
+    """
     try:
         if not wallet_manager_service:
             raise HTTPException(status_code=500, detail="Wallet Manager service not available")
             
-        tx_hash = await wallet_manager_service.transfer_to_exodus(
-            amount=amount,
-            token_symbol=token_symbol,
-            network=network
-        )
+        result = await transfer_batcher.send(amount, token_symbol=token_symbol, network=network)
+        if result["status"] == "failed":
+            raise HTTPException(status_code=502, detail=f"Failed to transfer to Exodus: {result['error']}")
         
         return {
             "message": f"💰 Transfer to Exodus initiated",
-            "tx_hash": tx_hash,
+            "tx_hash": result.get("tx_hash"),
             "amount": amount,
             "token": token_symbol,
             "network": network,
-            "status": "transferred" if tx_hash else "queued"
+            "status": result["status"],
+            "batch": result
         }
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error transferring to Exodus: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to transfer to Exodus: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to transfer to Exodus: {e}")
+
+@router.get("/transfer-queue", summary="📦 Get Exodus Transfer Queue")
+async def get_transfer_queue():
+    """Get pending Exodus transfer batches, queue depth and flush latency"""
+    return transfer_batcher.stats()
+
+@router.post("/transfer-queue", summary="📥 Queue Automated Exodus Transfer")
+async def queue_exodus_transfer(
+    amount: float,
+    token_symbol: str = "ETH",
+    network: str = "ethereum"
+):
+    """Queue a small automated transfer (e.g. a profit sweep) to Exodus.
+
+    Amounts are coalesced per network and token and sent once the batch is
+    big enough or old enough. The queue lives in memory, so use
+    /transfer-to-exodus for transfers that must survive a restart.
+    """
+    try:
+        if not wallet_manager_service:
+            raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+            
+        return await transfer_batcher.enqueue(amount, token_symbol=token_symbol, network=network)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error queueing Exodus transfer: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue Exodus transfer: {e}")
+
+@router.post("/transfer-queue/unconfirmed/{entry_id}/resolve", summary="✅ Resolve Unconfirmed Exodus Transfer")
+async def resolve_unconfirmed_transfer(entry_id: int, sent: bool):
+    """Settle a batch whose send failed after it may have been broadcast.
+
+    Check the chain first: ``sent=true`` records it as transferred,
+    ``sent=false`` puts the amount back in the queue.
+    """
+    try:
+        return await transfer_batcher.resolve_unconfirmed(entry_id, sent)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No unconfirmed transfer {entry_id}")
+    except Exception as e:
+        logger.error(f"Error resolving unconfirmed transfer {entry_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to resolve unconfirmed transfer: {e}")
+
+@router.post("/transfer-queue/flush", summary="📤 Flush Exodus Transfer Queue")
+async def flush_transfer_queue(network: str = None, token_symbol: str = None):
+    """Send every pending Exodus transfer batch now (optionally one network/token)"""
+    try:
+        if not wallet_manager_service:
+            raise HTTPException(status_code=500, detail="Wallet Manager service not available")
+            
+        results = await transfer_batcher.flush(network=network, token_symbol=token_symbol)
+        return {
+            "flushed": len(results),
+            "results": results,
+            "queue_depth": transfer_batcher.stats()["queue_depth"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error flushing transfer queue: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to flush transfer queue: {e}")
\ No newline at end of file
@@ -0,0 +1,443 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = os.getenv("ASSET_HISTORY_DIR", "data/asset_history")
+DEFAULT_RAW_RETENTION_SECONDS = float(os.getenv("ASSET_HISTORY_RAW_RETENTION_HOURS", "48")) * 3600
+DEFAULT_MINUTE_RETENTION_SECONDS = float(os.getenv("ASSET_HISTORY_MINUTE_RETENTION_DAYS", "30")) * 86400
+
+# ts, amount, usd
+RAW_RECORD = struct.Struct("<ddd")
+# bucket_start, count, amount_last, usd_first, usd_min, usd_max, usd_last, usd_sum
+ROLLUP_RECORD = struct.Struct("<dQdddddd")
+
+MINUTE = 60
+HOUR = 3600
+
+# Widest range answered from each tier before falling back to a coarser one
+RAW_QUERY_SPAN = 2 * HOUR
+MINUTE_QUERY_SPAN = 3 * 86400
+
+SeriesKey = Tuple[str, str, str]
+
+
+def _number(value) -> Optional[float]:
+    """A finite float, 0.0 for None, or None if the value isn't a usable number"""
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class _RecordView:
+    """Read-only sequence of the leading timestamp of fixed-size records, for bisect"""
+
+    def __init__(self, buffer, record: struct.Struct):
+        self._buffer = buffer
+        self._record = record
+        self._count = len(buffer) // record.size if buffer is not None else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> float:
+        return struct.unpack_from("<d", self._buffer, index * self._record.size)[0]
+
+    def unpack(self, index: int) -> tuple:
+        return self._record.unpack_from(self._buffer, index * self._record.size)
+
+
+class _Bucket:
+    __slots__ = ("start", "count", "amount_last", "usd_first", "usd_min", "usd_max", "usd_last", "usd_sum")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.amount_last = 0.0
+        self.usd_first = 0.0
+        self.usd_min = float("inf")
+        self.usd_max = float("-inf")
+        self.usd_last = 0.0
+        self.usd_sum = 0.0
+
+    def add_point(self, amount: float, usd: float):
+        self.merge(1, amount, usd, usd, usd, usd, usd)
+
+    def merge(self, count, amount_last, usd_first, usd_min, usd_max, usd_last, usd_sum):
+        if not self.count:
+            self.usd_first = usd_first
+        self.count += count
+        self.amount_last = amount_last
+        self.usd_min = min(self.usd_min, usd_min)
+        self.usd_max = max(self.usd_max, usd_max)
+        self.usd_last = usd_last
+        self.usd_sum += usd_sum
+
+    def pack(self) -> bytes:
+        return ROLLUP_RECORD.pack(self.start, self.count, self.amount_last, self.usd_first,
+                                  self.usd_min, self.usd_max, self.usd_last, self.usd_sum)
+
+    def as_point(self) -> Dict[str, Any]:
+        return _rollup_point((self.start, self.count, self.amount_last, self.usd_first,
+                              self.usd_min, self.usd_max, self.usd_last, self.usd_sum))
+
+
+def _rollup_point(record: tuple) -> Dict[str, Any]:
+    start, count, amount_last, usd_first, usd_min, usd_max, usd_last, usd_sum = record
+    return {
+        "t": start,
+        "amount": amount_last,
+        "usd": usd_last,
+        "usd_open": usd_first,
+        "usd_min": usd_min,
+        "usd_max": usd_max,
+        "usd_avg": usd_sum / count if count else 0.0,
+        "samples": count,
+    }
+
+
+class _Series:
+    """Append-only files for one (wallet, network, token) plus its open rollup buckets"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.raw_path = os.path.join(directory, "raw.bin")
+        self.minute_path = os.path.join(directory, "1m.bin")
+        self.hour_path = os.path.join(directory, "1h.bin")
+        self.last_ts: Optional[float] = None
+        self.minute: Optional[_Bucket] = None
+        self.hour: Optional[_Bucket] = None
+        self._recover()
+
+    def append(self, ts: float, amount: float, usd: float) -> bool:
+        if self.last_ts is not None and ts < self.last_ts:
+            logger.debug(f"Dropping out-of-order balance point at {ts} in {self.directory}")
+            return False
+        with open(self.raw_path, "ab") as f:
+            f.write(RAW_RECORD.pack(ts, amount, usd))
+        self._fold(ts, amount, usd)
+        return True
+
+    def _fold(self, ts: float, amount: float, usd: float):
+        minute_start = ts - ts % MINUTE
+        if self.minute is not None and self.minute.start != minute_start:
+            self._close_minute()
+        if self.minute is None:
+            self.minute = _Bucket(minute_start)
+        self.minute.add_point(amount, usd)
+        self.last_ts = ts
+
+    def _close_minute(self):
+        bucket, self.minute = self.minute, None
+        with open(self.minute_path, "ab") as f:
+            f.write(bucket.pack())
+        hour_start = bucket.start - bucket.start % HOUR
+        if self.hour is not None and self.hour.start != hour_start:
+            self._close_hour()
+        if self.hour is None:
+            self.hour = _Bucket(hour_start)
+        self.hour.merge(bucket.count, bucket.amount_last, bucket.usd_first, bucket.usd_min,
+                        bucket.usd_max, bucket.usd_last, bucket.usd_sum)
+
+    def _close_hour(self):
+        bucket, self.hour = self.hour, None
+        with open(self.hour_path, "ab") as f:
+            f.write(bucket.pack())
+
+    def _recover(self):
+        """Rebuild the open buckets after a restart from the files on disk"""
+        for path, record in ((self.raw_path, RAW_RECORD), (self.minute_path, ROLLUP_RECORD),
+                             (self.hour_path, ROLLUP_RECORD)):
+            _truncate_partial(path, record.size)
+        with _mapped(self.hour_path) as hours:
+            hour_view = _RecordView(hours, ROLLUP_RECORD)
+            closed_hour_end = hour_view[len(hour_view) - 1] + HOUR if len(hour_view) else float("-inf")
+        with _mapped(self.minute_path) as minutes:
+            minute_view = _RecordView(minutes, ROLLUP_RECORD)
+            closed_minute_end = minute_view[len(minute_view) - 1] + MINUTE if len(minute_view) else float("-inf")
+            for index in range(bisect.bisect_left(minute_view, closed_hour_end), len(minute_view)):
+                record = minute_view.unpack(index)
+                hour_start = record[0] - record[0] % HOUR
+                if self.hour is not None and self.hour.start != hour_start:
+                    self._close_hour()
+                if self.hour is None:
+                    self.hour = _Bucket(hour_start)
+                self.hour.merge(*record[1:])
+        with _mapped(self.raw_path) as raw:
+            raw_view = _RecordView(raw, RAW_RECORD)
+            for index in range(bisect.bisect_left(raw_view, closed_minute_end), len(raw_view)):
+                self._fold(*raw_view.unpack(index))
+            if len(raw_view):
+                self.last_ts = raw_view[len(raw_view) - 1]
+
+    def compact(self, path: str, record: struct.Struct, keep_from: float) -> int:
+        """Rewrite a tier file without records older than ``keep_from``"""
+        with _mapped(path) as buffer:
+            view = _RecordView(buffer, record)
+            drop = bisect.bisect_left(view, keep_from)
+            if not drop:
+                return 0
+            tail = bytes(buffer[drop * record.size:len(view) * record.size])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tail)
+        os.replace(tmp_path, path)
+        return drop
+
+
+def _truncate_partial(path: str, record_size: int):
+    """Cut off a torn trailing record left by a crash mid-append"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    if size % record_size:
+        logger.warning(f"Truncating partial record at the end of {path}")
+        with open(path, "r+b") as f:
+            f.truncate(size - size % record_size)
+
+
+class _mapped:
+    """Context manager yielding a read-only mmap of a file, or None if it is empty/missing"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        try:
+            if os.path.getsize(self.path) == 0:
+                return None
+        except OSError:
+            return None
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class BalanceHistoryStore:
+    """Append-only time-series of balance snapshots per (wallet, network, token).
+
+    Raw points are fixed-size binary records. They are downsampled as they
+    arrive into 1-minute and 1-hour rollups (open/min/max/last/avg USD), each
+    in its own file. Range queries bisect a memory-mapped file of the
+    coarsest tier that still resolves the range, so long ranges never
+    rescan raw points. File I/O is blocking, so request handlers hand
+    snapshots to ``record_balances_later()``, which writes them in a worker
+    thread one at a time.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = DEFAULT_HISTORY_DIR,
+        raw_retention_seconds: float = DEFAULT_RAW_RETENTION_SECONDS,
+        minute_retention_seconds: float = DEFAULT_MINUTE_RETENTION_SECONDS,
+    ):
+        self.root_dir = root_dir
+        self.raw_retention_seconds = raw_retention_seconds
+        self.minute_retention_seconds = minute_retention_seconds
+        self._series: Dict[SeriesKey, _Series] = {}
+        self._last_compaction = time.time()
+        # Writes come from worker threads; appends, compaction and reads of the
+        # open buckets and series map must not interleave
+        self._write_lock = threading.Lock()
+        self._writes: Set[asyncio.Task] = set()
+        self.skipped_positions = 0
+        self.failed_writes = 0
+
+    def record(self, wallet: str, network: str, token: str, amount: float, usd: float,
+               ts: Optional[float] = None) -> bool:
+        """Append one balance point; out-of-order points are dropped"""
+        ts = ts if ts is not None else time.time()
+        return self._get_series((wallet or "", network, token), create=True).append(ts, amount or 0.0, usd or 0.0)
+
+    def record_balances(self, wallet: str, balances: List[Dict[str, Any]], ts: Optional[float] = None) -> int:
+        """Append a point for every valid position in a wallet status balance list.
+
+        Positions without a string network/token or with a non-numeric
+        amount are skipped and counted; one failing series doesn't stop the rest.
+        """
+        ts = ts if ts is not None else time.time()
+        recorded = 0
+        with self._write_lock:
+            for balance in balances:
+                network = balance.get("network", "unknown")
+                token = balance.get("token_symbol", "UNKNOWN")
+                amount = _number(balance.get("balance"))
+                usd = _number(balance.get("balance_usd"))
+                if not isinstance(network, str) or not isinstance(token, str) or amount is None or usd is None:
+                    self.skipped_positions += 1
+                    continue
+                try:
+                    if self.record(str(wallet or ""), network, token, amount, usd, ts):
+                        recorded += 1
+                except OSError as e:
+                    self.failed_writes += 1
+                    logger.warning(f"Failed to record balance history for {network}/{token}: {e}")
+            if ts - self._last_compaction >= HOUR:
+                self._last_compaction = ts
+                try:
+                    self.compact(ts)
+                except OSError as e:
+                    logger.warning(f"Failed to compact balance history: {e}")
+        return recorded
+
+    def record_balances_later(self, wallet: str, balances: List[Dict[str, Any]],
+                              ts: Optional[float] = None) -> asyncio.Task:
+        """Record a snapshot in a worker thread without blocking the caller"""
+        ts = ts if ts is not None else time.time()
+        # Copy now: the snapshot may change before the worker gets to it
+        snapshot = [dict(balance) for balance in balances]
+        task = asyncio.get_running_loop().create_task(
+            asyncio.to_thread(self.record_balances, wallet, snapshot, ts))
+        self._writes.add(task)
+        task.add_done_callback(self._write_done)
+        return task
+
+    def _write_done(self, task: asyncio.Task):
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed_writes += 1
+            logger.warning(f"Failed to record balance history: {task.exception()}")
+
+    def query(self, wallet: str, network: str, token: str, start: float, end: float) -> Dict[str, Any]:
+        """Points for ``start <= t <= end`` from the tier matching the range width.
+
+        Blocks while a snapshot is being written, so call it from a worker
+        thread rather than the event loop.
+        """
+        with self._write_lock:
+            return self._query(wallet, network, token, start, end)
+
+    def _query(self, wallet: str, network: str, token: str, start: float, end: float) -> Dict[str, Any]:
+        series = self._get_series((wallet or "", network, token), create=False)
+        span = end - start
+        now = time.time()
+        if span <= RAW_QUERY_SPAN and start >= now - self.raw_retention_seconds:
+            resolution = "raw"
+        elif span <= MINUTE_QUERY_SPAN and start >= now - self.minute_retention_seconds:
+            resolution = "1m"
+        else:
+            resolution = "1h"
+
+        points: List[Dict[str, Any]] = []
+        if series is not None:
+            if resolution == "raw":
+                points = self._read(series.raw_path, RAW_RECORD, start, end,
+                                    lambda r: {"t": r[0], "amount": r[1], "usd": r[2]})
+            else:
+                path = series.minute_path if resolution == "1m" else series.hour_path
+                points = self._read(path, ROLLUP_RECORD, start, end, _rollup_point)
+                points.extend(self._open_points(series, resolution, start, end))
+
+        return {
+            "wallet": wallet,
+            "network": network,
+            "token": token,
+            "start": start,
+            "end": end,
+            "resolution": resolution,
+            "points": points,
+            "count": len(points),
+        }
+
+    def series(self) -> List[Dict[str, str]]:
+        """Every series that has been recorded under the root directory"""
+        found = []
+        if not os.path.isdir(self.root_dir):
+            return found
+        for name in sorted(os.listdir(self.root_dir)):
+            meta_path = os.path.join(self.root_dir, name, "series.json")
+            try:
+                with open(meta_path) as f:
+                    found.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return found
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Drop raw and 1-minute records that have aged out of their retention"""
+        now = now if now is not None else time.time()
+        dropped = {"raw": 0, "1m": 0}
+        for meta in self.series():
+            series = self._get_series((meta["wallet"], meta["network"], meta["token"]), create=False)
+            if series is None:
+                continue
+            dropped["raw"] += series.compact(series.raw_path, RAW_RECORD, now - self.raw_retention_seconds)
+            dropped["1m"] += series.compact(series.minute_path, ROLLUP_RECORD, now - self.minute_retention_seconds)
+        return dropped
+
+    def _open_points(self, series: _Series, resolution: str, start: float, end: float) -> List[Dict[str, Any]]:
+        """Buckets that are still open, so charts reach the latest point"""
+        if resolution == "1m":
+            candidates = [series.minute.as_point()] if series.minute is not None else []
+        else:
+            candidates = [series.hour.as_point()] if series.hour is not None else []
+            if series.minute is not None:
+                minute_hour = series.minute.start - series.minute.start % HOUR
+                if candidates and candidates[-1]["t"] == minute_hour:
+                    candidates[-1] = self._merge_points(candidates[-1], series.minute)
+                else:
+                    # The open hour only closes once a later minute closes,
+                    # so an open minute in another hour is always newer
+                    candidates.append({**series.minute.as_point(), "t": minute_hour})
+        return [point for point in candidates if start <= point["t"] <= end]
+
+    @staticmethod
+    def _merge_points(point: Dict[str, Any], bucket: _Bucket) -> Dict[str, Any]:
+        samples = point["samples"] + bucket.count
+        return {
+            **point,
+            "amount": bucket.amount_last,
+            "usd": bucket.usd_last,
+            "usd_min": min(point["usd_min"], bucket.usd_min),
+            "usd_max": max(point["usd_max"], bucket.usd_max),
+            "usd_avg": (point["usd_avg"] * point["samples"] + bucket.usd_sum) / samples if samples else 0.0,
+            "samples": samples,
+        }
+
+    @staticmethod
+    def _read(path: str, record: struct.Struct, start: float, end: float, to_point) -> List[Dict[str, Any]]:
+        with _mapped(path) as buffer:
+            view = _RecordView(buffer, record)
+            lo = bisect.bisect_left(view, start)
+            hi = bisect.bisect_right(view, end)
+            return [to_point(view.unpack(index)) for index in range(lo, hi)]
+
+    def _get_series(self, key: SeriesKey, create: bool) -> Optional[_Series]:
+        series = self._series.get(key)
+        if series is not None:
+            return series
+        directory = os.path.join(self.root_dir, hashlib.sha1("\0".join(key).encode()).hexdigest()[:20])
+        if not os.path.isdir(directory):
+            if not create:
+                return None
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "series.json"), "w") as f:
+                json.dump({"wallet": key[0], "network": key[1], "token": key[2]}, f)
+        series = _Series(directory)
+        self._series[key] = series
+        return series
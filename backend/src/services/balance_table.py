@@ -0,0 +1,153 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keys held in columns; anything else on a balance row rides along in extras
+_COLUMN_KEYS = ("network", "token_symbol", "balance", "balance_usd", "price_usd")
+
+
+class BalanceTable:
+    """Columnar balance positions for vectorized portfolio math.
+
+    Amount, price and USD value are float64 arrays; network and symbol are
+    int32 codes into small category lists. Totals and group-bys run as numpy
+    reductions instead of Python loops over lists of dicts. Prices missing
+    from the input are derived from value / amount for repricing but flagged
+    in ``price_derived``, so ``to_balances()`` returns the rows it was given.
+    """
+
+    def __init__(
+        self,
+        amount: np.ndarray,
+        price: np.ndarray,
+        usd: np.ndarray,
+        network_codes: np.ndarray,
+        symbol_codes: np.ndarray,
+        networks: List[str],
+        symbols: List[str],
+        extras: Optional[List[Dict[str, Any]]] = None,
+        price_derived: Optional[np.ndarray] = None,
+    ):
+        self.amount = amount
+        self.price = price
+        self.usd = usd
+        self.network_codes = network_codes
+        self.symbol_codes = symbol_codes
+        self.networks = networks
+        self.symbols = symbols
+        self.extras = extras
+        self.price_derived = price_derived if price_derived is not None else np.zeros(len(usd), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.usd)
+
+    @classmethod
+    def from_balances(cls, balances: Iterable[Dict[str, Any]], keep_extras: bool = True) -> "BalanceTable":
+        """Build a table from the wallet service's list-of-dicts balances"""
+        balances = balances if isinstance(balances, list) else list(balances)
+        size = len(balances)
+        amount = np.zeros(size, dtype=np.float64)
+        price = np.full(size, np.nan, dtype=np.float64)
+        usd = np.zeros(size, dtype=np.float64)
+        network_codes = np.empty(size, dtype=np.int32)
+        symbol_codes = np.empty(size, dtype=np.int32)
+        network_index: Dict[str, int] = {}
+        symbol_index: Dict[str, int] = {}
+        extras: Optional[List[Dict[str, Any]]] = [] if keep_extras else None
+
+        for row, balance in enumerate(balances):
+            amount[row] = balance.get("balance") or 0
+            usd[row] = balance.get("balance_usd") or 0
+            if balance.get("price_usd") is not None:
+                price[row] = balance["price_usd"]
+            network = balance.get("network", "unknown")
+            symbol = balance.get("token_symbol", "UNKNOWN")
+            network_codes[row] = network_index.setdefault(network, len(network_index))
+            symbol_codes[row] = symbol_index.setdefault(symbol, len(symbol_index))
+            if extras is not None:
+                extras.append({k: v for k, v in balance.items() if k not in _COLUMN_KEYS})
+
+        # Derive missing prices from value / amount where that is defined
+        missing = np.isnan(price) & (amount != 0)
+        price[missing] = usd[missing] / amount[missing]
+
+        return cls(amount, price, usd, network_codes, symbol_codes,
+                   list(network_index), list(symbol_index), extras, missing)
+
+    @classmethod
+    def concat(cls, tables: List["BalanceTable"]) -> "BalanceTable":
+        """Stack several tables (e.g. one per wallet), re-coding categories"""
+        networks: Dict[str, int] = {}
+        symbols: Dict[str, int] = {}
+        network_parts, symbol_parts = [], []
+        for table in tables:
+            network_map = np.array([networks.setdefault(n, len(networks)) for n in table.networks], dtype=np.int32)
+            symbol_map = np.array([symbols.setdefault(s, len(symbols)) for s in table.symbols], dtype=np.int32)
+            network_parts.append(network_map[table.network_codes] if len(table) else table.network_codes)
+            symbol_parts.append(symbol_map[table.symbol_codes] if len(table) else table.symbol_codes)
+
+        extras = None
+        if tables and all(table.extras is not None for table in tables):
+            extras = [row for table in tables for row in table.extras]
+
+        def stack(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        return cls(
+            stack([t.amount for t in tables], np.float64),
+            stack([t.price for t in tables], np.float64),
+            stack([t.usd for t in tables], np.float64),
+            stack(network_parts, np.int32),
+            stack(symbol_parts, np.int32),
+            list(networks),
+            list(symbols),
+            extras,
+            stack([t.price_derived for t in tables], bool),
+        )
+
+    def to_balances(self) -> List[Dict[str, Any]]:
+        """Convert back to the list-of-dicts format used by the routes"""
+        rows = []
+        for row in range(len(self)):
+            balance = dict(self.extras[row]) if self.extras is not None else {}
+            balance["network"] = self.networks[self.network_codes[row]]
+            balance["token_symbol"] = self.symbols[self.symbol_codes[row]]
+            balance["balance"] = float(self.amount[row])
+            balance["balance_usd"] = float(self.usd[row])
+            if not np.isnan(self.price[row]) and not self.price_derived[row]:
+                balance["price_usd"] = float(self.price[row])
+            rows.append(balance)
+        return rows
+
+    def total_usd(self) -> float:
+        return float(self.usd.sum())
+
+    def by_network(self) -> Dict[str, float]:
+        """USD value per network over positive positions"""
+        return self._group(self.network_codes, self.networks)
+
+    def by_symbol(self) -> Dict[str, float]:
+        """USD value per token symbol over positive positions"""
+        return self._group(self.symbol_codes, self.symbols)
+
+    def count_by_network(self) -> Dict[str, int]:
+        counts = np.bincount(self.network_codes, minlength=len(self.networks))
+        return {self.networks[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def reprice(self, token_symbol: str, price_usd: float):
+        """Apply a new price to every position of a token"""
+        if token_symbol not in self.symbols:
+            return
+        mask = self.symbol_codes == self.symbols.index(token_symbol)
+        self.price[mask] = price_usd
+        self.price_derived[mask] = False
+        self.usd[mask] = self.amount[mask] * price_usd
+
+    def _group(self, codes: np.ndarray, labels: List[str]) -> Dict[str, float]:
+        positive = self.usd > 0
+        sums = np.bincount(codes[positive], weights=self.usd[positive], minlength=len(labels))
+        counts = np.bincount(codes[positive], minlength=len(labels))
+        return {labels[code]: float(sums[code]) for code in np.flatnonzero(counts)}
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STOP_DEADLINE_SECONDS = float(os.getenv("EMERGENCY_STOP_DEADLINE_SECONDS", "5.0"))
+# Longest deadline a stop request may ask for
+MAX_STOP_DEADLINE_SECONDS = 300.0
+# Abandoned-task reports kept per scope; older ones are only counted
+DEFAULT_MAX_ABANDONED = int(os.getenv("TASK_SCOPE_MAX_ABANDONED", "100"))
+
+
+class _TrackedTask:
+    __slots__ = ("task", "name", "kill", "started_at")
+
+    def __init__(self, task: asyncio.Task, name: str, kill: Optional[Callable[[], Any]]):
+        self.task = task
+        self.name = name
+        self.kill = kill
+        self.started_at = time.monotonic()
+
+
+class TaskScope:
+    """A node in a cancellation hierarchy of asyncio tasks.
+
+    The root scope has one child scope per subsystem. Work is started with
+    ``spawn()``, which tracks the task until it finishes. ``cancel()``
+    cancels every task in the subtree and waits up to a deadline for them to
+    wind down. Tasks still running at the deadline are reported as overruns.
+    Their ``kill`` hook runs if they have one; for example, it terminates a
+    worker process. They are then abandoned rather than awaited, so a stop
+    never takes much longer than its deadline.
+    """
+
+    def __init__(self, name: str = "root", parent: Optional["TaskScope"] = None):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, "TaskScope"] = {}
+        self._tasks: Dict[asyncio.Task, _TrackedTask] = {}
+        self.abandoned: Deque[Dict[str, Any]] = deque(maxlen=DEFAULT_MAX_ABANDONED)
+        self.abandoned_dropped = 0
+        self._stopping = False
+        self.last_stop: Optional[Dict[str, Any]] = None
+
+    @property
+    def path(self) -> str:
+        return self.name if self.parent is None else f"{self.parent.path}/{self.name}"
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping or (self.parent is not None and self.parent.stopping)
+
+    def child(self, name: str) -> "TaskScope":
+        """Get or create the child scope (task group) called ``name``"""
+        scope = self.children.get(name)
+        if scope is None:
+            scope = self.children[name] = TaskScope(name, parent=self)
+        return scope
+
+    def spawn(
+        self,
+        coro: Coroutine,
+        name: Optional[str] = None,
+        kill: Optional[Callable[[], Any]] = None,
+    ) -> asyncio.Task:
+        """Run ``coro`` as a task owned by this scope"""
+        if self.stopping:
+            coro.close()
+            raise RuntimeError(f"Task scope {self.path} is stopping")
+        task = asyncio.create_task(coro, name=name)
+        self._tasks[task] = _TrackedTask(task, name or task.get_name(), kill)
+        task.add_done_callback(self._discard)
+        return task
+
+    def _discard(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Task {self.path}:{task.get_name()} failed: {task.exception()}")
+
+    def _walk(self) -> Iterator[Tuple["TaskScope", _TrackedTask]]:
+        for tracked in list(self._tasks.values()):
+            yield self, tracked
+        for scope in list(self.children.values()):
+            yield from scope._walk()
+
+    def running(self) -> int:
+        return sum(1 for _ in self._walk())
+
+    async def cancel(self, deadline: float = DEFAULT_STOP_DEADLINE_SECONDS) -> Dict[str, Any]:
+        """Cancel every task in this subtree, waiting at most ``deadline`` seconds"""
+        started = time.monotonic()
+        self._stopping = True
+        try:
+            tracked = list(self._walk())
+            for _, entry in tracked:
+                entry.task.cancel()
+            pending = {entry.task for _, entry in tracked}
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=deadline)
+
+            overran = []
+            for scope, entry in tracked:
+                if entry.task not in pending:
+                    continue
+                killed = False
+                if entry.kill is not None:
+                    try:
+                        entry.kill()
+                        killed = True
+                    except Exception as e:
+                        logger.error(f"Failed to kill {scope.path}:{entry.name}: {e}")
+                # Keep it cancelled but stop tracking it; it no longer blocks anything
+                entry.task.cancel()
+                scope._tasks.pop(entry.task, None)
+                report = {
+                    "scope": scope.path,
+                    "task": entry.name,
+                    "running_seconds": round(time.monotonic() - entry.started_at, 3),
+                    "killed": killed,
+                }
+                if len(scope.abandoned) == scope.abandoned.maxlen:
+                    scope.abandoned_dropped += 1
+                scope.abandoned.append(report)
+                overran.append(report)
+        finally:
+            self._stopping = False
+
+        elapsed = time.monotonic() - started
+        self.last_stop = {
+            "scope": self.path,
+            "cancelled": len(tracked),
+            "quiesced": len(tracked) - len(overran),
+            "overran": overran,
+            "deadline_seconds": deadline,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "within_deadline": not overran,
+        }
+        if overran:
+            logger.warning(f"{len(overran)} task(s) in {self.path} overran the {deadline}s stop deadline")
+        return self.last_stop
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scope": self.path,
+            "running": len(self._tasks),
+            "abandoned": len(self.abandoned) + self.abandoned_dropped,
+            "abandoned_dropped": self.abandoned_dropped,
+            "children": {name: scope.stats() for name, scope in self.children.items()},
+        }
+
+
+@runtime_checkable
+class SpawnsInScope(Protocol):
+    """A service that starts its background loops in a scope it is handed (``task_scope.spawn``)"""
+
+    task_scope: Optional[TaskScope]
+
+
+root_scope = TaskScope()
@@ -0,0 +1,259 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from .cancel_scope import root_scope
+from .mining_allocation import apply_coin_set, running_coins
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = float(os.getenv("COIN_SWITCH_INTERVAL_SECONDS", "300"))
+DEFAULT_SWITCH_THRESHOLD = float(os.getenv("COIN_SWITCH_THRESHOLD", "0.05"))
+DEFAULT_MIN_HOLD_SECONDS = float(os.getenv("COIN_SWITCH_MIN_HOLD_SECONDS", "900"))
+DEFAULT_FEED_PATH = os.getenv("PROFITABILITY_FEED_PATH", "data/profitability.json")
+
+# Hashes expected per unit of difficulty: Bitcoin-style targets scale by 2^32
+HASHES_PER_DIFFICULTY = {"SHA256": 2.0 ** 32, "Scrypt": 2.0 ** 32}
+
+class ProfitabilityFeed(abc.ABC):
+    """Source of per-coin mining inputs.
+
+    ``fetch()`` returns ``{coin: {"difficulty", "block_reward", "price_usd",
+    "algorithm", "hashrate"?}}``. ``hashrate`` is the expected H/s of one of
+    our workers on that coin; when it is missing the scheduler falls back to
+    measured telemetry.
+    """
+
+    @abc.abstractmethod
+    async def fetch(self) -> Dict[str, Dict[str, Any]]:
+        ...
+
+
+class StaticProfitabilityFeed(ProfitabilityFeed):
+    def __init__(self, inputs: Dict[str, Dict[str, Any]]):
+        self.inputs = inputs
+
+    async def fetch(self) -> Dict[str, Dict[str, Any]]:
+        return self.inputs
+
+
+class FileProfitabilityFeed(ProfitabilityFeed):
+    """Reads inputs from a JSON file, re-parsing it only when it changes"""
+
+    def __init__(self, path: str = DEFAULT_FEED_PATH):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._inputs: Dict[str, Dict[str, Any]] = {}
+
+    async def fetch(self) -> Dict[str, Dict[str, Any]]:
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                self._inputs = {coin.upper(): values for coin, values in json.load(f).items()}
+            self._mtime = mtime
+        return self._inputs
+
+
+def default_feed() -> Optional[ProfitabilityFeed]:
+    """The configured feed file, or None; there is no built-in market data to fall back on"""
+    if os.path.exists(DEFAULT_FEED_PATH):
+        return FileProfitabilityFeed(DEFAULT_FEED_PATH)
+    return None
+
+
+def expected_revenue(inputs: Dict[str, Dict[str, Any]], measured_hashrate: Optional[Dict[str, float]] = None):
+    """USD/day per H/s and per worker for every coin, in one vectorized pass.
+
+    Returns ``(coins, per_hash, per_worker)``; coins with missing or invalid
+    inputs get NaN.
+    """
+    coins = sorted(inputs)
+    measured_hashrate = measured_hashrate or {}
+
+    def column(field, default=np.nan):
+        return np.array([_number(inputs[coin].get(field), default) for coin in coins], dtype=float)
+
+    difficulty = column("difficulty")
+    reward = column("block_reward")
+    price = column("price_usd")
+    scale = np.array([HASHES_PER_DIFFICULTY.get(inputs[coin].get("algorithm"), 1.0) for coin in coins])
+    hashrate = column("hashrate")
+    measured = np.array([measured_hashrate.get(coin, np.nan) for coin in coins], dtype=float)
+    hashrate = np.where(np.isnan(hashrate), measured, hashrate)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_hash = reward * price * 86400.0 / (difficulty * scale)
+    per_hash = np.where(np.isfinite(per_hash) & (difficulty > 0), per_hash, np.nan)
+    return coins, per_hash, per_hash * hashrate
+
+
+def _number(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class CoinSwitchScheduler:
+    """Periodically re-picks which coins to mine by expected revenue.
+
+    Each evaluation pulls inputs from the feed, computes USD/day per worker
+    for every coin at once, and keeps the ``max_coins`` most profitable ones
+    mining. Hysteresis keeps it from flapping. A running coin is only
+    replaced when a candidate beats it by ``switch_threshold``, and only
+    after the current mix has been held for ``min_hold_seconds``; empty
+    slots are filled right away. A running coin the feed has no valid data
+    for is never stopped on that account, and when no coin can be scored
+    the current set is left alone. Changes go through ``apply_coin_set``.
+    """
+
+    def __init__(
+        self,
+        service,
+        feed: ProfitabilityFeed,
+        telemetry=None,
+        max_coins: int = 1,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        switch_threshold: float = DEFAULT_SWITCH_THRESHOLD,
+        min_hold_seconds: float = DEFAULT_MIN_HOLD_SECONDS,
+    ):
+        self.service = service
+        self.feed = feed
+        self.telemetry = telemetry
+        self.max_coins = max_coins
+        self.interval = interval
+        self.switch_threshold = switch_threshold
+        self.min_hold_seconds = min_hold_seconds
+        self.last_switch_at: Optional[float] = None
+        self.last_evaluation: Optional[Dict[str, Any]] = None
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = root_scope.child("crypto_miner").spawn(self._run(), name="coin-switch-scheduler")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.evaluate(apply=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Coin switch evaluation failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _measured_hashrate(self) -> Dict[str, float]:
+        """Mean per-worker hashrate over the last 15 minutes, from telemetry"""
+        if self.telemetry is None:
+            return {}
+        measured = {}
+        for coin, series in self.telemetry.summary().items():
+            means = [w["15m"]["mean"] for w in series["workers"].values() if w["15m"]["mean"] is not None]
+            if means:
+                measured[coin] = sum(means) / len(means)
+        return measured
+
+    def choose(self, revenue: Dict[str, float], current: List[str], now: float) -> List[str]:
+        """Apply hysteresis to pick the next coin set from per-worker revenue"""
+        if not revenue:
+            # Nothing could be scored; stopping everything would be a guess
+            return list(current)
+        ranked = sorted((coin for coin in revenue if revenue[coin] > 0), key=revenue.get, reverse=True)
+        # Unscored running coins stay: missing data doesn't mean unprofitable
+        keep = [coin for coin in current if coin not in revenue or revenue[coin] > 0]
+        # Over the cap, the most profitable running coins stay; unscored ones go first
+        keep.sort(key=lambda coin: (coin not in revenue, -revenue.get(coin, 0.0)))
+        keep = keep[:self.max_coins]
+        chosen = list(keep)
+        for coin in ranked:
+            if len(chosen) >= self.max_coins:
+                break
+            if coin not in chosen:
+                chosen.append(coin)
+
+        held = self.last_switch_at is not None and now - self.last_switch_at < self.min_hold_seconds
+        if held:
+            return chosen
+        for candidate in ranked:
+            if candidate in chosen:
+                continue
+            weakest = min((coin for coin in chosen if coin in revenue), key=revenue.get, default=None)
+            if weakest is None or revenue[candidate] <= revenue[weakest] * (1 + self.switch_threshold):
+                break
+            chosen[chosen.index(weakest)] = candidate
+        return chosen
+
+    async def evaluate(self, apply: bool = False) -> Dict[str, Any]:
+        """Score every coin and (if ``apply``) switch the miner to the chosen set"""
+        now = time.monotonic()
+        inputs = await self.feed.fetch()
+        supported = {coin.upper() for coin in self.service.get_supported_coins()} \
+            if hasattr(self.service, "get_supported_coins") else None
+        if supported is not None:
+            inputs = {coin: values for coin, values in inputs.items() if coin in supported}
+        coins, per_hash, per_worker = expected_revenue(inputs, self._measured_hashrate())
+        revenue = {coin: float(value) for coin, value in zip(coins, per_worker) if np.isfinite(value)}
+
+        current = sorted(running_coins(await self.service.get_mining_status()))
+        chosen = self.choose(revenue, current, now)
+        if not chosen:
+            chosen = list(current)
+        evaluation = {
+            "evaluated_at": datetime.now().isoformat(),
+            "coins": {
+                coin: {
+                    "usd_per_day_per_hash": None if np.isnan(h) else float(h),
+                    "usd_per_day_per_worker": None if np.isnan(w) else round(float(w), 6),
+                }
+                for coin, h, w in zip(coins, per_hash, per_worker)
+            },
+            "current": current,
+            "chosen": chosen,
+            "switch": sorted(chosen) != current,
+            "applied": False,
+        }
+        if apply and evaluation["switch"]:
+            evaluation["result"] = await apply_coin_set(self.service, chosen)
+            evaluation["applied"] = True
+            self.last_switch_at = now
+            self.decisions.appendleft({
+                "at": evaluation["evaluated_at"],
+                "from": current,
+                "to": chosen,
+                "summary": evaluation["result"]["summary"],
+            })
+            logger.info(f"Switched mining from {current} to {chosen}")
+        self.last_evaluation = evaluation
+        return evaluation
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "feed": type(self.feed).__name__,
+            "max_coins": self.max_coins,
+            "interval_seconds": self.interval,
+            "switch_threshold": self.switch_threshold,
+            "min_hold_seconds": self.min_hold_seconds,
+            "held_for_seconds": round(time.monotonic() - self.last_switch_at, 1)
+            if self.last_switch_at is not None else None,
+            "last_evaluation": self.last_evaluation,
+            "decisions": list(self.decisions),
+        }
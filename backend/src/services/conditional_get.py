@@ -0,0 +1,66 @@
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+class ConditionalGetStats:
+    """Per-endpoint counters of conditional GETs answered with 304"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, conditional: bool, not_modified: bool):
+        counters = self._endpoints.setdefault(endpoint, {"requests": 0, "conditional": 0, "not_modified": 0})
+        counters["requests"] += 1
+        counters["conditional"] += int(conditional)
+        counters["not_modified"] += int(not_modified)
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, counters in self._endpoints.items():
+            endpoints[endpoint] = {
+                **counters,
+                "hit_rate": round(counters["not_modified"] / counters["requests"], 4) if counters["requests"] else 0.0,
+            }
+        return endpoints
+
+
+conditional_get_stats = ConditionalGetStats()
+
+
+def check_not_modified(request: Request, response: Response, endpoint: str, version_tag: Optional[str]) -> Optional[Response]:
+    """Set the ETag for ``endpoint`` and return a 304 if the client already has it.
+
+    ``version_tag`` identifies the underlying snapshot; None disables caching
+    for the request. The endpoint name is folded in because different
+    endpoints render different bodies from the same snapshot.
+    """
+    if version_tag is None:
+        return None
+    etag = f'"{endpoint}-{version_tag}"'
+    if_none_match = request.headers.get("if-none-match")
+    not_modified = etag_matches(if_none_match, etag)
+    conditional_get_stats.record(endpoint, conditional=bool(if_none_match), not_modified=not_modified)
+    if not_modified:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
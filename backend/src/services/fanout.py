@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+async def bounded_gather(
+    keys: Iterable[Hashable],
+    fetch: Callable[[Any], Awaitable[Any]],
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+) -> Dict[Hashable, Dict[str, Any]]:
+    """Run ``fetch(key)`` for every key with at most ``concurrency`` in flight.
+
+    Each call gets its own ``timeout``. Failures never propagate: every key
+    maps to ``{"status": "ok"|"error"|"timeout", "result"|"error", "elapsed_ms"}``
+    so callers can report partial results.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(key):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(fetch(key), timeout)
+                outcome = {"status": "ok", "result": result}
+            except asyncio.TimeoutError:
+                outcome = {"status": "timeout", "error": f"Timed out after {timeout}s"}
+            except Exception as e:
+                logger.warning(f"Fan-out call for {key} failed: {e}")
+                outcome = {"status": "error", "error": str(e)}
+            outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return key, outcome
+
+    # dict.fromkeys drops duplicate keys while keeping their order
+    results = await asyncio.gather(*(run(key) for key in dict.fromkeys(keys)))
+    return dict(results)
@@ -0,0 +1,121 @@
+import multiprocessing
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# One cache line (8 doubles) per worker slot so writers never share a line
+FIELDS = ("seq", "hash_rate", "shares_accepted", "shares_rejected", "uptime_seconds", "updated_at", "pid", "_reserved")
+SLOT_WIDTH = len(FIELDS)
+SEQ, HASH_RATE, ACCEPTED, REJECTED, UPTIME, UPDATED_AT, PID = range(7)
+MAX_READ_RETRIES = 8
+
+
+class CounterWriter:
+    """Single-writer side of one slot, used inside a worker process.
+
+    Seqlock protocol: bump ``seq`` to odd, write the fields, bump it back to
+    even. Readers retry any slot whose ``seq`` was odd or changed while they
+    copied it, so they never see a half-written record and never block the
+    writer.
+    """
+
+    def __init__(self, block, slot: int):
+        self.block = block
+        self.base = slot * SLOT_WIDTH
+
+    def publish(self, hash_rate: float, accepted: int, rejected: int, uptime: float, pid: int):
+        block, base = self.block, self.base
+        seq = block[base + SEQ]
+        block[base + SEQ] = seq + 1
+        block[base + HASH_RATE] = hash_rate
+        block[base + ACCEPTED] = accepted
+        block[base + REJECTED] = rejected
+        block[base + UPTIME] = uptime
+        block[base + UPDATED_AT] = time.time()
+        block[base + PID] = pid
+        block[base + SEQ] = seq + 2
+
+
+class HashrateCounters:
+    """Fixed-layout shared-memory block of per-worker mining counters.
+
+    Backed by a ``multiprocessing.RawArray`` of doubles handed to each worker
+    at spawn. Workers publish through a ``CounterWriter``; the API process
+    reads every slot with ``snapshot()``, which is a pair of memory copies
+    rather than an IPC round-trip, so its cost doesn't depend on how many
+    workers are running.
+    """
+
+    def __init__(self, capacity: int, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.capacity = capacity
+        self.block = ctx.RawArray("d", capacity * SLOT_WIDTH)
+        self._view = np.frombuffer(self.block, dtype=np.float64).reshape(capacity, SLOT_WIDTH)
+        self._last_good = np.zeros((capacity, SLOT_WIDTH))
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self.torn_reads = 0
+        self.fallback_reads = 0
+
+    def allocate(self) -> int:
+        if not self._free:
+            raise RuntimeError(f"All {self.capacity} hashrate counter slots are in use")
+        return self._free.pop()
+
+    def release(self, slot: int):
+        """Zero a slot whose worker has exited and return it to the pool"""
+        self.reset(slot)
+        self._free.append(slot)
+
+    def reset(self, slot: int):
+        # Keep seq increasing so a concurrent reader can't mistake old data for new
+        row = self._view[slot]
+        seq = row[SEQ]
+        row[SEQ] = seq + 1
+        row[1:] = 0.0
+        row[SEQ] = seq + 2
+        self._last_good[slot] = row
+
+    def snapshot(self, slots: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Consistent copy of the given slots (all allocated ones by default)"""
+        if slots is None:
+            free = set(self._free)
+            slots = [slot for slot in range(self.capacity) if slot not in free]
+        if not slots:
+            return {}
+        index = np.asarray(slots)
+        rows = self._view[index]
+        for attempt in range(MAX_READ_RETRIES + 1):
+            seq_after = self._view[index, SEQ]
+            bad = (rows[:, SEQ] != seq_after) | (seq_after % 2 == 1)
+            if not bad.any() or attempt == MAX_READ_RETRIES:
+                break
+            self.torn_reads += int(bad.sum())
+            # Give a preempted writer a chance to finish its record
+            time.sleep(0)
+            rows[bad] = self._view[index[bad]]
+        if bad.any():
+            # Writer still mid-update: fall back to that slot's previous consistent record
+            self.fallback_reads += int(bad.sum())
+            rows[bad] = self._last_good[index[bad]]
+        self._last_good[index[~bad]] = rows[~bad]
+        return {slot: self._row_dict(row) for slot, row in zip(slots, rows)}
+
+    @staticmethod
+    def _row_dict(row: np.ndarray) -> Dict[str, Any]:
+        return {
+            "hash_rate": float(row[HASH_RATE]),
+            "shares_accepted": int(row[ACCEPTED]),
+            "shares_rejected": int(row[REJECTED]),
+            "uptime_seconds": float(row[UPTIME]),
+            "updated_at": float(row[UPDATED_AT]) or None,
+            "pid": int(row[PID]) or None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.capacity - len(self._free),
+            "torn_reads_retried": self.torn_reads,
+            "fallback_reads": self.fallback_reads,
+        }
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import time
+import warnings
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL_SECONDS = float(os.getenv("HASHRATE_SAMPLE_INTERVAL_SECONDS", "1.0"))
+DEFAULT_MAX_SERIES = int(os.getenv("HASHRATE_TELEMETRY_MAX_SERIES", "64"))
+WINDOWS = {"1m": 60, "15m": 900, "1h": 3600}
+TOTAL = "total"
+
+SeriesKey = Tuple[str, str]
+
+
+def _window_stats(values: np.ndarray, offsets: np.ndarray, window_seconds: float) -> Dict[str, np.ndarray]:
+    """Mean, p5/p50/p95 and least-squares trend for every row of ``values`` at once.
+
+    ``values`` is (series, samples) with NaN for missing samples; ``offsets``
+    is each sample's time in seconds relative to now.
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+    filled = np.where(valid, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = filled.sum(axis=1) / count
+        p5, p50, p95 = np.nanpercentile(values, [5, 50, 95], axis=1) if values.shape[1] else \
+            (np.full(len(values), np.nan),) * 3
+        x = np.where(valid, offsets, 0.0)
+        x_mean = x.sum(axis=1) / count
+        dx = np.where(valid, offsets - x_mean[:, None], 0.0)
+        dy = np.where(valid, values - mean[:, None], 0.0)
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    return {
+        "samples": count,
+        "mean": mean,
+        "p5": p5,
+        "p50": p50,
+        "p95": p95,
+        "trend_per_minute": slope * 60,
+        # Fitted change across the window as a share of the mean
+        "trend_pct": slope * window_seconds / mean * 100,
+    }
+
+
+def _clean(value) -> Optional[float]:
+    value = float(value)
+    return None if not np.isfinite(value) else round(value, 3)
+
+
+class HashrateTelemetry:
+    """Rolling per-coin, per-worker hashrate samples in fixed-size NumPy ring buffers.
+
+    All series share one ring of sample times; each series is a row of a
+    preallocated (series, capacity) array, NaN where it had no sample. The
+    ring holds the longest window at the sample interval, so memory is fixed
+    at ``capacity * (max_series + 1)`` doubles. When every row is taken the
+    least recently seen series is evicted. Window statistics for every
+    series and per-coin totals are computed in one vectorized pass per
+    window when asked for.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_SAMPLE_INTERVAL_SECONDS,
+        max_series: int = DEFAULT_MAX_SERIES,
+        windows: Optional[Dict[str, float]] = None,
+    ):
+        self.interval = interval
+        self.windows = dict(windows or WINDOWS)
+        self.capacity = int(max(self.windows.values()) / interval) + 1
+        self.max_series = max_series
+        self._times = np.full(self.capacity, np.nan)
+        self._values = np.full((max_series, self.capacity), np.nan)
+        self._last_seen = np.full(max_series, -np.inf)
+        self._rows: Dict[SeriesKey, int] = {}
+        self._head = 0
+        self.samples_recorded = 0
+        self.evictions = 0
+        self._source: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+        self._sampler: Optional[asyncio.Task] = None
+
+    def record(self, samples: Dict[SeriesKey, float], ts: Optional[float] = None):
+        """Append one sample per series (series missing from ``samples`` get NaN)"""
+        ts = time.time() if ts is None else ts
+        column = self._head
+        self._times[column] = ts
+        self._values[:, column] = np.nan
+        for key, value in samples.items():
+            row = self._row(key)
+            self._values[row, column] = value
+            self._last_seen[row] = ts
+        self._head = (column + 1) % self.capacity
+        self.samples_recorded += 1
+
+    def _row(self, key: SeriesKey) -> int:
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+        if len(self._rows) < self.max_series:
+            row = len(self._rows)
+        else:
+            row = int(np.argmin(self._last_seen))
+            evicted = next(k for k, r in self._rows.items() if r == row)
+            del self._rows[evicted]
+            self._values[row] = np.nan
+            self.evictions += 1
+        self._rows[key] = row
+        return row
+
+    def summary(self, coin: Optional[str] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """Per-coin totals and per-worker stats for every window"""
+        now = time.time() if now is None else now
+        keys = sorted(key for key in self._rows if coin is None or key[0] == coin)
+        if not keys:
+            return {}
+        worker_values = self._values[[self._rows[key] for key in keys]]
+
+        coins = sorted({key[0] for key in keys})
+        totals = []
+        for name in coins:
+            rows = worker_values[[i for i, key in enumerate(keys) if key[0] == name]]
+            missing = np.isnan(rows).all(axis=0)
+            totals.append(np.where(missing, np.nan, np.nansum(rows, axis=0)))
+        labels = keys + [(name, TOTAL) for name in coins]
+        values = np.vstack([worker_values] + totals)
+
+        result: Dict[str, Any] = {name: {TOTAL: {}, "workers": {}} for name in coins}
+        for window, seconds in self.windows.items():
+            in_window = self._times >= now - seconds
+            stats = _window_stats(values[:, in_window], self._times[in_window] - now, seconds)
+            for i, (name, worker) in enumerate(labels):
+                window_stats = {"samples": int(stats["samples"][i])}
+                window_stats.update({field: _clean(stats[field][i]) for field in stats if field != "samples"})
+                if worker == TOTAL:
+                    result[name][TOTAL][window] = window_stats
+                else:
+                    result[name]["workers"].setdefault(worker, {})[window] = window_stats
+        return result
+
+    def attach(self, source: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Sample ``source`` (a get_mining_status coroutine) every interval"""
+        self._source = source
+        self.ensure_running()
+
+    def detach(self):
+        self._source = None
+        if self._sampler is not None:
+            self._sampler.cancel()
+            self._sampler = None
+
+    def ensure_running(self):
+        if self._source is None or (self._sampler is not None and not self._sampler.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Attached during synchronous startup; started on first telemetry request
+            return
+        self._sampler = loop.create_task(self._run(), name="hashrate-telemetry")
+
+    async def _run(self):
+        while self._source is not None:
+            try:
+                await self.sample_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Hashrate sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sample_once(self):
+        status = await self._source()
+        samples: Dict[SeriesKey, float] = {}
+        for op in status.get("operations", []):
+            coin = op.get("coin")
+            if coin is None:
+                continue
+            workers = op.get("workers")
+            if not workers:
+                samples[(coin, "all")] = float(op.get("hash_rate", 0.0) or 0.0)
+                continue
+            for worker in workers:
+                if worker.get("alive") and not worker.get("stale"):
+                    samples[(coin, str(worker["index"]))] = float(worker.get("hash_rate", 0.0))
+        self.record(samples)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self._rows),
+            "max_series": self.max_series,
+            "capacity": self.capacity,
+            "sample_interval_seconds": self.interval,
+            "samples_recorded": self.samples_recorded,
+            "evictions": self.evictions,
+            "memory_bytes": self._values.nbytes + self._times.nbytes + self._last_seen.nbytes,
+            "sampling": self._sampler is not None and not self._sampler.done(),
+        }
+
+
+hashrate_telemetry = HashrateTelemetry()
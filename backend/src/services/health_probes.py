@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "10"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+
+
+class Degraded(Exception):
+    """Raised by a probe whose service still answers, but with impaired results"""
+
+
+def snapshot_probe(cache) -> Callable[[], Awaitable[Any]]:
+    """Probe for a ``SnapshotCache``: fails when it can't produce a value, degraded while serving stale data"""
+
+    async def probe():
+        await cache.get()
+        if cache.last_error is not None:
+            age = cache.age
+            raise Degraded(f"Serving a {age:.0f}s old {cache.name}; last refresh failed: {cache.last_error}"
+                           if age is not None else f"Last {cache.name} refresh failed: {cache.last_error}")
+
+    return probe
+
+
+class HealthProber:
+    """Probes registered services in the background and caches the results.
+
+    Each probe is a coroutine function that raises (or times out) when its
+    service is unusable, or raises ``Degraded`` when it still works but is
+    impaired; a degraded service keeps the process ready. One loop runs
+    every probe concurrently once per interval. ``readiness()`` only reads
+    the cached results, so health checks cost the same no matter how often
+    a load balancer polls. A result older than ``stale_after`` counts as
+    failed, so a wedged loop can't keep reporting ready.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = interval * 3 + timeout
+        self.started_at = time.monotonic()
+        self._probes: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.rounds = 0
+
+    def register(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        """Register (or replace) a named probe"""
+        self._probes[name] = probe
+        self._results.pop(name, None)
+        self.ensure_running()
+
+    def unregister(self, name: str):
+        self._probes.pop(name, None)
+        self._results.pop(name, None)
+
+    def ensure_running(self):
+        """Start the probe loop if there is an event loop to run it on"""
+        if self._loop_task is not None and not self._loop_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Registered during synchronous startup; started on first readiness check
+            return
+        self._loop_task = loop.create_task(self._run(), name="health-prober")
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        """Run every probe once and cache the outcomes"""
+        names = list(self._probes)
+        await asyncio.gather(*(self._probe_one(name, self._probes[name]) for name in names))
+        self.rounds += 1
+
+    async def _probe_one(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        previous = self._results.get(name, {})
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+            error = degraded = None
+        except Degraded as e:
+            error, degraded = None, str(e)
+        except asyncio.TimeoutError:
+            error, degraded = f"Timed out after {self.timeout}s", None
+        except Exception as e:
+            error, degraded = str(e) or type(e).__name__, None
+        if self._probes.get(name) is not probe:
+            # Unregistered or replaced while probing
+            return
+        self._results[name] = {
+            "ok": error is None,
+            "error": error,
+            "degraded": degraded,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "checked_at": time.monotonic(),
+            "checked_at_iso": datetime.now().isoformat(),
+            "consecutive_failures": 0 if error is None else previous.get("consecutive_failures", 0) + 1,
+        }
+
+    def liveness(self) -> Dict[str, Any]:
+        return {
+            "status": "alive",
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+        }
+
+    def readiness(self) -> Dict[str, Any]:
+        """Readiness from cached probe results; never calls a service"""
+        self.ensure_running()
+        now = time.monotonic()
+        checks = {}
+        for name in self._probes:
+            result = self._results.get(name)
+            if result is None:
+                checks[name] = {"ok": False, "error": "Not probed yet"}
+                continue
+            age = now - result["checked_at"]
+            check = {
+                "ok": result["ok"] and age <= self.stale_after,
+                "error": result["error"] if age <= self.stale_after else f"Last probe is {age:.0f}s old",
+                "degraded": result["degraded"] if age <= self.stale_after else None,
+                "latency_ms": result["latency_ms"],
+                "age_seconds": round(age, 3),
+                "checked_at": result["checked_at_iso"],
+                "consecutive_failures": result["consecutive_failures"],
+            }
+            checks[name] = check
+        ready = bool(checks) and all(check["ok"] for check in checks.values())
+        degraded = sorted(name for name, check in checks.items() if check.get("degraded"))
+        return {
+            "status": ("degraded" if degraded else "ready") if ready else "not_ready",
+            "ready": ready,
+            "degraded": degraded,
+            "checks": checks,
+            "probe_interval_seconds": self.interval,
+            "probe_rounds": self.rounds,
+        }
+
+
+health_prober = HealthProber()
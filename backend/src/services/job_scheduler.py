@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cancel_scope import TaskScope
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class Job:
+    job_type: str
+    factory: Callable[[], Awaitable[Any]]
+    priority: int = 0
+    dedupe_key: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": round(self.finished_at - self.started_at, 3)
+            if self.started_at and self.finished_at else None,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    """In-process async job scheduler.
+
+    Jobs get an ID and run as asyncio tasks, highest priority first, subject
+    to a global concurrency limit and an optional limit per job type.
+    Submitting a job whose dedupe key matches a queued or running job returns
+    the existing job instead of starting a second one. Finished jobs are kept
+    in a bounded history for status lookups. With a ``scope``, job tasks are
+    owned by that task scope, so cancelling the scope cancels them.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        type_limits: Optional[Dict[str, int]] = None,
+        default_type_limit: int = 1,
+        history_size: int = 200,
+        scope: Optional[TaskScope] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.type_limits = dict(type_limits or {})
+        self.default_type_limit = default_type_limit
+        self.history_size = history_size
+        self.scope = scope
+
+        self._queue: List[Tuple[int, int, Job]] = []
+        self._sequence = itertools.count()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_keys: Dict[str, str] = {}
+        self._running_by_type: Dict[str, int] = {}
+        self._running = 0
+        self.deduplicated = 0
+
+    def submit(
+        self,
+        job_type: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        dedupe_key: Optional[str] = None,
+    ) -> Tuple[Job, bool]:
+        """Queue a job, returning ``(job, created)``.
+
+        ``dedupe_key`` defaults to the job type, so two identical jobs never
+        run at once; ``created`` is False when an in-flight job was reused.
+        """
+        dedupe_key = dedupe_key if dedupe_key is not None else job_type
+        existing_id = self._active_keys.get(dedupe_key)
+        if existing_id is not None:
+            self.deduplicated += 1
+            return self._jobs[existing_id], False
+
+        job = Job(job_type=job_type, factory=factory, priority=priority, dedupe_key=dedupe_key)
+        self._jobs[job.id] = job
+        self._active_keys[dedupe_key] = job.id
+        heapq.heappush(self._queue, (-priority, next(self._sequence), job))
+        self._dispatch()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None) -> List[Job]:
+        return [job for job in reversed(self._jobs.values()) if status is None or job.status == status]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job, returning whether it was active"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in ACTIVE_STATES:
+            return False
+        if job.status == QUEUED:
+            # Lazily dropped from the heap by _dispatch
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+        return True
+
+    def cancel_all(self) -> int:
+        """Cancel every queued and running job"""
+        return sum(self.cancel(job.id) for job in list(self._jobs.values()))
+
+    async def wait(self, job_id: str):
+        """Wait for a job to finish (success, failure or cancellation)"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            await job.done.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "running": self._running,
+            "running_by_type": dict(self._running_by_type),
+            "by_status": counts,
+            "deduplicated": self.deduplicated,
+            "max_concurrent": self.max_concurrent,
+            "type_limits": self.type_limits,
+        }
+
+    def _type_limit(self, job_type: str) -> int:
+        return self.type_limits.get(job_type, self.default_type_limit)
+
+    def _dispatch(self):
+        blocked = []
+        while self._queue and self._running < self.max_concurrent:
+            item = heapq.heappop(self._queue)
+            job = item[2]
+            if job.status != QUEUED:
+                continue
+            if self._running_by_type.get(job.job_type, 0) >= self._type_limit(job.job_type):
+                blocked.append(item)
+                continue
+            self._start(job)
+        for item in blocked:
+            heapq.heappush(self._queue, item)
+
+    def _start(self, job: Job):
+        if self.scope is not None and self.scope.stopping:
+            # Submitted while an emergency stop is cancelling this scope
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._running += 1
+        self._running_by_type[job.job_type] = self._running_by_type.get(job.job_type, 0) + 1
+        name = f"job:{job.job_type}:{job.id}"
+        if self.scope is not None:
+            job.task = self.scope.spawn(self._run(job), name=name)
+        else:
+            job.task = asyncio.create_task(self._run(job), name=name)
+        # A done callback runs even when the task is cancelled before its first step
+        job.task.add_done_callback(lambda task: self._on_done(job, task))
+
+    async def _run(self, job: Job):
+        return await job.factory()
+
+    def _on_done(self, job: Job, task: asyncio.Task):
+        if task.cancelled():
+            self._finish(job, CANCELLED)
+        elif task.exception() is not None:
+            logger.error(f"Job {job.job_type} ({job.id}) failed: {task.exception()}")
+            job.error = str(task.exception())
+            self._finish(job, FAILED)
+        else:
+            job.result = task.result()
+            self._finish(job, SUCCEEDED)
+        self._running -= 1
+        self._running_by_type[job.job_type] -= 1
+        if not self._running_by_type[job.job_type]:
+            del self._running_by_type[job.job_type]
+        self._dispatch()
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        if self._active_keys.get(job.dedupe_key) == job.id:
+            del self._active_keys[job.dedupe_key]
+        job.done.set()
+        self._trim_history()
+
+    def _trim_history(self):
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATES][:excess]:
+            del self._jobs[job_id]
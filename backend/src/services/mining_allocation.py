@@ -0,0 +1,81 @@
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from .fanout import bounded_gather
+
+START = "start"
+STOP = "stop"
+UNCHANGED = "unchanged"
+UNSUPPORTED = "unsupported"
+
+
+def running_coins(status: Dict[str, Any]) -> Set[str]:
+    """Coins currently being mined, from a get_mining_status() document"""
+    operations = status.get("operations") or status.get("miners") or []
+    return {op["coin"].upper() for op in operations if op.get("coin") and op.get("is_running", True)}
+
+
+async def apply_coin_set(
+    service,
+    desired: Iterable[str],
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Start and stop coins so the miner runs exactly ``desired``.
+
+    Diffs ``desired`` against what is running and issues the needed
+    ``start_mining_coin`` / ``stop_mining_coin`` calls concurrently. A coin
+    that fails to switch is reported in its own result and doesn't affect
+    the others.
+    """
+    started = time.perf_counter()
+    desired = list(dict.fromkeys(coin.upper() for coin in desired))
+    before = running_coins(await service.get_mining_status())
+    supported = {coin.upper() for coin in service.get_supported_coins()} \
+        if hasattr(service, "get_supported_coins") else None
+
+    results: Dict[str, Dict[str, Any]] = {}
+    actions = []
+    for coin in desired:
+        if supported is not None and coin not in supported:
+            results[coin] = {"action": UNSUPPORTED, "status": "skipped"}
+        elif coin in before:
+            results[coin] = {"action": UNCHANGED, "status": "ok"}
+        else:
+            actions.append((START, coin))
+    actions.extend((STOP, coin) for coin in sorted(before - set(desired)))
+
+    async def switch(action):
+        verb, coin = action
+        if verb == START:
+            return await service.start_mining_coin(coin)
+        return await service.stop_mining_coin(coin)
+
+    outcomes = await bounded_gather(actions, switch, concurrency=concurrency, timeout=timeout)
+    for (verb, coin), outcome in outcomes.items():
+        result = {"action": verb, "status": outcome["status"], "elapsed_ms": outcome["elapsed_ms"]}
+        if outcome["status"] == "ok" and not outcome["result"]:
+            result["status"] = "failed"
+        if "error" in outcome:
+            result["error"] = outcome["error"]
+        results[coin] = result
+
+    running = set(before)
+    for coin, result in results.items():
+        if result["status"] == "ok" and result["action"] == START:
+            running.add(coin)
+        elif result["status"] == "ok" and result["action"] == STOP:
+            running.discard(coin)
+
+    summary: Dict[str, int] = {}
+    for result in results.values():
+        key = result["action"] if result["status"] in ("ok", "skipped") else "failed"
+        summary[key] = summary.get(key, 0) + 1
+    return {
+        "desired": desired,
+        "running_before": sorted(before),
+        "running": sorted(running),
+        "results": results,
+        "summary": summary,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,608 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .cancel_scope import root_scope
+from .hashrate_counters import CounterWriter, HashrateCounters
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.getenv("MINING_CONFIG_PATH", "data/mining.json")
+DEFAULT_WORKERS_PER_COIN = int(os.getenv("MINING_WORKERS_PER_COIN", "1"))
+DEFAULT_STOP_TIMEOUT_SECONDS = float(os.getenv("MINING_STOP_TIMEOUT_SECONDS", "5"))
+MAX_WORKERS = int(os.getenv("MINING_MAX_WORKERS", "64"))
+RESTART_BACKOFF_INITIAL_SECONDS = 1.0
+RESTART_BACKOFF_MAX_SECONDS = 60.0
+# A worker that stays up this long resets its crash backoff
+STABLE_AFTER_SECONDS = 60.0
+MONITOR_INTERVAL_SECONDS = 0.5
+# Hard stop: how long terminated workers get to exit before being killed
+TERMINATE_JOIN_SECONDS = 1.0
+REPORT_INTERVAL_SECONDS = 1.0
+# How often a miner worker checks its stop event and its miner
+STOP_POLL_SECONDS = 0.1
+
+SUPPORTED_COINS = {
+    "BTC": "SHA256",
+    "ETH": "Ethash",
+    "LTC": "Scrypt",
+    "XMR": "RandomX",
+}
+
+
+def _sha256d(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def _scrypt(data: bytes) -> bytes:
+    return hashlib.scrypt(data, salt=data, n=1024, r=1, p=1, dklen=32)
+
+
+def _keccak(data: bytes) -> bytes:
+    return hashlib.sha3_256(data).digest()
+
+
+def _blake2b(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+# algorithm: (hash function, hashes per batch between stop checks)
+HASHERS: Dict[str, Tuple[Callable[[bytes], bytes], int]] = {
+    "SHA256": (_sha256d, 4096),
+    "Ethash": (_keccak, 4096),
+    "Scrypt": (_scrypt, 32),
+    "RandomX": (_blake2b, 4096),
+}
+
+
+def _pin(cpu: Optional[int]):
+    # Ctrl-C goes to the API process, which stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+
+
+# xmrig: "speed 10s/60s/15m 1520.3 1498.7 n/a H/s max 1540.0 H/s"; the 10s figure is current
+_XMRIG_SPEED = re.compile(r"\bspeed\s+\S+\s+([\d.]+)(?:\s+(?:[\d.]+|n/a))*\s+([kKMG]?)H/s")
+# xmrig: "accepted (12/1) diff 10000 (48 ms)", totals so far as accepted/rejected
+_XMRIG_SHARES = re.compile(r"\b(?:accepted|rejected)\s+\((\d+)/(\d+)\)")
+# cpuminer: "accepted: 12/13 (92.31%), 4930.13 khash/s (yay!!!)", totals so far as accepted/submitted
+_CPUMINER_SHARES = re.compile(r"\baccepted:\s*(\d+)/(\d+)")
+_RATE = re.compile(r"([\d.]+)\s*([kKMGT]?)(?:H|hash)/s")
+_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+_RATE_UNITS = {"": 1.0, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9, "T": 1e12}
+
+
+class MinerOutputParser:
+    """Running hash rate and share totals read from a miner's console output.
+
+    Understands xmrig's periodic ``speed`` and ``accepted``/``rejected``
+    lines and cpuminer-style ``accepted: a/n ..., x khash/s`` lines. Other
+    lines (including per-thread rates) are ignored.
+    """
+
+    def __init__(self):
+        self.hash_rate = 0.0
+        self.accepted = 0
+        self.rejected = 0
+
+    def feed(self, line: str) -> bool:
+        """Update from one output line; True if it carried any counters"""
+        line = _ANSI.sub("", line)
+        matched = False
+        speed = _XMRIG_SPEED.search(line)
+        if speed:
+            self.hash_rate = float(speed.group(1)) * _RATE_UNITS[speed.group(2)]
+            matched = True
+        shares = _XMRIG_SHARES.search(line)
+        if shares:
+            self.accepted, self.rejected = int(shares.group(1)), int(shares.group(2))
+            return True
+        shares = _CPUMINER_SHARES.search(line)
+        if shares:
+            self.accepted = int(shares.group(1))
+            self.rejected = int(shares.group(2)) - self.accepted
+            rate = _RATE.search(line, shares.end())
+            if rate:
+                self.hash_rate = float(rate.group(1)) * _RATE_UNITS[rate.group(2)]
+            return True
+        return matched
+
+
+def _miner_main(command: List[str], cpu: Optional[int], stop_event, counters_block, slot: int,
+                report_interval: float = REPORT_INTERVAL_SECONDS):
+    """Entry point of a miner worker: run the miner binary and publish its counters until told to stop.
+
+    The worker leads its own process group so the supervisor can kill it
+    together with the miner. It exits with the miner's exit code when the
+    miner dies on its own, which the supervisor treats as a crash.
+    """
+    _pin(cpu)
+    os.setpgrp()
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    counters = CounterWriter(counters_block, slot)
+    parser = MinerOutputParser()
+    pid = os.getpid()
+    started = time.monotonic()
+    # The miner inherits this worker's CPU affinity and ignored SIGINT
+    miner = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT, text=True, errors="replace")
+
+    def read():
+        for line in miner.stdout:
+            parser.feed(line)
+
+    reader = threading.Thread(target=read, name="miner-output", daemon=True)
+    reader.start()
+    last_report = None
+    try:
+        # Polls is_set() rather than waiting: a worker killed inside Event.wait() would deadlock every later set()
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if last_report is None or now - last_report >= report_interval:
+                counters.publish(parser.hash_rate, parser.accepted, parser.rejected, now - started, pid)
+                last_report = now
+            if miner.poll() is not None:
+                reader.join(report_interval)
+                counters.publish(parser.hash_rate, parser.accepted, parser.rejected,
+                                 time.monotonic() - started, pid)
+                sys.exit(miner.returncode or 1)
+            time.sleep(STOP_POLL_SECONDS)
+    finally:
+        if miner.poll() is None:
+            miner.terminate()
+            try:
+                miner.wait(TERMINATE_JOIN_SECONDS)
+            except subprocess.TimeoutExpired:
+                miner.kill()
+                miner.wait()
+
+
+def _benchmark_main(algorithm: str, cpu: Optional[int], stop_event, counters_block, slot: int,
+                    report_interval: float = REPORT_INTERVAL_SECONDS):
+    """Entry point of a benchmark worker: measure local hash throughput until told to stop.
+
+    Nothing is submitted to a pool, so it earns nothing and reports no shares.
+    """
+    _pin(cpu)
+    hasher, batch = HASHERS.get(algorithm, HASHERS["SHA256"])
+    counters = CounterWriter(counters_block, slot)
+    pid = os.getpid()
+    header = os.urandom(76)
+    nonce = 0
+    hashes = 0
+    started = last_report = time.monotonic()
+    while not stop_event.is_set():
+        for _ in range(batch):
+            hasher(header + nonce.to_bytes(4, "little"))
+            nonce = (nonce + 1) & 0xFFFFFFFF
+        hashes += batch
+        now = time.monotonic()
+        if now - last_report >= report_interval:
+            counters.publish(hashes / (now - last_report), 0, 0, now - started, pid)
+            hashes = 0
+            last_report = now
+
+
+def available_cpus() -> Optional[Set[int]]:
+    """CPUs this process may run on, or None where the OS has no affinity API"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    return set(os.sched_getaffinity(0))
+
+
+@dataclass
+class CoinConfig:
+    coin: str
+    algorithm: str
+    workers: int = DEFAULT_WORKERS_PER_COIN
+    cpus: Optional[List[int]] = None
+    # argv of the miner binary (pool, wallet and threads included), e.g. ["xmrig", "-o", ...]
+    command: Optional[List[str]] = None
+
+
+def load_coin_configs(path: str = DEFAULT_CONFIG_PATH) -> Dict[str, CoinConfig]:
+    """Coin configs from a JSON file of ``{coin: {"algorithm", "command", ...}}``; empty if it doesn't exist"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {coin.upper(): CoinConfig(coin=coin.upper(), **values) for coin, values in json.load(f).items()}
+
+
+def validate_cpus(cpus: Sequence[int]):
+    """Raise ValueError for CPU ids this process can't be pinned to"""
+    allowed = available_cpus()
+    if allowed is None:
+        return
+    invalid = sorted(set(cpus) - allowed)
+    if invalid:
+        raise ValueError(f"CPUs {invalid} are not available; allowed: {sorted(allowed)}")
+
+
+@dataclass
+class _Worker:
+    coin: str
+    index: int
+    cpu: Optional[int]
+    slot: int
+    external: bool = False
+    process: Any = None
+    started_at: float = 0.0
+    restarts: int = 0
+    consecutive_crashes: int = 0
+    next_restart_at: Optional[float] = None
+    last_exitcode: Optional[int] = None
+
+    def kill(self):
+        """SIGKILL the worker; a miner worker's process group takes its miner with it"""
+        if self.external and hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                return
+            except (ProcessLookupError, PermissionError):
+                # Killed before it made its own process group, so before it started the miner
+                pass
+        self.process.kill()
+
+    def to_dict(self, counters: Dict[str, Any], stale_after: float) -> Dict[str, Any]:
+        alive = self.process is not None and self.process.is_alive()
+        updated_at = counters.get("updated_at")
+        return {
+            "index": self.index,
+            # A worker that hasn't published yet is still reported by its pid
+            "pid": (counters.get("pid") or self.process.pid) if alive else None,
+            "alive": alive,
+            "cpu": self.cpu,
+            "mode": "miner" if self.external else "benchmark",
+            "restarts": self.restarts,
+            "last_exitcode": self.last_exitcode,
+            "restart_in_seconds": round(max(0.0, self.next_restart_at - time.monotonic()), 2)
+            if self.next_restart_at is not None else None,
+            "hash_rate": counters.get("hash_rate", 0.0),
+            "shares_accepted": counters.get("shares_accepted", 0),
+            "shares_rejected": counters.get("shares_rejected", 0),
+            "uptime_seconds": round(counters.get("uptime_seconds", 0.0), 1),
+            "stale": updated_at is None or time.time() - updated_at > stale_after,
+        }
+
+
+class MiningSupervisor:
+    """Runs each coin's miner in its own pool of worker processes.
+
+    Each worker is a spawned process that runs the coin's configured miner
+    ``command`` (a real miner binary pointed at a pool) as its child, parses
+    the miner's console output for hash rate and share totals, and publishes
+    them into its own counter slot. A coin without a command can only be
+    run when the supervisor is created with ``benchmark=True``; those
+    workers just measure local hash throughput and never submit shares. Each coin has a configurable
+    worker count and CPU set; worker ``i`` is pinned to the ``i``-th CPU of
+    its coin's set (where the OS supports affinity). A monitor task restarts
+    crashed workers with exponential backoff. Stopping a coin asks its
+    workers to exit, then terminates and finally kills any that don't within
+    the stop timeout. Every worker publishes its counters into one
+    shared-memory block, which status reads directly. Exposes the same
+    coroutine methods as the crypto miner service, so it can be injected in
+    its place.
+    """
+
+    def __init__(
+        self,
+        configs: Optional[Dict[str, CoinConfig]] = None,
+        stop_timeout: float = DEFAULT_STOP_TIMEOUT_SECONDS,
+        report_interval: float = REPORT_INTERVAL_SECONDS,
+        max_workers: int = MAX_WORKERS,
+        benchmark: bool = False,
+    ):
+        if configs is None:
+            configs = load_coin_configs()
+        self.configs = configs or {coin: CoinConfig(coin, algorithm) for coin, algorithm in SUPPORTED_COINS.items()}
+        self.benchmark = benchmark
+        self.stop_timeout = stop_timeout
+        self.report_interval = report_interval
+        self._ctx = multiprocessing.get_context("spawn")
+        self.counters = HashrateCounters(max_workers, self._ctx)
+        self._workers: Dict[str, List[_Worker]] = {}
+        self._stop_events: Dict[str, Any] = {}
+        # Pools whose start is still spawning; their starter cleans them up if they are stopped meanwhile
+        self._starting: Dict[str, List[_Worker]] = {}
+        self._coin_started_at: Dict[str, float] = {}
+        self._monitor: Optional[asyncio.Task] = None
+        self._cleanups: Set[asyncio.Future] = set()
+        self.start_time: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def get_supported_coins(self) -> List[str]:
+        return list(self.configs)
+
+    async def start(self):
+        for coin in self.configs:
+            await self.start_mining_coin(coin)
+
+    async def stop(self):
+        await asyncio.gather(*(self.stop_mining_coin(coin) for coin in list(self._workers)))
+
+    async def start_mining_coin(self, coin: str, workers: Optional[int] = None,
+                                cpus: Optional[Sequence[int]] = None) -> bool:
+        """Start a coin's worker pool; False for unknown or already-running coins"""
+        coin = coin.upper()
+        config = self.configs.get(coin)
+        if config is None:
+            logger.error(f"Unsupported coin: {coin}")
+            return False
+        if coin in self._workers:
+            logger.info(f"Already mining {coin}")
+            return False
+        if not config.command and not self.benchmark:
+            raise ValueError(f"No miner command configured for {coin}")
+        if cpus:
+            validate_cpus(cpus)
+        elif cpus is None and config.cpus:
+            validate_cpus(config.cpus)
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        count = workers if workers is not None else config.workers
+        if count > self.counters.capacity - self.counters.stats()["in_use"]:
+            raise ValueError(f"Not enough worker slots for {count} more {coin} workers")
+        cpu_set = (list(cpus) or None) if cpus is not None else config.cpus
+
+        # Captured here: a concurrent stop removes the coin's entries while the workers spawn
+        stop_event = self._ctx.Event()
+        pool = [_Worker(coin, index, cpu_set[index % len(cpu_set)] if cpu_set else None,
+                        self.counters.allocate(), external=bool(config.command))
+                for index in range(count)]
+        # Registered first so a concurrent start sees the coin as running
+        self._workers[coin] = pool
+        self._stop_events[coin] = stop_event
+        self._starting[coin] = pool
+        spawning = asyncio.gather(*(self._spawn(worker, stop_event) for worker in pool))
+        try:
+            # Shielded: a process launch already on a worker thread finishes even if this start is cancelled
+            await asyncio.shield(spawning)
+        except BaseException:
+            # Failed or cancelled (e.g. a bulk request's timeout): take back the pool and anything it spawned
+            self._forget(coin, pool)
+            await asyncio.shield(asyncio.ensure_future(self._discard(pool, stop_event, spawning)))
+            raise
+        finally:
+            if self._starting.get(coin) is pool:
+                del self._starting[coin]
+        if self._workers.get(coin) is not pool:
+            # Stopped while starting; the stop left these workers to us
+            await asyncio.shield(asyncio.ensure_future(self._discard(pool, stop_event)))
+            return False
+        # Only a pool that actually started changes the coin's saved settings
+        config.workers = count
+        config.cpus = cpu_set
+        self._coin_started_at[coin] = time.time()
+        self.start_time = self.start_time or time.time()
+        self._ensure_monitor()
+        logger.info(f"Started mining {coin} with {config.workers} worker process(es)")
+        return True
+
+    async def stop_mining_coin(self, coin: str) -> bool:
+        """Stop a coin's workers: ask, then terminate, then kill"""
+        coin = coin.upper()
+        pool = self._workers.get(coin)
+        if pool is None:
+            return False
+        stop_event = self._stop_events[coin]
+        self._forget(coin, pool)
+        if self._starting.get(coin) is pool:
+            # Its start is still spawning workers; it reaps them once they are all up
+            logger.info(f"Stopped mining {coin} while it was starting")
+            return True
+        await self._discard(pool, stop_event)
+        logger.info(f"Stopped mining {coin}")
+        return True
+
+    def _forget(self, coin: str, pool: List[_Worker]):
+        if self._workers.get(coin) is not pool:
+            return
+        del self._workers[coin]
+        self._stop_events.pop(coin).set()
+        self._coin_started_at.pop(coin, None)
+        if not self._workers:
+            self.start_time = None
+
+    async def _discard(self, pool: List[_Worker], stop_event, spawning: Optional[asyncio.Future] = None):
+        """Stop a forgotten pool's workers and free the counter slots of those that exited"""
+        stop_event.set()
+        if spawning is not None:
+            # Wait out launches still in flight so every started process is known before reaping
+            await asyncio.wait([spawning])
+            if not spawning.cancelled():
+                spawning.exception()
+        await asyncio.to_thread(self._reap, pool, self.stop_timeout)
+        for worker in pool:
+            if worker.process is not None and worker.process.is_alive():
+                logger.error(f"Mining worker {worker.coin}-{worker.index} survived kill; not reusing its counter slot")
+                continue
+            self.counters.release(worker.slot)
+
+    async def _spawn(self, worker: _Worker, stop_event):
+        config = self.configs[worker.coin]
+        self.counters.reset(worker.slot)
+        name = f"miner-{worker.coin}-{worker.index}"
+        if worker.external:
+            if shutil.which(config.command[0]) is None:
+                # Fail the start here rather than as a crash loop inside the worker
+                raise FileNotFoundError(f"Miner binary not found: {config.command[0]}")
+            target, head = _miner_main, (list(config.command),)
+        else:
+            target, head = _benchmark_main, (config.algorithm,)
+        process = self._ctx.Process(
+            target=target, name=name, daemon=True,
+            args=head + (worker.cpu, stop_event, self.counters.block, worker.slot,
+                         self.report_interval))
+        # Spawning a fresh interpreter takes tens of milliseconds; keep it off the event loop
+        await asyncio.to_thread(process.start)
+        worker.process = process
+        worker.started_at = time.monotonic()
+        worker.next_restart_at = None
+
+    @staticmethod
+    def _reap(pool: List[_Worker], timeout: float):
+        deadline = time.monotonic() + timeout
+        for worker in pool:
+            if worker.process is not None:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+        for worker in pool:
+            process = worker.process
+            if process is None or not process.is_alive():
+                continue
+            logger.warning(f"Mining worker {worker.coin}-{worker.index} ignored stop; terminating")
+            process.terminate()
+            process.join(1.0)
+            if process.is_alive():
+                worker.kill()
+                process.join(1.0)
+
+    def _terminate_all(self) -> asyncio.Future:
+        """Hard stop used when the monitor is cancelled (e.g. emergency stop).
+
+        Signals every worker at once and forgets them; joining, killing and
+        releasing their counter slots happens on a worker thread. Returns the
+        future of that cleanup.
+        """
+        for event in self._stop_events.values():
+            event.set()
+        # Pools still starting are reaped by their starter once it sees they were forgotten
+        starting = [id(pool) for pool in self._starting.values()]
+        workers = [worker for pool in self._workers.values() if id(pool) not in starting for worker in pool]
+        for worker in workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        self._workers.clear()
+        self._stop_events.clear()
+        self._coin_started_at.clear()
+        self.start_time = None
+        cleanup = asyncio.ensure_future(self._release_terminated(workers))
+        self._cleanups.add(cleanup)
+        cleanup.add_done_callback(self._cleanups.discard)
+        return cleanup
+
+    async def _release_terminated(self, workers: List[_Worker]):
+        survivors = await asyncio.to_thread(self._join_or_kill, workers)
+        for worker in workers:
+            if worker in survivors:
+                logger.error(f"Mining worker {worker.coin}-{worker.index} survived kill; not reusing its counter slot")
+                continue
+            self.counters.release(worker.slot)
+
+    @staticmethod
+    def _join_or_kill(workers: List[_Worker]) -> List[_Worker]:
+        # A slot may only be reused once its writer is gone, so join (then kill) before releasing
+        deadline = time.monotonic() + TERMINATE_JOIN_SECONDS
+        for worker in workers:
+            if worker.process is not None:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+        survivors = []
+        for worker in workers:
+            process = worker.process
+            if process is not None and process.is_alive():
+                worker.kill()
+                process.join(TERMINATE_JOIN_SECONDS)
+            if process is not None and process.is_alive():
+                survivors.append(worker)
+        return survivors
+
+    def _ensure_monitor(self):
+        if self._monitor is None or self._monitor.done():
+            self._monitor = root_scope.child("crypto_miner").spawn(
+                self._run_monitor(), name="mining-supervisor", kill=self._terminate_all)
+
+    async def _run_monitor(self):
+        try:
+            while self._workers:
+                await self._check_workers()
+                await asyncio.sleep(MONITOR_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            # Shielded so a second cancel can't abandon workers half-released
+            await asyncio.shield(self._terminate_all())
+            raise
+
+    async def _check_workers(self):
+        now = time.monotonic()
+        for coin, pool in list(self._workers.items()):
+            for worker in pool:
+                if worker.next_restart_at is not None:
+                    if now >= worker.next_restart_at and self._workers.get(coin) is pool:
+                        worker.restarts += 1
+                        logger.info(f"Restarting mining worker {coin}-{worker.index} (restart #{worker.restarts})")
+                        await self._spawn(worker, self._stop_events[coin])
+                        if self._workers.get(coin) is not pool:
+                            # The coin was stopped while this worker was starting
+                            await asyncio.to_thread(self._reap, [worker], self.stop_timeout)
+                            break
+                    continue
+                if worker.process is None:
+                    continue
+                if worker.process.is_alive():
+                    continue
+                # Crashed: the stop event isn't set for running coins
+                worker.last_exitcode = worker.process.exitcode
+                if now - worker.started_at >= STABLE_AFTER_SECONDS:
+                    worker.consecutive_crashes = 0
+                backoff = min(RESTART_BACKOFF_MAX_SECONDS,
+                              RESTART_BACKOFF_INITIAL_SECONDS * 2 ** worker.consecutive_crashes)
+                worker.consecutive_crashes += 1
+                worker.next_restart_at = now + backoff
+                logger.warning(f"Mining worker {coin}-{worker.index} exited with {worker.last_exitcode}; "
+                               f"restarting in {backoff:.0f}s")
+
+    async def get_mining_status(self) -> Dict[str, Any]:
+        # One consistent copy of every worker's counters; no IPC with the workers
+        counters = self.counters.snapshot()
+        stale_after = self.report_interval * 3
+        operations = []
+        active_by_algo: Dict[str, int] = {}
+        for coin, pool in self._workers.items():
+            workers = [worker.to_dict(counters.get(worker.slot, {}), stale_after) for worker in pool]
+            algorithm = self.configs[coin].algorithm
+            active_by_algo[algorithm] = active_by_algo.get(algorithm, 0) + 1
+            operations.append({
+                "coin": coin,
+                "algorithm": algorithm,
+                "mode": "miner" if self.configs[coin].command else "benchmark",
+                "is_running": True,
+                "hash_rate": sum(w["hash_rate"] for w in workers),
+                "shares_accepted": sum(w["shares_accepted"] for w in workers),
+                "shares_rejected": sum(w["shares_rejected"] for w in workers),
+                "workers_alive": sum(w["alive"] for w in workers),
+                "workers": workers,
+                "started_at": self._coin_started_at.get(coin),
+            })
+        return {
+            "is_running": self.is_running,
+            "total_hash_rate": sum(op["hash_rate"] for op in operations),
+            "active_miners_by_algo": active_by_algo,
+            "operations": operations,
+            "start_time": self.start_time,
+            "counters": self.counters.stats(),
+        }
+
+    def worker_config(self) -> Dict[str, Any]:
+        return {
+            coin: {"algorithm": config.algorithm, "workers": config.workers, "cpus": config.cpus,
+                   "mode": "miner" if config.command else "benchmark"}
+            for coin, config in self.configs.items()
+        }
@@ -0,0 +1,268 @@
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from typing import Any, Container, Dict, Iterable, List, Optional, Tuple
+
+from .opportunity_index import opportunity_key
+
+DEFAULT_FILTER_CAPACITY = int(os.getenv("NFT_DEDUP_FILTER_CAPACITY", "500000"))
+DEFAULT_ERROR_RATE = float(os.getenv("NFT_DEDUP_ERROR_RATE", "0.01"))
+# When set, overrides the filter capacity: the most keys that fit this many bytes at the error rate
+DEFAULT_FILTER_BYTES = int(os.getenv("NFT_DEDUP_FILTER_BYTES", "0"))
+DEFAULT_LRU_SIZE = int(os.getenv("NFT_DEDUP_LRU_SIZE", "100000"))
+
+CHAIN_FIELDS = ("chain", "network", "blockchain")
+CONTRACT_FIELDS = ("contract_address", "mint_address", "collection_address")
+TOKEN_FIELDS = ("token_id", "mint_id", "mint")
+CHAIN_ALIASES = {
+    "eth": "ethereum",
+    "mainnet": "ethereum",
+    "matic": "polygon",
+    "sol": "solana",
+    "arb": "arbitrum",
+    "op": "optimism",
+}
+
+CanonicalKey = Tuple[str, str, str]
+
+
+def _first(opportunity: Dict[str, Any], fields: Tuple[str, ...]) -> str:
+    for field in fields:
+        value = opportunity.get(field)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return ""
+
+
+def canonical_key(opportunity: Dict[str, Any]) -> Optional[CanonicalKey]:
+    """``(chain, contract, token)`` identifying a drop across sources, or None if it can't be told apart"""
+    chain = _first(opportunity, CHAIN_FIELDS).lower()
+    chain = CHAIN_ALIASES.get(chain, chain)
+    contract = _first(opportunity, CONTRACT_FIELDS)
+    if contract.lower().startswith("0x"):
+        # EVM addresses are case-insensitive (checksummed or not); base58 mints are not
+        contract = contract.lower()
+    elif not contract:
+        contract = str(opportunity.get("collection") or "").strip().lower()
+        if not contract:
+            return None
+    token = _first(opportunity, TOKEN_FIELDS)
+    if token.lower().startswith("0x"):
+        try:
+            token = str(int(token, 16))
+        except ValueError:
+            pass
+    elif token.isdigit():
+        token = str(int(token))
+    return chain, contract, token
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray, using double hashing of one blake2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+
+class RotatingBloomFilter:
+    """Two-generation Bloom filter with bounded memory.
+
+    New keys go into the current generation; once it holds ``capacity``
+    keys the older generation is dropped and a fresh one started, so the
+    filter remembers between ``capacity`` and ``2 * capacity`` of the most
+    recent keys. Each generation is sized at half the error rate, which
+    keeps the combined false-positive rate at about ``error_rate``.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_FILTER_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self._current = BloomFilter(self.capacity, error_rate / 2)
+        self._previous: Optional[BloomFilter] = None
+        self.rotations = 0
+
+    @classmethod
+    def for_memory(cls, max_bytes: int, error_rate: float = DEFAULT_ERROR_RATE) -> "RotatingBloomFilter":
+        """Largest filter whose two generations fit in ``max_bytes``"""
+        bits_per_key = -math.log(error_rate / 2) / math.log(2) ** 2
+        return cls(capacity=int(max_bytes * 8 / 2 / bits_per_key), error_rate=error_rate)
+
+    def add(self, item: str):
+        if self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate / 2)
+            self.rotations += 1
+        self._current.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._current or (self._previous is not None and item in self._previous)
+
+    @property
+    def nbytes(self) -> int:
+        # Both generations are allocated once the filter has rotated
+        return 2 * self._current.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity_per_generation": self.capacity,
+            "error_rate": self.error_rate,
+            "hashes": self._current.hashes,
+            "bits_per_generation": self._current.bits,
+            "memory_bytes": self.nbytes,
+            "current_generation_keys": self._current.count,
+            "rotations": self.rotations,
+        }
+
+
+class OpportunityDeduplicator:
+    """Drops opportunities for a drop another source has already reported.
+
+    Each opportunity is reduced to its canonical ``(chain, contract, token)``
+    key. A miss in the rotating Bloom filter means the drop is new, without
+    touching the LRU. A hit is confirmed in an exact LRU of canonical key →
+    the opportunity that claimed it first. Only a confirmed hit counts as a
+    duplicate, so a filter false positive never hides a new drop. Call
+    ``check()`` before scoring or enrichment. Counters only count an
+    opportunity the first time it is seen for its drop, so re-checking the
+    same listing on every poll doesn't inflate them.
+    """
+
+    def __init__(
+        self,
+        bloom: Optional[RotatingBloomFilter] = None,
+        lru_size: int = DEFAULT_LRU_SIZE,
+    ):
+        if bloom is None:
+            bloom = RotatingBloomFilter.for_memory(DEFAULT_FILTER_BYTES) if DEFAULT_FILTER_BYTES \
+                else RotatingBloomFilter()
+        self.bloom = bloom
+        self.lru_size = lru_size
+        self._owners: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        # Opportunity key -> the drop it was last checked against
+        self._seen: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self.rechecks = 0
+        self.checks = 0
+        self.claims = 0
+        self.duplicates = 0
+        self.uncanonical = 0
+        self.filter_negatives = 0
+        self.filter_unconfirmed = 0
+        self.lru_evictions = 0
+        self.duplicates_by_source: Dict[str, int] = {}
+
+    @staticmethod
+    def _digest(key: CanonicalKey) -> str:
+        return "\x1f".join(key)
+
+    def check(self, opportunity: Dict[str, Any], live: Optional[Container[str]] = None) -> Optional[str]:
+        """Claim the opportunity's drop, returning the key of the opportunity that already owns it.
+
+        Returns None when the drop is new (or can't be canonicalized) and
+        the opportunity's own key when it re-reports a drop it already
+        owns. With ``live``, an owner no longer in it gives up its claim.
+        """
+        key = canonical_key(opportunity)
+        own_key = opportunity_key(opportunity)
+        digest = self._digest(key) if key is not None else None
+        first_seen = self._remember(own_key, digest)
+        if first_seen:
+            self.checks += 1
+        else:
+            self.rechecks += 1
+        if digest is None:
+            if first_seen:
+                self.uncanonical += 1
+            return None
+        if digest not in self.bloom:
+            self.filter_negatives += 1
+            self.bloom.add(digest)
+            self._claim(digest, own_key, opportunity)
+            return None
+
+        owner = self._owners.get(digest)
+        if owner is None:
+            # A filter false positive, or a key that aged out of the LRU but not the filter
+            self.filter_unconfirmed += 1
+        elif owner[0] != own_key and live is not None and owner[0] not in live:
+            owner = None
+        if owner is None:
+            self._claim(digest, own_key, opportunity)
+            return None
+
+        self._owners.move_to_end(digest)
+        if owner[0] != own_key and first_seen:
+            self.duplicates += 1
+            source = opportunity.get("source", "")
+            self.duplicates_by_source[source] = self.duplicates_by_source.get(source, 0) + 1
+        return owner[0]
+
+    def _remember(self, own_key: str, digest: Optional[str]) -> bool:
+        """Record that ``own_key`` was checked against ``digest``; False if that was already known"""
+        first_seen = own_key not in self._seen or self._seen[own_key] != digest
+        self._seen[own_key] = digest
+        self._seen.move_to_end(own_key)
+        if len(self._seen) > self.lru_size:
+            self._seen.popitem(last=False)
+        return first_seen
+
+    def _claim(self, digest: str, own_key: str, opportunity: Dict[str, Any]):
+        self.claims += 1
+        self._owners[digest] = (own_key, opportunity.get("source", ""))
+        self._owners.move_to_end(digest)
+        if len(self._owners) > self.lru_size:
+            self._owners.popitem(last=False)
+            self.lru_evictions += 1
+
+    def filter_new(self, opportunities: Iterable[Dict[str, Any]],
+                   live: Optional[Container[str]] = None) -> List[Dict[str, Any]]:
+        """Opportunities that are new or own their drop, dropping cross-source duplicates"""
+        kept = []
+        for opportunity in opportunities:
+            owner = self.check(opportunity, live)
+            if owner is None or owner == opportunity_key(opportunity):
+                kept.append(opportunity)
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checks": self.checks,
+            "rechecks": self.rechecks,
+            "claims": self.claims,
+            "duplicates": self.duplicates,
+            "duplicate_rate": round(self.duplicates / self.checks, 4) if self.checks else 0,
+            "duplicates_by_source": dict(self.duplicates_by_source),
+            "uncanonical": self.uncanonical,
+            "filter_negatives": self.filter_negatives,
+            "filter_unconfirmed": self.filter_unconfirmed,
+            "lru_size": len(self._owners),
+            "lru_max_size": self.lru_size,
+            "lru_evictions": self.lru_evictions,
+            "filter": self.bloom.stats(),
+        }
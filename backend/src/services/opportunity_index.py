@@ -0,0 +1,287 @@
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_OPPORTUNITIES = int(os.getenv("NFT_INDEX_MAX_OPPORTUNITIES", "50000"))
+DEFAULT_TTL_SECONDS = float(os.getenv("NFT_OPPORTUNITY_TTL_SECONDS", "86400"))
+HIGH_VALUE_SCORE = 8.0
+# Score histogram: one bin per point from 0 to 10, out-of-range scores clamp to the end bins
+HISTOGRAM_BINS = 10
+
+EXPIRY_FIELDS = ("expires_at", "end_time", "deadline")
+
+# (-score, sequence, key): ascending order is best score first, oldest first on ties
+_Entry = Tuple[float, int, str]
+
+
+def opportunity_score(opportunity: Dict[str, Any]) -> float:
+    score = opportunity.get("score", opportunity.get("confidence_score", 0))
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return 0.0
+    # NaN would break the sorted lists' ordering
+    return score if math.isfinite(score) else 0.0
+
+
+def opportunity_key(opportunity: Dict[str, Any]) -> str:
+    """Stable identity for an opportunity within one source"""
+    if opportunity.get("id") is not None:
+        return str(opportunity["id"])
+    parts = (
+        opportunity.get("source", ""),
+        opportunity.get("contract_address") or opportunity.get("collection") or opportunity.get("name", ""),
+        opportunity.get("token_id", ""),
+    )
+    return ":".join(str(part) for part in parts)
+
+
+def opportunity_expiry(opportunity: Dict[str, Any], now: float, ttl: float) -> float:
+    for field in EXPIRY_FIELDS:
+        value = opportunity.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            if not math.isfinite(value):
+                continue
+            return float(value)
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            continue
+    return now + ttl
+
+
+class OpportunityIndex:
+    """Score-ordered index of live NFT opportunities.
+
+    Opportunities live in a dict by key plus bisect-maintained sorted lists
+    of ``(-score, seq, key)``: one overall and one per source. An expiry
+    heap with lazy deletion drops opportunities whose deadline has passed.
+    Upserts, removals and expiry do O(log n) searches. "Top k with score >=
+    t, optionally per source" walks the front of one list and stops at k or
+    at the first score below t, so it never sorts the full set. When the
+    index is full, the lowest-scoring opportunity is evicted.
+
+    Count, score sum, high-value count, per-source counts and a score
+    histogram are updated on every insert and removal, so ``summary()``
+    costs the same however many opportunities are tracked.
+
+    With a ``store`` attached, every insert, changed update and removal is
+    also handed to it for persistence; ``warm_load()`` refills the index
+    from it after a restart. An update that only pushes a sliding expiry
+    forward is persisted once it has moved by 1% of the TTL, so re-reporting
+    the same opportunity doesn't rewrite its row every time.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_OPPORTUNITIES, ttl: float = DEFAULT_TTL_SECONDS, store=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self._items: Dict[str, Tuple[_Entry, Dict[str, Any], float]] = {}
+        self._ranked: List[_Entry] = []
+        self._by_source: Dict[str, List[_Entry]] = {}
+        self._expiry: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        # Warm-loaded keys a mirror sync hasn't reported yet; they leave by expiry, not by sync
+        self._warm_keys: Set[str] = set()
+        self.evicted = 0
+        self.expired = 0
+        self.inserted = 0
+        self._score_sum = 0.0
+        self._high_value = 0
+        self._histogram = [0] * HISTOGRAM_BINS
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(key)
+        return item[1] if item else None
+
+    def upsert(self, opportunity: Dict[str, Any], now: Optional[float] = None,
+               expires_at: Optional[float] = None) -> bool:
+        """Insert or update an opportunity, returning True if it is new"""
+        now = time.time() if now is None else now
+        key = opportunity_key(opportunity)
+        if expires_at is None:
+            expires_at = opportunity_expiry(opportunity, now, self.ttl)
+        if expires_at <= now:
+            self.remove(key)
+            return False
+
+        existing = self._items.get(key)
+        if existing is not None:
+            entry, previous, old_expiry = existing
+            if -entry[0] == opportunity_score(opportunity) and previous.get("source") == opportunity.get("source"):
+                # Same rank: update in place without touching the sorted lists
+                self._items[key] = (entry, opportunity, expires_at)
+                if expires_at != old_expiry:
+                    heapq.heappush(self._expiry, (expires_at, entry[1], key))
+                if self.store is not None and (previous != opportunity or
+                                               abs(expires_at - old_expiry) >= self.ttl * 0.01):
+                    self.store.save(key, opportunity, -entry[0], expires_at)
+                return False
+            self._unlink(key, entry, previous)
+
+        entry = (-opportunity_score(opportunity), next(self._sequence), key)
+        # Aggregates first: nothing is linked yet if accounting fails
+        self._account(-entry[0], 1)
+        self._items[key] = (entry, opportunity, expires_at)
+        bisect.insort(self._ranked, entry)
+        bisect.insort(self._by_source.setdefault(opportunity.get("source", ""), []), entry)
+        heapq.heappush(self._expiry, (expires_at, entry[1], key))
+        if existing is None:
+            self.inserted += 1
+        if self.store is not None:
+            self.store.save(key, opportunity, -entry[0], expires_at)
+        if existing is None and len(self._items) > self.max_size:
+            self._evict_lowest()
+        return existing is None
+
+    def remove(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        self._warm_keys.discard(key)
+        entry, opportunity, _ = item
+        self._unlink(key, entry, opportunity, pop=False)
+        if self.store is not None:
+            self.store.delete(key)
+        return opportunity
+
+    def _unlink(self, key: str, entry: _Entry, opportunity: Dict[str, Any], pop: bool = True):
+        if pop:
+            self._items.pop(key, None)
+        self._discard(self._ranked, entry)
+        self._account(-entry[0], -1)
+        source = opportunity.get("source", "")
+        source_list = self._by_source.get(source)
+        if source_list is not None:
+            self._discard(source_list, entry)
+            if not source_list:
+                del self._by_source[source]
+        # The expiry heap entry is dropped lazily once its sequence no longer matches
+
+    def _account(self, score: float, delta: int):
+        self._score_sum += score * delta
+        if score >= HIGH_VALUE_SCORE:
+            self._high_value += delta
+        self._histogram[min(HISTOGRAM_BINS - 1, max(0, int(score)))] += delta
+
+    @staticmethod
+    def _discard(ranked: List[_Entry], entry: _Entry):
+        position = bisect.bisect_left(ranked, entry)
+        if position < len(ranked) and ranked[position] == entry:
+            del ranked[position]
+
+    def _evict_lowest(self):
+        entry = self._ranked[-1]
+        self.remove(entry[2])
+        self.evicted += 1
+
+    def expire(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Remove every opportunity whose deadline has passed"""
+        now = time.time() if now is None else now
+        removed = []
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, sequence, key = heapq.heappop(self._expiry)
+            item = self._items.get(key)
+            if item is None or item[0][1] != sequence or item[2] != expires_at:
+                continue
+            removed.append(self.remove(key))
+            self.expired += 1
+        if len(self._expiry) > 2 * len(self._items) + 64:
+            # Too many stale heap entries; rebuild from live items
+            self._expiry = [(item[2], item[0][1], key) for key, item in self._items.items()]
+            heapq.heapify(self._expiry)
+        return removed
+
+    def top(self, k: int, min_score: Optional[float] = None, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Best ``k`` opportunities (optionally from one source) with score >= ``min_score``"""
+        ranked = self._ranked if source is None else self._by_source.get(source, [])
+        results = []
+        for neg_score, _, key in ranked:
+            if len(results) >= k or (min_score is not None and -neg_score < min_score):
+                break
+            results.append(self._items[key][1])
+        return results
+
+    def count_at_least(self, min_score: float, source: Optional[str] = None) -> int:
+        ranked = self._ranked if source is None else self._by_source.get(source, [])
+        return bisect.bisect_right(ranked, (-min_score, float("inf"), ""))
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._by_source)
+
+    def sync(self, opportunities: Iterable[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, int]:
+        """Make the index mirror ``opportunities`` (for services that don't feed it).
+
+        Warm-loaded opportunities the service hasn't reported are kept until
+        they expire; once reported, they are mirrored like any other.
+        """
+        now = time.time() if now is None else now
+        seen = set()
+        added = 0
+        for opportunity in opportunities:
+            seen.add(opportunity_key(opportunity))
+            added += self.upsert(opportunity, now)
+        self._warm_keys -= seen
+        removed = [key for key in self._items if key not in seen and key not in self._warm_keys]
+        for key in removed:
+            self.remove(key)
+        self.expire(now)
+        return {"added": added, "removed": len(removed), "size": len(self._items)}
+
+    def warm_load(self, now: Optional[float] = None) -> int:
+        """Fill the index from its store, keeping each opportunity's stored expiry"""
+        if self.store is None:
+            return 0
+        now = time.time() if now is None else now
+        store, self.store = self.store, None
+        try:
+            # Rows are already persisted; don't write them straight back
+            loaded = 0
+            for opportunity, expires_at in store.load(self.max_size, now):
+                if self.upsert(opportunity, now, expires_at):
+                    loaded += 1
+                    self._warm_keys.add(opportunity_key(opportunity))
+        finally:
+            self.store = store
+        return loaded
+
+    def summary(self) -> Dict[str, Any]:
+        """Running aggregates over every tracked opportunity"""
+        count = len(self._items)
+        return {
+            "count": count,
+            "score_sum": round(self._score_sum, 6),
+            "average_score": round(self._score_sum / count, 2) if count else 0,
+            "high_value_count": self._high_value,
+            "per_source": {source: len(ranked) for source, ranked in self._by_source.items()},
+            "score_histogram": {f"{i}-{i + 1}": n for i, n in enumerate(self._histogram)},
+            "lifetime_inserted": self.inserted,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "sources": len(self._by_source),
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "expiry_heap": len(self._expiry),
+            "warm_unconfirmed": len(self._warm_keys),
+        }
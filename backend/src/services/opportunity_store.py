@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.getenv("NFT_STORE_PATH", "data/nft_opportunities.db")
+DEFAULT_BATCH_SIZE = int(os.getenv("NFT_STORE_BATCH_SIZE", "500"))
+DEFAULT_FLUSH_INTERVAL_SECONDS = float(os.getenv("NFT_STORE_FLUSH_SECONDS", "2.0"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nft_opportunities (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    score REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_nft_opportunities_score ON nft_opportunities (score DESC);
+CREATE INDEX IF NOT EXISTS idx_nft_opportunities_source ON nft_opportunities (source, score DESC);
+CREATE INDEX IF NOT EXISTS idx_nft_opportunities_expiry ON nft_opportunities (expires_at);
+"""
+
+UPSERT_OPPORTUNITY = """
+INSERT INTO nft_opportunities (key, source, score, expires_at, updated_at, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    source = excluded.source,
+    score = excluded.score,
+    expires_at = excluded.expires_at,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+# Pending change per key: the row to upsert, or None to delete it
+_Row = Tuple[str, str, float, float, float, str]
+
+
+class OpportunityStore:
+    """SQLite copy of the opportunity index so it survives restarts.
+
+    The index reports every insert, update and removal. Changes are
+    buffered by key, so repeated updates to one opportunity between flushes
+    become a single write. They are written in one transaction per batch,
+    on size or interval, and each batch also prunes expired rows. Flushes
+    run one at a time; a batch that fails to write is merged back under any
+    changes buffered since, so newer values win. ``load()`` returns the
+    best live opportunities for a warm start.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_STORE_PATH,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: Dict[str, Optional[_Row]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._immediate: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.failed_batches = 0
+        self.rows_written = 0
+        self.rows_deleted = 0
+        self.rows_pruned = 0
+        self.batches_written = 0
+        self.rows_loaded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def save(self, key: str, opportunity: Dict[str, Any], score: float, expires_at: float):
+        """Buffer an insert or update; it is written with the next batch"""
+        self._pending[key] = (
+            key,
+            str(opportunity.get("source", "")),
+            score,
+            expires_at,
+            time.time(),
+            json.dumps(opportunity, default=str),
+        )
+        self._schedule_flush(now=len(self._pending) >= self.batch_size)
+
+    def delete(self, key: str):
+        self._pending[key] = None
+        self._schedule_flush(now=len(self._pending) >= self.batch_size)
+
+    async def flush(self) -> int:
+        """Write every buffered change now"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            write = asyncio.ensure_future(asyncio.to_thread(self._write_batch, batch))
+            write.add_done_callback(
+                lambda done: self._restore(batch) if not done.cancelled() and done.exception() else None)
+            # A cancelled flush must not abandon a write the thread may still commit
+            await asyncio.shield(write)
+            return len(batch)
+
+    def _restore(self, batch: Dict[str, Optional[_Row]]):
+        self.failed_batches += 1
+        for key, row in batch.items():
+            # Changes buffered since the batch was taken are newer
+            self._pending.setdefault(key, row)
+
+    def _write_batch(self, batch: Dict[str, Optional[_Row]]):
+        rows = [row for row in batch.values() if row is not None]
+        deleted = [(key,) for key, row in batch.items() if row is None]
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(UPSERT_OPPORTUNITY, rows)
+                conn.executemany("DELETE FROM nft_opportunities WHERE key = ?", deleted)
+                pruned = conn.execute("DELETE FROM nft_opportunities WHERE expires_at <= ?", (time.time(),)).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self.rows_written += len(rows)
+        self.rows_deleted += len(deleted)
+        self.rows_pruned += pruned
+        self.batches_written += 1
+
+    def _schedule_flush(self, now: bool):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. a script); write full batches synchronously
+            if now:
+                batch, self._pending = self._pending, {}
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    self._restore(batch)
+                    raise
+            return
+        if now:
+            # Never cancel the interval flusher: it may be mid-write
+            if self._immediate is None or self._immediate.done():
+                self._immediate = loop.create_task(self._delayed_flush(0))
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._delayed_flush(self.flush_interval))
+
+    async def _delayed_flush(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush NFT opportunity store: {e}")
+
+    def load(self, limit: int, now: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """The ``limit`` best unexpired opportunities as ``(opportunity, expires_at)``"""
+        now = time.time() if now is None else now
+        with self._db_lock:
+            # Expired rows are pruned on every batch, so walking the score index is cheaper than sorting
+            rows = self._connect().execute(
+                "SELECT data, expires_at FROM nft_opportunities INDEXED BY idx_nft_opportunities_score "
+                "WHERE expires_at > ? ORDER BY score DESC LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        loaded = []
+        for data, expires_at in rows:
+            try:
+                loaded.append((json.loads(data), expires_at))
+            except ValueError:
+                logger.warning("Skipping unreadable stored NFT opportunity")
+        self.rows_loaded += len(loaded)
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "buffered": len(self._pending),
+            "rows_written": self.rows_written,
+            "rows_deleted": self.rows_deleted,
+            "rows_pruned": self.rows_pruned,
+            "rows_loaded": self.rows_loaded,
+            "batches_written": self.batches_written,
+            "failed_batches": self.failed_batches,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+    async def close(self):
+        await self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+opportunity_store = OpportunityStore()
@@ -0,0 +1,217 @@
+import logging
+import math
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PositionKey = Tuple[Hashable, ...]
+
+
+def position_key(balance: Dict[str, Any]) -> PositionKey:
+    """Identify a position by network, token symbol and token address.
+
+    Stored keys carry one extra ordinal element to keep duplicate rows apart.
+    """
+    return (
+        balance.get("network", "unknown"),
+        balance.get("token_symbol", "UNKNOWN"),
+        balance.get("token_address"),
+    )
+
+
+class PortfolioAggregates:
+    """Incrementally maintained portfolio rollups.
+
+    Every position change adjusts the totals, per-symbol allocation and
+    per-network distribution in O(1), so the asset tracker endpoints read
+    precomputed values instead of looping over every balance per request.
+    """
+
+    def __init__(self):
+        self._positions: Dict[PositionKey, Dict[str, Any]] = {}
+        self._by_network: Dict[str, Dict[PositionKey, Dict[str, Any]]] = {}
+        self._by_symbol: Dict[str, Dict[PositionKey, None]] = {}
+
+        self.total_usd_value = 0.0
+        self._asset_allocation: Dict[str, float] = {}
+        self._network_distribution: Dict[str, float] = {}
+        # Number of positive contributors behind each rollup entry, so an
+        # entry disappears exactly when the last contributing position does
+        self._symbol_contributors: Dict[str, int] = {}
+        self._network_contributors: Dict[str, int] = {}
+
+        self._synced_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def upsert(self, balance: Dict[str, Any], key: Optional[PositionKey] = None) -> PositionKey:
+        """Add a position or replace an existing one"""
+        key = key if key is not None else position_key(balance) + (0,)
+        previous = self._positions.get(key)
+        if previous is not None:
+            self._apply(previous, -1)
+            self._unindex(key, previous)
+        self._positions[key] = balance
+        self._index(key, balance)
+        self._apply(balance, 1)
+        return key
+
+    def remove(self, key: PositionKey) -> bool:
+        """Remove a position, returning whether it existed"""
+        balance = self._positions.pop(key, None)
+        if balance is None:
+            return False
+        self._apply(balance, -1)
+        self._unindex(key, balance)
+        if not self._positions:
+            # Nothing left to drift against; drop accumulated float error
+            self.total_usd_value = 0.0
+        return True
+
+    def update_price(self, token_symbol: str, price_usd: float) -> int:
+        """Reprice every position of a token, returning how many changed"""
+        keys = list(self._by_symbol.get(token_symbol, ()))
+        for key in keys:
+            balance = dict(self._positions[key])
+            balance["price_usd"] = price_usd
+            balance["balance_usd"] = (balance.get("balance") or 0) * price_usd
+            self.upsert(balance, key)
+        return len(keys)
+
+    def sync(self, balances: List[Dict[str, Any]], version: Optional[int] = None) -> bool:
+        """Bring the store in line with a full balance list.
+
+        ``version`` is the snapshot version the list came from; a version
+        that was already synced is skipped without looking at the list.
+        Returns whether anything changed.
+        """
+        if version is not None and version == self._synced_version:
+            return False
+
+        seen: Dict[PositionKey, int] = {}
+        incoming: Dict[PositionKey, Dict[str, Any]] = {}
+        for balance in balances:
+            base = position_key(balance)
+            # Keep duplicate rows distinct so asset_count matches the source
+            ordinal = seen.get(base, 0)
+            seen[base] = ordinal + 1
+            incoming[base + (ordinal,)] = balance
+
+        changed = False
+        for key in [key for key in self._positions if key not in incoming]:
+            changed = self.remove(key) or changed
+        for key, balance in incoming.items():
+            if self._positions.get(key) != balance:
+                # Store a copy so later in-place edits by the service show up as a diff
+                self.upsert(dict(balance), key)
+                changed = True
+
+        self._synced_version = version
+        return changed
+
+    @property
+    def asset_count(self) -> int:
+        return len(self._positions)
+
+    @property
+    def network_count(self) -> int:
+        return len(self._by_network)
+
+    @property
+    def networks(self) -> List[str]:
+        return list(self._by_network.keys())
+
+    @property
+    def asset_allocation(self) -> Dict[str, float]:
+        return dict(self._asset_allocation)
+
+    @property
+    def network_distribution(self) -> Dict[str, float]:
+        return dict(self._network_distribution)
+
+    def by_network(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {network: list(positions.values()) for network, positions in self._by_network.items()}
+
+    def recompute(self) -> Dict[str, Any]:
+        """Rebuild every rollup from scratch with the original per-request loops"""
+        balances = list(self._positions.values())
+        asset_allocation: Dict[str, float] = {}
+        network_distribution: Dict[str, float] = {}
+        for balance in balances:
+            usd_value = balance.get("balance_usd", 0) or 0
+            if usd_value > 0:
+                symbol = balance.get("token_symbol", "UNKNOWN")
+                network = balance.get("network", "unknown")
+                asset_allocation[symbol] = asset_allocation.get(symbol, 0) + usd_value
+                network_distribution[network] = network_distribution.get(network, 0) + usd_value
+        return {
+            "total_usd_value": sum(b.get("balance_usd", 0) for b in balances if b.get("balance_usd")),
+            "asset_allocation": asset_allocation,
+            "network_distribution": network_distribution,
+            "networks": sorted(set(b.get("network", "unknown") for b in balances)),
+        }
+
+    def verify(self, rel_tol: float = 1e-9, abs_tol: float = 1e-6) -> List[str]:
+        """Compare the incremental rollups against a full recompute.
+
+        Returns a list of human readable mismatches; empty means consistent.
+        """
+        expected = self.recompute()
+        mismatches = []
+
+        def close(a: float, b: float) -> bool:
+            return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+        if not close(self.total_usd_value, expected["total_usd_value"]):
+            mismatches.append(f"total_usd_value {self.total_usd_value} != {expected['total_usd_value']}")
+        for name, actual in (
+            ("asset_allocation", self._asset_allocation),
+            ("network_distribution", self._network_distribution),
+        ):
+            wanted = expected[name]
+            if actual.keys() != wanted.keys():
+                mismatches.append(f"{name} keys {sorted(actual)} != {sorted(wanted)}")
+                continue
+            for label, value in wanted.items():
+                if not close(actual[label], value):
+                    mismatches.append(f"{name}[{label}] {actual[label]} != {value}")
+        if sorted(self._by_network) != expected["networks"]:
+            mismatches.append(f"networks {sorted(self._by_network)} != {expected['networks']}")
+        return mismatches
+
+    def _index(self, key: PositionKey, balance: Dict[str, Any]):
+        self._by_network.setdefault(balance.get("network", "unknown"), {})[key] = balance
+        self._by_symbol.setdefault(balance.get("token_symbol", "UNKNOWN"), {})[key] = None
+
+    def _unindex(self, key: PositionKey, balance: Dict[str, Any]):
+        network = balance.get("network", "unknown")
+        positions = self._by_network[network]
+        del positions[key]
+        if not positions:
+            del self._by_network[network]
+
+        symbol = balance.get("token_symbol", "UNKNOWN")
+        keys = self._by_symbol[symbol]
+        del keys[key]
+        if not keys:
+            del self._by_symbol[symbol]
+
+    def _apply(self, balance: Dict[str, Any], sign: int):
+        usd_value = balance.get("balance_usd", 0) or 0
+        self.total_usd_value += sign * usd_value
+        if usd_value > 0:
+            self._adjust(self._asset_allocation, self._symbol_contributors,
+                         balance.get("token_symbol", "UNKNOWN"), sign, usd_value)
+            self._adjust(self._network_distribution, self._network_contributors,
+                         balance.get("network", "unknown"), sign, usd_value)
+
+    @staticmethod
+    def _adjust(totals: Dict[str, float], contributors: Dict[str, int], label: str, sign: int, usd_value: float):
+        count = contributors.get(label, 0) + sign
+        if count <= 0:
+            contributors.pop(label, None)
+            totals.pop(label, None)
+        else:
+            contributors[label] = count
+            totals[label] = totals.get(label, 0) + sign * usd_value
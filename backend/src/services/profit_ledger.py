@@ -0,0 +1,445 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Protocol, Tuple, runtime_checkable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_PATH = os.getenv("PROFIT_LEDGER_PATH", "data/profit_ledger.db")
+DEFAULT_BATCH_SIZE = int(os.getenv("PROFIT_LEDGER_BATCH_SIZE", "100"))
+DEFAULT_FLUSH_INTERVAL_SECONDS = float(os.getenv("PROFIT_LEDGER_FLUSH_SECONDS", "2.0"))
+DEFAULT_EARNINGS_POLL_SECONDS = float(os.getenv("PROFIT_EARNINGS_POLL_SECONDS", "30"))
+
+MINING = "mining"
+NFT = "nft"
+CONTRACT = "smart_contracts"
+TRANSFER = "transfer"
+SOURCES = (MINING, NFT, CONTRACT, TRANSFER)
+
+HOUR = 3600
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profit_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    amount REAL NOT NULL,
+    currency TEXT,
+    amount_usd REAL NOT NULL DEFAULT 0,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_profit_events_ts ON profit_events (ts);
+CREATE TABLE IF NOT EXISTS profit_rollups (
+    granularity INTEGER NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    event_count INTEGER NOT NULL,
+    amount_usd REAL NOT NULL,
+    PRIMARY KEY (granularity, bucket_start, source)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO profit_rollups (granularity, bucket_start, source, event_count, amount_usd)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (granularity, bucket_start, source) DO UPDATE SET
+    event_count = event_count + excluded.event_count,
+    amount_usd = amount_usd + excluded.amount_usd
+"""
+
+
+class ProfitLedger:
+    """Append-only SQLite ledger of profit events with hourly/daily rollups.
+
+    Events are buffered and written in batches (on size or interval). Each
+    batch updates the hourly and daily rollup rows in the same transaction.
+    A report for any window reads the whole days and hours inside it from
+    the rollup tables, and only the ragged edges from the indexed event
+    table. The database runs in WAL mode so reports don't block writers.
+    Flushes run one at a time, and a batch that fails to write goes back
+    to the front of the buffer for the next attempt.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_LEDGER_PATH,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._buffer: List[Tuple[float, str, float, Optional[str], float, Optional[str]]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._immediate: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.events_written = 0
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.rejected_events = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(
+        self,
+        source: str,
+        amount: float,
+        currency: Optional[str] = None,
+        amount_usd: Optional[float] = None,
+        ts: Optional[float] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """Buffer one profit event; it is written with the next batch"""
+        if source not in SOURCES:
+            raise ValueError(f"Unknown profit source: {source}")
+        if not math.isfinite(amount) or (amount_usd is not None and not math.isfinite(amount_usd)):
+            raise ValueError(f"Profit amounts must be finite, got {amount} ({amount_usd} USD)")
+        self._buffer.append((
+            ts if ts is not None else time.time(),
+            source,
+            amount,
+            currency,
+            amount_usd if amount_usd is not None else 0.0,
+            json.dumps(metadata, default=str) if metadata else None,
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self._schedule_flush(now=True)
+        else:
+            self._schedule_flush(now=False)
+
+    async def flush(self) -> int:
+        """Write every buffered event now"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            write = asyncio.ensure_future(asyncio.to_thread(self._write_batch, batch))
+
+            def restore_on_failure(done: asyncio.Future):
+                if not done.cancelled() and done.exception() is not None:
+                    self._restore(batch, done.exception())
+
+            write.add_done_callback(restore_on_failure)
+            # A cancelled flush must not abandon a write the thread may still commit
+            try:
+                await asyncio.shield(write)
+            except sqlite3.IntegrityError:
+                # Dropped by _restore; later events and reports carry on
+                return 0
+            return len(batch)
+
+    def _restore(self, batch, error: BaseException):
+        self.failed_batches += 1
+        if isinstance(error, sqlite3.IntegrityError):
+            # Retrying can't fix a batch the schema refuses; keeping it would block every later flush
+            self.rejected_events += len(batch)
+            logger.error(f"Dropped {len(batch)} profit events the ledger rejected: {error}")
+            return
+        self._buffer[:0] = batch
+
+    def _write_batch(self, batch):
+        rollups: Dict[Tuple[int, int, str], List[float]] = {}
+        for ts, source, _, _, amount_usd, _ in batch:
+            for granularity in (HOUR, DAY):
+                key = (granularity, int(ts // granularity * granularity), source)
+                totals = rollups.setdefault(key, [0, 0.0])
+                totals[0] += 1
+                totals[1] += amount_usd
+
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO profit_events (ts, source, amount, currency, amount_usd, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+                conn.executemany(UPSERT_ROLLUP, [key + tuple(totals) for key, totals in rollups.items()])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self.events_written += len(batch)
+        self.batches_written += 1
+
+    def _schedule_flush(self, now: bool):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. a script); write full batches synchronously
+            if now:
+                batch, self._buffer = self._buffer, []
+                try:
+                    self._write_batch(batch)
+                except sqlite3.IntegrityError as e:
+                    self._restore(batch, e)
+                except Exception as e:
+                    self._restore(batch, e)
+                    raise
+            return
+        if now:
+            # Never cancel the interval flusher: it may be mid-write
+            if self._immediate is None or self._immediate.done():
+                self._immediate = loop.create_task(self._delayed_flush(0))
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._delayed_flush(self.flush_interval))
+
+    async def _delayed_flush(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush profit ledger: {e}")
+
+    async def report(self, start: float, end: float) -> Dict[str, Any]:
+        """Profit totals for ``start <= ts < end`` from rollups plus raw edges"""
+        await self.flush()
+        rows = await asyncio.to_thread(self._read_window, start, end)
+        breakdown = {source: 0.0 for source in SOURCES}
+        counts = {source: 0 for source in SOURCES}
+        for source, event_count, amount_usd in rows:
+            breakdown[source] += amount_usd or 0.0
+            counts[source] += event_count
+        transferred = breakdown.pop(TRANSFER)
+        return {
+            "window": {
+                "start": datetime.fromtimestamp(start).isoformat(),
+                "end": datetime.fromtimestamp(end).isoformat(),
+                "hours": round((end - start) / HOUR, 3),
+            },
+            # Transfers move profit rather than create it
+            "total_profits": sum(breakdown.values()),
+            "breakdown": breakdown,
+            "transferred_to_exodus": transferred,
+            "event_counts": counts,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    async def series(self, start: float, end: float, granularity: int = HOUR) -> List[Dict[str, Any]]:
+        """Per-bucket totals straight from one rollup table"""
+        await self.flush()
+        rows = await asyncio.to_thread(self._read_series, start, end, granularity)
+        buckets: Dict[int, Dict[str, Any]] = {}
+        for bucket_start, source, event_count, amount_usd in rows:
+            bucket = buckets.setdefault(bucket_start, {
+                "bucket_start": datetime.fromtimestamp(bucket_start).isoformat(),
+                "breakdown": {}, "event_count": 0,
+            })
+            bucket["breakdown"][source] = amount_usd
+            bucket["event_count"] += event_count
+        return [buckets[key] for key in sorted(buckets)]
+
+    def _read_window(self, start: float, end: float) -> List[Tuple[str, int, float]]:
+        """Split [start, end) into raw edges, whole hours and whole days"""
+        first_hour = -(-start // HOUR) * HOUR
+        last_hour = end // HOUR * HOUR
+        with self._db_lock:
+            conn = self._connect()
+            if first_hour >= last_hour:
+                return self._raw(conn, start, end)
+            first_day = -(-first_hour // DAY) * DAY
+            last_day = last_hour // DAY * DAY
+            rows = self._raw(conn, start, first_hour) + self._raw(conn, last_hour, end)
+            if first_day < last_day:
+                rows += self._rollup(conn, HOUR, first_hour, first_day)
+                rows += self._rollup(conn, DAY, first_day, last_day)
+                rows += self._rollup(conn, HOUR, last_day, last_hour)
+            else:
+                rows += self._rollup(conn, HOUR, first_hour, last_hour)
+            return rows
+
+    def _read_series(self, start: float, end: float, granularity: int):
+        with self._db_lock:
+            return self._connect().execute(
+                "SELECT bucket_start, source, event_count, amount_usd FROM profit_rollups "
+                "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? ORDER BY bucket_start",
+                (granularity, int(start // granularity * granularity), end),
+            ).fetchall()
+
+    @staticmethod
+    def _raw(conn: sqlite3.Connection, start: float, end: float):
+        if start >= end:
+            return []
+        return conn.execute(
+            "SELECT source, COUNT(*), SUM(amount_usd) FROM profit_events WHERE ts >= ? AND ts < ? GROUP BY source",
+            (start, end),
+        ).fetchall()
+
+    @staticmethod
+    def _rollup(conn: sqlite3.Connection, granularity: int, start: float, end: float):
+        if start >= end:
+            return []
+        return conn.execute(
+            "SELECT source, SUM(event_count), SUM(amount_usd) FROM profit_rollups "
+            "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? GROUP BY source",
+            (granularity, int(start), int(end)),
+        ).fetchall()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "buffered": len(self._buffer),
+            "events_written": self.events_written,
+            "batches_written": self.batches_written,
+            "failed_batches": self.failed_batches,
+            "rejected_events": self.rejected_events,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+    async def close(self):
+        await self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EarningsTracker:
+    """Turns a service's running earnings totals into ledger events.
+
+    Miner services report cumulative totals (an operation's
+    ``earnings_total``) rather than individual payouts. Each increase since
+    the previous observation of the same key is recorded as one event. The
+    first observation only sets the baseline, because it was earned before
+    anyone watched, and a total that goes down (a restarted miner) starts a
+    new baseline.
+
+    Totals are in the earning currency, not USD. An increase is recorded as
+    that native amount; ``amount_usd`` is only set when a USD price for the
+    currency is known at observation time.
+
+    ``attach()`` polls a reader coroutine on the tracker's own loop, so
+    recording doesn't depend on any other poller being active.
+    """
+
+    def __init__(self, ledger: ProfitLedger, source: str, interval: float = DEFAULT_EARNINGS_POLL_SECONDS):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown profit source: {source}")
+        self.ledger = ledger
+        self.source = source
+        self.interval = interval
+        self._totals: Dict[str, float] = {}
+        self._reader: Optional[Callable[[], Awaitable[Iterable[Dict[str, Any]]]]] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def observe(self, key: str, total: float, currency: Optional[str] = None, price_usd: Optional[float] = None,
+                metadata: Optional[Dict[str, Any]] = None) -> float:
+        """Record the increase of ``key``'s total; returns the recorded native amount"""
+        if not math.isfinite(total):
+            # Not a reading; keep the previous baseline
+            return 0.0
+        previous = self._totals.get(key)
+        self._totals[key] = total
+        if previous is None or total <= previous:
+            return 0.0
+        earned = total - previous
+        amount_usd = earned * price_usd if price_usd is not None and math.isfinite(price_usd) else None
+        self.ledger.record(self.source, earned, currency=currency, amount_usd=amount_usd, metadata=metadata)
+        return earned
+
+    def attach(self, reader: Callable[[], Awaitable[Iterable[Dict[str, Any]]]]):
+        """Poll ``reader`` every interval and observe each reading it returns.
+
+        A reading is a dict with ``key`` and ``total``, plus optional
+        ``currency``, ``price_usd`` and ``metadata``.
+        """
+        self._reader = reader
+        self.ensure_running()
+
+    def detach(self):
+        self._reader = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def ensure_running(self):
+        if self._reader is None or (self._poller is not None and not self._poller.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Attached during synchronous startup; started by the startup hook
+            return
+        self._poller = loop.create_task(self._run(), name=f"{self.source}-earnings")
+
+    async def _run(self):
+        while self._reader is not None:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to read {self.source} earnings: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def poll_once(self) -> float:
+        """Observe one round of readings; returns the native amount recorded"""
+        recorded = 0.0
+        for reading in await self._reader():
+            recorded += self.observe(str(reading["key"]), float(reading["total"]), currency=reading.get("currency"),
+                                     price_usd=reading.get("price_usd"), metadata=reading.get("metadata"))
+        return recorded
+
+
+def record_outcome(ledger: ProfitLedger, source: str, result: Any,
+                   metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """Record the profit an action reports in its result, if any.
+
+    Reads ``profit_usd`` (required) plus optional ``profit`` and
+    ``currency`` from a result dict; results without a positive
+    ``profit_usd`` record nothing.
+    """
+    if not isinstance(result, dict):
+        return False
+    try:
+        amount_usd = float(result.get("profit_usd") or 0)
+    except (TypeError, ValueError):
+        return False
+    if not math.isfinite(amount_usd) or amount_usd <= 0:
+        return False
+    try:
+        amount = float(result["profit"])
+    except (KeyError, TypeError, ValueError):
+        amount = amount_usd
+    if not math.isfinite(amount):
+        amount = amount_usd
+    ledger.record(source, amount, currency=result.get("currency") or "USD", amount_usd=amount_usd, metadata=metadata)
+    return True
+
+
+@runtime_checkable
+class RecordsOwnProfits(Protocol):
+    """A service whose profits happen inside it (payouts, claims), out of sight of the routes.
+
+    Such a service opts in by declaring a ``profit_ledger`` attribute; the
+    routes set it to the shared ledger and the service records its own
+    events there. Services that don't are recorded at the route layer.
+    """
+
+    profit_ledger: Optional[ProfitLedger]
+
+
+profit_ledger = ProfitLedger()
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = float(os.getenv("WALLET_STATUS_TTL_SECONDS", "5"))
+DEFAULT_STALE_SECONDS = float(os.getenv("WALLET_STATUS_STALE_SECONDS", "30"))
+
+
+class SnapshotCache:
+    """Single-flight, TTL-cached snapshot of an async fetch.
+
+    Concurrent callers share one in-flight fetch. A value younger than ``ttl``
+    is served as-is; within the following ``stale_while_revalidate`` window
+    the old value is served while one background refresh runs. Each
+    ``invalidate()`` starts a new generation; a fetch begun in an older one
+    still answers its own waiters but never lands in the cache. A failed
+    fetch is kept in ``last_error`` until the next successful one, so health
+    checks can tell a stale value from a fresh one.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float = DEFAULT_TTL_SECONDS,
+        stale_while_revalidate: float = DEFAULT_STALE_SECONDS,
+        name: str = "snapshot",
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.name = name
+
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._generation = 0
+        self.version = 0
+        self._etag: Optional[str] = None
+        self._etag_version = -1
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.discarded = 0
+        self.last_error: Optional[str] = None
+        self._last_error_at: Optional[float] = None
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    @property
+    def last_error_age(self) -> Optional[float]:
+        if self._last_error_at is None:
+            return None
+        return time.monotonic() - self._last_error_at
+
+    async def get(self) -> Any:
+        """Return the cached value, fetching it at most once concurrently"""
+        age = self.age
+        if age is not None:
+            if age < self.ttl:
+                self.hits += 1
+                return self._value
+            if age < self.ttl + self.stale_while_revalidate:
+                self.stale_hits += 1
+                if self._inflight is None:
+                    self.refreshes += 1
+                    self._start_fetch()
+                return self._value
+
+        if self._inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight)
+
+        self.misses += 1
+        return await asyncio.shield(self._start_fetch())
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Content hash of the current value, computed once per fetched version"""
+        if self._fetched_at is None:
+            return None
+        if self._etag_version != self.version:
+            payload = json.dumps(self._value, sort_keys=True, default=str).encode()
+            self._etag = hashlib.blake2b(payload, digest_size=12).hexdigest()
+            self._etag_version = self.version
+        return self._etag
+
+    def invalidate(self):
+        """Drop the cached value so the next caller fetches fresh data"""
+        self._generation += 1
+        self._fetched_at = None
+        self._value = None
+        # Callers from here on must not coalesce onto a fetch that began before the change
+        self._inflight = None
+
+    def _start_fetch(self) -> asyncio.Future:
+        future = asyncio.ensure_future(self._run_fetch(self._generation))
+        self._inflight = future
+        future.add_done_callback(self._fetch_done)
+        return future
+
+    async def _run_fetch(self, generation: int) -> Any:
+        try:
+            value = await self._fetch()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e) or type(e).__name__
+            self._last_error_at = time.monotonic()
+            raise
+        self.last_error = None
+        self._last_error_at = None
+        if generation != self._generation:
+            # Invalidated mid-fetch: the value may predate the change
+            self.discarded += 1
+            return value
+        self._value = value
+        self._fetched_at = time.monotonic()
+        self.version += 1
+        return value
+
+    def _fetch_done(self, future: asyncio.Future):
+        if self._inflight is future:
+            self._inflight = None
+        self._consume_error(future)
+
+    def _consume_error(self, future: asyncio.Future):
+        # Background refreshes have no awaiter; log instead of leaking
+        # "exception was never retrieved" warnings.
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"{self.name} refresh failed: {future.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "discarded": self.discarded,
+            "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "version": self.version,
+            "etag": self._etag if self._etag_version == self.version else None,
+            "age_seconds": round(self.age, 3) if self.age is not None else None,
+            "ttl_seconds": self.ttl,
+            "stale_while_revalidate_seconds": self.stale_while_revalidate,
+            "in_flight": self._inflight is not None,
+            "last_error": self.last_error,
+            "last_error_age_seconds": round(self.last_error_age, 3) if self.last_error_age is not None else None,
+        }
+
+
+# Shared per service instance so every router sees the same snapshot. The
+# service is kept alongside its snapshot so a recycled id() can't alias it.
+_wallet_snapshots: Dict[int, Tuple[Any, SnapshotCache]] = {}
+
+
+def get_wallet_snapshot(service) -> SnapshotCache:
+    """Get the shared wallet status snapshot for a wallet manager service"""
+    entry = _wallet_snapshots.get(id(service))
+    if entry is None or entry[0] is not service:
+        entry = (service, SnapshotCache(service.get_wallet_status, name="wallet_status"))
+        _wallet_snapshots[id(service)] = entry
+    return entry[1]
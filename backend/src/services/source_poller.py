@@ -0,0 +1,362 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import aiohttp
+
+from .cancel_scope import root_scope
+from .fanout import bounded_gather
+from .opportunity_index import opportunity_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCES_PATH = os.getenv("NFT_SOURCES_PATH", "data/nft_sources.json")
+DEFAULT_POLL_INTERVAL_SECONDS = float(os.getenv("NFT_POLL_INTERVAL_SECONDS", "30"))
+DEFAULT_MIN_INTERVAL_SECONDS = float(os.getenv("NFT_POLL_MIN_INTERVAL_SECONDS", "5"))
+DEFAULT_MAX_INTERVAL_SECONDS = float(os.getenv("NFT_POLL_MAX_INTERVAL_SECONDS", "300"))
+DEFAULT_RATE_PER_SECOND = float(os.getenv("NFT_SOURCE_RATE_PER_SECOND", "1"))
+DEFAULT_BURST = int(os.getenv("NFT_SOURCE_BURST", "5"))
+DEFAULT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("NFT_SOURCE_TIMEOUT_SECONDS", "10"))
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("NFT_SOURCE_MAX_CONNECTIONS", "32"))
+
+# Adaptive interval: shrink while a source keeps changing, grow while it doesn't, back off on errors
+CHANGED_FACTOR = 0.5
+UNCHANGED_FACTOR = 1.25
+ERROR_FACTOR = 2.0
+
+ItemsCallback = Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]
+RemovedCallback = Callable[[str, List[str]], Awaitable[Any]]
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # The lock queues waiters so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+                self._refill(time.monotonic())
+            self._tokens -= 1
+
+
+@dataclass
+class SourceConfig:
+    name: str
+    url: str
+    interval: float = DEFAULT_POLL_INTERVAL_SECONDS
+    min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS
+    max_interval: float = DEFAULT_MAX_INTERVAL_SECONDS
+    rate: float = DEFAULT_RATE_PER_SECOND
+    burst: int = DEFAULT_BURST
+    pages: int = 1
+    page_param: str = "page"
+    items_field: Optional[str] = "items"
+    headers: Dict[str, str] = field(default_factory=dict)
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def page_params(self, page: int) -> Dict[str, Any]:
+        if self.pages <= 1:
+            return dict(self.params)
+        return {**self.params, self.page_param: page}
+
+
+def load_sources(path: str = DEFAULT_SOURCES_PATH) -> List[SourceConfig]:
+    """Source configs from a JSON file of ``{name: {"url", ...}}``; empty if it doesn't exist or is invalid"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path) as f:
+            return [SourceConfig(name=name, **values) for name, values in json.load(f).items()]
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        # A bad config disables polling instead of failing service setup
+        logger.error(f"Failed to load NFT sources from {path}: {e}")
+        return []
+
+
+class _PageState:
+    __slots__ = ("etag", "last_modified", "body_hash", "keys")
+
+    def __init__(self):
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.body_hash: Optional[str] = None
+        # Opportunity keys the page listed when it last changed
+        self.keys: Set[str] = set()
+
+
+class _SourceState:
+    def __init__(self, config: SourceConfig):
+        self.config = config
+        self.bucket = TokenBucket(config.rate, config.burst)
+        self.interval = config.interval
+        self.pages: Dict[int, _PageState] = {}
+        self.retry_after = 0.0
+        self.polls = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged_body = 0
+        self.changed = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.items = 0
+        self.removed = 0
+        self.last_polled_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.latency_ms_total = 0.0
+        self.latency_ms_last = 0.0
+
+    def adapt(self, changed: bool, failed: bool):
+        config = self.config
+        if failed:
+            factor = ERROR_FACTOR
+        else:
+            factor = CHANGED_FACTOR if changed else UNCHANGED_FACTOR
+        self.interval = min(config.max_interval, max(config.min_interval, self.interval * factor))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.config.url,
+            "interval_seconds": round(self.interval, 2),
+            "polls": self.polls,
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged_body": self.unchanged_body,
+            "changed": self.changed,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "items": self.items,
+            "removed": self.removed,
+            "rate_limit_wait_seconds": round(self.bucket.waited_seconds, 3),
+            "latency_ms": {
+                "last": round(self.latency_ms_last, 2),
+                "avg": round(self.latency_ms_total / self.requests, 2) if self.requests else 0.0,
+            },
+            "last_polled_at": self.last_polled_at,
+            "last_error": self.last_error,
+        }
+
+
+def _retry_after_seconds(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SourcePoller:
+    """Polls NFT sources concurrently over one pooled aiohttp session.
+
+    Each source runs its own loop in the ``nft_hunter`` task scope. Every
+    request takes a token from that source's bucket first. Each page keeps
+    its ETag and Last-Modified, so unchanged pages come back as 304 and are
+    skipped; a body hash catches servers that ignore conditional headers.
+    The poll interval halves while a source keeps changing and grows 25%
+    per unchanged poll, within the source's bounds. It doubles on errors
+    and honours ``Retry-After`` on 429/503. Items from changed pages are
+    passed to ``on_items(source, items)``. After a complete poll, keys a
+    changed page used to list that no page lists any more are passed to
+    ``on_removed(source, keys)``.
+    """
+
+    def __init__(
+        self,
+        sources: List[SourceConfig],
+        on_items: Optional[ItemsCallback] = None,
+        on_removed: Optional[RemovedCallback] = None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        session: Optional[aiohttp.ClientSession] = None,
+    ):
+        self.on_items = on_items
+        self.on_removed = on_removed
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._states: Dict[str, _SourceState] = {source.name: _SourceState(source) for source in sources}
+        self._session = session
+        self._owns_session = session is None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def sources(self) -> Dict[str, SourceConfig]:
+        return {name: state.config for name, state in self._states.items()}
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks.values())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._owns_session = True
+        return self._session
+
+    def start(self):
+        scope = root_scope.child("nft_hunter")
+        for name in self._states:
+            task = self._tasks.get(name)
+            if task is None or task.done():
+                self._tasks[name] = scope.spawn(self._run(name), name=f"nft-source-{name}")
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _run(self, name: str):
+        state = self._states[name]
+        while True:
+            try:
+                await self.poll_source(name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Polling NFT source {name} failed: {e}")
+            await asyncio.sleep(max(state.interval, state.retry_after))
+
+    async def poll_all(self) -> Dict[str, Dict[str, Any]]:
+        """Poll every source once, concurrently"""
+        outcomes = await bounded_gather(list(self._states), self.poll_source, concurrency=len(self._states) or 1)
+        return {name: outcome.get("result", {"error": outcome.get("error")}) for name, outcome in outcomes.items()}
+
+    async def poll_source(self, name: str) -> Dict[str, Any]:
+        """Fetch every page of one source, returning what changed"""
+        state = self._states[name]
+        config = state.config
+        state.polls += 1
+        state.retry_after = 0.0
+        items: List[Dict[str, Any]] = []
+        changed_pages = 0
+        failed = False
+        previous_keys: Set[str] = set()
+        for page in range(1, config.pages + 1):
+            if page in state.pages:
+                previous_keys |= state.pages[page].keys
+            try:
+                page_items = await self._fetch_page(state, page)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.errors += 1
+                state.last_error = str(e)
+                failed = True
+                logger.warning(f"NFT source {name} page {page} failed: {e}")
+                break
+            if page_items is not None:
+                changed_pages += 1
+                items.extend(page_items)
+        state.last_polled_at = time.time()
+        state.adapt(changed=changed_pages > 0, failed=failed)
+
+        removed: List[str] = []
+        if changed_pages and not failed:
+            # Only a complete poll can tell a vanished item from one that moved to an unfetched page
+            listed = set().union(*(state.pages[page].keys for page in range(1, config.pages + 1)
+                                   if page in state.pages))
+            removed = sorted(previous_keys - listed)
+        if items:
+            state.items += len(items)
+            if self.on_items is not None:
+                await self.on_items(name, items)
+        if removed:
+            state.removed += len(removed)
+            if self.on_removed is not None:
+                await self.on_removed(name, removed)
+        return {
+            "changed_pages": changed_pages,
+            "items": len(items),
+            "removed": len(removed),
+            "failed": failed,
+            "next_poll_seconds": round(max(state.interval, state.retry_after), 2),
+        }
+
+    async def _fetch_page(self, state: _SourceState, page: int) -> Optional[List[Dict[str, Any]]]:
+        """Items on the page, or None if it hasn't changed since the last poll"""
+        config = state.config
+        validators = state.pages.setdefault(page, _PageState())
+        headers = dict(config.headers)
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+
+        await state.bucket.acquire()
+        started = time.perf_counter()
+        state.requests += 1
+        try:
+            async with self._get_session().get(config.url, params=config.page_params(page), headers=headers) as response:
+                if response.status == 304:
+                    state.not_modified += 1
+                    return None
+                if response.status in (429, 503):
+                    state.rate_limited += 1
+                    state.retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                response.raise_for_status()
+                body = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        finally:
+            state.latency_ms_last = (time.perf_counter() - started) * 1000
+            state.latency_ms_total += state.latency_ms_last
+
+        validators.etag = etag
+        validators.last_modified = last_modified
+        body_hash = hashlib.sha1(body).hexdigest()
+        if body_hash == validators.body_hash:
+            state.unchanged_body += 1
+            return None
+        validators.body_hash = body_hash
+        state.changed += 1
+
+        payload = json.loads(body)
+        if isinstance(payload, dict):
+            payload = payload.get(config.items_field, []) if config.items_field else [payload]
+        items = [item for item in payload if isinstance(item, dict)]
+        for item in items:
+            item.setdefault("source", config.name)
+        validators.keys = {opportunity_key(item) for item in items}
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "session_open": self._session is not None and not self._session.closed,
+            "max_connections": self.max_connections,
+            "sources": {name: state.stats() for name, state in self._states.items()},
+        }
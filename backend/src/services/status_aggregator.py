@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .snapshot_cache import SnapshotCache, get_wallet_snapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("AUTOMATION_STATUS_TIMEOUT_SECONDS", "1.0"))
+DEFAULT_CACHE_TTL_SECONDS = float(os.getenv("AUTOMATION_STATUS_CACHE_SECONDS", "1.0"))
+
+
+class StatusAggregator:
+    """Collects named subsystem statuses concurrently under a time budget.
+
+    Each collector gets its own timeout. A collector that is slow or failing
+    is reported with its last-known value marked stale; its call keeps
+    running in the background and refreshes the last-known value when it
+    finishes, and later collections join it instead of piling up calls.
+    """
+
+    def __init__(
+        self,
+        collectors: Dict[str, Callable[[], Awaitable[Any]]],
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self.collectors = collectors
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._last_known: Dict[str, Tuple[Any, float]] = {}
+
+    async def collect(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self.collectors)
+        results = await asyncio.gather(*(self._collect_one(name) for name in names))
+        return dict(zip(names, results))
+
+    async def _collect_one(self, name: str) -> Dict[str, Any]:
+        future = self._inflight.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self.collectors[name]())
+            self._inflight[name] = future
+            future.add_done_callback(lambda done, name=name: self._on_done(name, done))
+
+        timeout = self.timeouts.get(name, self.default_timeout)
+        try:
+            value = await asyncio.wait_for(asyncio.shield(future), timeout)
+            return {"value": value, "stale": False, "age_seconds": 0.0}
+        except asyncio.TimeoutError:
+            return self._stale(name, f"Timed out after {timeout}s")
+        except Exception as e:
+            return self._stale(name, str(e))
+
+    def _stale(self, name: str, error: str) -> Dict[str, Any]:
+        value, collected_at = self._last_known.get(name, (None, None))
+        return {
+            "value": value,
+            "stale": True,
+            "age_seconds": round(time.monotonic() - collected_at, 3) if collected_at is not None else None,
+            "error": error,
+        }
+
+    def _on_done(self, name: str, future: asyncio.Future):
+        if self._inflight.get(name) is future:
+            del self._inflight[name]
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.warning(f"Status collector {name} failed: {future.exception()}")
+            return
+        self._last_known[name] = (future.result(), time.monotonic())
+
+
+class EngineStatusCollector:
+    """Builds the /automation/status document under a time budget.
+
+    Every subsystem the engine has is queried once per collection,
+    concurrently and under its own timeout, so one slow or failing
+    subsystem only marks its own entry stale. The summary and services are
+    the same fields the engine's ``get_status()`` computes from those
+    subsystems. That method queries every subsystem itself, so it is not
+    called as well; engine-level fields are read from the engine's
+    attributes. Only an engine without subsystems is reported from its own
+    ``get_status()``. Results are cached for a short TTL and concurrent
+    pollers share one collection.
+    """
+
+    SUBSYSTEMS = {
+        # name: (engine attribute, operation_status flag, empty value)
+        "nft_hunter": ("nft_hunter", "nft_hunting", []),
+        "crypto_miner": ("crypto_miner", "crypto_mining", {}),
+        "wallet_manager": ("wallet_manager", "wallet_monitoring", {}),
+        "smart_contracts": ("smart_contract_manager", "smart_contracts", {}),
+        "system_monitor": ("system_monitor", "system_monitoring", {}),
+    }
+
+    def __init__(self, engine, timeouts: Optional[Dict[str, float]] = None,
+                 cache_ttl: float = DEFAULT_CACHE_TTL_SECONDS):
+        self.engine = engine
+        self.subsystems = [name for name, (attr, _, _) in self.SUBSYSTEMS.items() if hasattr(engine, attr)]
+        collectors = {name: self._subsystem_collector(name) for name in self.subsystems}
+        if not self.subsystems and callable(getattr(engine, "get_status", None)):
+            collectors["engine"] = engine.get_status
+        self.aggregator = StatusAggregator(collectors, timeouts)
+        self.cache = SnapshotCache(self._build, ttl=cache_ttl, stale_while_revalidate=0,
+                                   name="automation_status")
+
+    async def get_status(self) -> Dict[str, Any]:
+        return await self.cache.get()
+
+    def _active(self, flag: str) -> bool:
+        operation_status = getattr(self.engine, "operation_status", None)
+        if not isinstance(operation_status, dict):
+            return True
+        return bool(operation_status.get(flag))
+
+    def _subsystem_collector(self, name: str) -> Callable[[], Awaitable[Any]]:
+        attr, flag, empty = self.SUBSYSTEMS[name]
+
+        async def collect():
+            if not self._active(flag):
+                return empty
+            service = getattr(self.engine, attr)
+            if name == "nft_hunter":
+                return await service.get_top_opportunities(5)
+            if name == "crypto_miner":
+                return await service.get_mining_status()
+            if name == "wallet_manager":
+                return await get_wallet_snapshot(service).get()
+            if name == "smart_contracts":
+                return await service.get_contract_status()
+            return await service.get_status()
+
+        return collect
+
+    async def _build(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = await self.aggregator.collect()
+        collection = {
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "stale": sorted(name for name, result in results.items() if result["stale"]),
+            "errors": {name: result["error"] for name, result in results.items() if result.get("error")},
+            "collected_at": datetime.now().isoformat(),
+        }
+
+        if not self.subsystems:
+            engine_status = results["engine"]["value"] if "engine" in results else None
+            status = dict(engine_status) if isinstance(engine_status, dict) else {"status": engine_status}
+            status["stale"] = results["engine"]["stale"] if "engine" in results else True
+            status["collection"] = collection
+            return status
+
+        def value(name):
+            result = results[name]["value"] if name in results else None
+            return result if result is not None else self.SUBSYSTEMS[name][2]
+
+        def as_dict(result) -> Dict[str, Any]:
+            return result if isinstance(result, dict) else {}
+
+        nft_status = value("nft_hunter")
+        mining_status = as_dict(value("crypto_miner"))
+        wallet_status = as_dict(value("wallet_manager"))
+        contract_status = as_dict(value("smart_contracts"))
+        system_status = as_dict(value("system_monitor"))
+
+        operations = mining_status.get("operations")
+        total_earnings = sum(
+            op.get("earnings_total", 0) or 0
+            for op in (operations if isinstance(operations, list) else [])
+            if isinstance(op, dict)
+        )
+
+        services = {}
+        for name in self.subsystems:
+            key = "top_opportunities" if name == "nft_hunter" else "status"
+            services[name] = {
+                "active": self._active(self.SUBSYSTEMS[name][1]),
+                key: value(name),
+                "stale": results[name]["stale"],
+                "age_seconds": results[name]["age_seconds"],
+            }
+
+        return {
+            "engine_running": getattr(self.engine, "is_running", False),
+            "operation_status": getattr(self.engine, "operation_status", {}),
+            "summary": {
+                "total_earnings": total_earnings,
+                "nft_opportunities": len(nft_status) if isinstance(nft_status, list) else 0,
+                "mining_active": mining_status.get("is_running", False),
+                "wallet_connected": wallet_status.get("is_connected", False),
+                "contracts_managed": contract_status.get("total_contracts", 0),
+                "system_healthy": as_dict(system_status.get("service_status")).get("system_healthy", False),
+            },
+            "services": services,
+            "last_update": collection["collected_at"],
+            "collection": collection,
+        }
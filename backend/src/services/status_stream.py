@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = float(os.getenv("STATUS_STREAM_INTERVAL_SECONDS", "1.0"))
+DEFAULT_MAX_PENDING = int(os.getenv("STATUS_STREAM_MAX_PENDING", "32"))
+DEFAULT_SOURCE_TIMEOUT_SECONDS = float(os.getenv("STATUS_STREAM_SOURCE_TIMEOUT_SECONDS", "2.0"))
+KEEPALIVE_SECONDS = 15.0
+
+# Fields that change on every collection and would turn every tick into a delta
+VOLATILE_KEYS = frozenset({"last_update", "collection", "age_seconds", "generated_at"})
+
+
+def merge_patch(old: Any, new: Any) -> Any:
+    """JSON Merge Patch (RFC 7386) turning ``old`` into ``new``; None if they are equal.
+
+    Removed keys appear as null. Non-dict values are replaced wholesale.
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None if old == new else new
+    patch = {}
+    for key in old.keys() - new.keys():
+        patch[key] = None
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            patch[key] = merge_patch(old[key], value)
+    return patch or None
+
+
+def strip_volatile(value: Any, keys: Iterable[str] = VOLATILE_KEYS) -> Any:
+    keys = keys if isinstance(keys, frozenset) else frozenset(keys)
+    if isinstance(value, dict):
+        return {k: strip_volatile(v, keys) for k, v in value.items() if k not in keys}
+    if isinstance(value, list):
+        return [strip_volatile(v, keys) for v in value]
+    return value
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Subscriber:
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: Deque[str] = deque()
+        self.wakeup = asyncio.Event()
+        self.needs_snapshot = True
+        self.dropped = 0
+
+    def push(self, encoded: str):
+        if self.needs_snapshot:
+            # The snapshot this subscriber is about to get already covers it
+            return
+        if len(self.pending) >= self.max_pending:
+            # Too slow to keep up: discard intermediate deltas and resync
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self.needs_snapshot = True
+        else:
+            self.pending.append(encoded)
+        self.wakeup.set()
+
+
+class StatusBroadcaster:
+    """Shared producer that streams status snapshots and deltas to many clients.
+
+    One background task polls every registered source per interval and
+    diffs it against the previous state. Each change is encoded once and
+    fanned out to every subscriber. New subscribers get a full snapshot
+    first. A subscriber that falls ``max_pending`` events behind has its
+    queued deltas dropped and gets a fresh snapshot instead. Each source
+    gets ``source_timeout`` per tick; one that misses it keeps its previous
+    state, so a hung source can't stall the others. The producer runs only
+    while someone is subscribed.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS, max_pending: int = DEFAULT_MAX_PENDING,
+                 source_timeout: float = DEFAULT_SOURCE_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.source_timeout = source_timeout
+        self._sources: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._state: Dict[str, Any] = {}
+        self._seq = 0
+        self._snapshot_cache: Optional[str] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._producer: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.deltas_published = 0
+        self.source_timeouts = 0
+
+    def add_source(self, name: str, fetch: Callable[[], Awaitable[Any]]):
+        """Register (or replace) a named status source"""
+        self._sources[name] = fetch
+        self._state.pop(name, None)
+        # The cached snapshot may still hold the replaced source's state
+        self._snapshot_cache = None
+
+    def remove_source(self, name: str):
+        self._sources.pop(name, None)
+        self._state.pop(name, None)
+        self._snapshot_cache = None
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Yield SSE-encoded events: a snapshot first, then deltas"""
+        subscriber = _Subscriber(self.max_pending)
+        self._subscribers.add(subscriber)
+        self._ensure_producer()
+        if self._seq:
+            subscriber.wakeup.set()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # SSE comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                subscriber.wakeup.clear()
+                if subscriber.needs_snapshot:
+                    subscriber.needs_snapshot = False
+                    subscriber.pending.clear()
+                    yield self._encoded_snapshot()
+                while subscriber.pending:
+                    yield subscriber.pending.popleft()
+        finally:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers and self._producer is not None:
+                self._producer.cancel()
+                self._producer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "sources": list(self._sources),
+            "sequence": self._seq,
+            "ticks": self.ticks,
+            "deltas_published": self.deltas_published,
+            "source_timeouts": self.source_timeouts,
+            "dropped_deltas": sum(s.dropped for s in self._subscribers),
+            "producer_running": self._producer is not None and not self._producer.done(),
+            "interval_seconds": self.interval,
+        }
+
+    def _ensure_producer(self):
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._produce(), name="status-broadcaster")
+
+    async def _produce(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status broadcaster tick failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def poll(self) -> Optional[Dict[str, Any]]:
+        """Collect every source once and publish the resulting delta, if any"""
+        self.ticks += 1
+        names = list(self._sources)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._sources[name](), self.source_timeout) for name in names),
+            return_exceptions=True,
+        )
+
+        changes = {}
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.TimeoutError):
+                self.source_timeouts += 1
+                logger.debug(f"Status source {name} timed out after {self.source_timeout}s")
+                continue
+            if isinstance(result, BaseException):
+                logger.debug(f"Status source {name} failed: {result}")
+                continue
+            current = strip_volatile(result)
+            if name not in self._state:
+                changes[name] = current
+            else:
+                patch = merge_patch(self._state[name], current)
+                if patch is not None:
+                    changes[name] = patch
+            self._state[name] = current
+
+        first = self._seq == 0
+        if not changes and not first:
+            return None
+        self._seq += 1
+        self._snapshot_cache = None
+        if first:
+            # Nobody has a baseline yet; everyone gets the snapshot
+            for subscriber in self._subscribers:
+                subscriber.wakeup.set()
+            return changes
+        self.deltas_published += 1
+        encoded = format_sse("delta", {"seq": self._seq, "changes": changes}, self._seq)
+        for subscriber in self._subscribers:
+            subscriber.push(encoded)
+        return changes
+
+    def _encoded_snapshot(self) -> str:
+        if self._snapshot_cache is None:
+            self._snapshot_cache = format_sse("snapshot", {"seq": self._seq, "state": self._state}, self._seq)
+        return self._snapshot_cache
+
+
+status_broadcaster = StatusBroadcaster()
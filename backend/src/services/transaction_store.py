@@ -0,0 +1,265 @@
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_SECONDS = float(os.getenv("TRANSACTION_RETENTION_HOURS", "720")) * 3600
+DEFAULT_MAX_TRANSACTIONS = int(os.getenv("TRANSACTION_STORE_MAX", "100000"))
+
+# Fields that change as a transaction confirms, left out of content-derived keys
+VOLATILE_FIELDS = ("status", "confirmations", "block_number", "block_hash")
+
+
+def transaction_timestamp(tx: Dict[str, Any], default: Optional[float] = None) -> float:
+    """Read a transaction timestamp as epoch seconds.
+
+    Accepts epoch seconds, epoch milliseconds and ISO-8601 strings under
+    ``timestamp`` (or ``time``); falls back to ``default``/now otherwise.
+    """
+    value = tx.get("timestamp", tx.get("time"))
+    if isinstance(value, (int, float)):
+        # Anything past year ~5000 in seconds is really milliseconds
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            logger.debug(f"Unparseable transaction timestamp: {value}")
+        else:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+    return default if default is not None else time.time()
+
+
+def transaction_id(tx: Dict[str, Any]) -> Optional[str]:
+    return tx.get("hash") or tx.get("tx_hash")
+
+
+def transaction_key(tx: Dict[str, Any]) -> str:
+    """The transaction hash, or a stable digest of its content for hashless transactions"""
+    tx_id = transaction_id(tx)
+    if tx_id is not None:
+        return tx_id
+    stable = {field: value for field, value in tx.items() if field not in VOLATILE_FIELDS}
+    payload = json.dumps(stable, sort_keys=True, default=str).encode()
+    return "content:" + hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+
+def encode_cursor(timestamp: float, tx_id: Optional[str], offset: int) -> str:
+    """Opaque pagination cursor pointing at a transaction's position"""
+    raw = json.dumps({"t": timestamp, "i": tx_id, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, Optional[str], int]:
+    """Decode a cursor from encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(data["t"]), data.get("i"), int(data.get("o", 0))
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class TransactionFlowStats:
+    """Send/receive totals accumulated in one pass over a transaction stream"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_sent = 0
+        self.total_received = 0
+
+    def add(self, tx: Dict[str, Any]):
+        self.count += 1
+        transaction_type = tx.get("transaction_type")
+        if transaction_type == "send":
+            self.total_sent += tx.get("value", 0)
+        elif transaction_type == "receive":
+            self.total_received += tx.get("value", 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_sent": self.total_sent,
+            "total_received": self.total_received,
+            "net_flow": self.total_received - self.total_sent
+        }
+
+
+class TransactionStore:
+    """Transactions kept sorted by timestamp for O(log n + k) range queries.
+
+    Parallel ascending arrays of timestamps and transactions are searched with
+    bisect. Every transaction has a key: its hash, or a content digest when
+    it has none. Undated transactions keep the time they were first seen.
+    Memory is bounded by a retention window and a hard entry cap, and the
+    oldest transactions are evicted first. Retention never drops anything
+    still in the latest snapshot.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+        max_transactions: int = DEFAULT_MAX_TRANSACTIONS,
+    ):
+        self.retention_seconds = retention_seconds
+        self.max_transactions = max_transactions
+
+        self._timestamps: List[float] = []
+        self._transactions: List[Dict[str, Any]] = []
+        self._ids: Dict[str, float] = {}
+        self._synced_version: Optional[int] = None
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def add(self, tx: Dict[str, Any], timestamp: Optional[float] = None) -> bool:
+        """Insert a transaction, replacing an older copy with the same key"""
+        tx_id = transaction_key(tx)
+        if timestamp is not None:
+            ts = timestamp
+        else:
+            ts = transaction_timestamp(tx, default=self._ids.get(tx_id))
+        if tx_id in self._ids:
+            index = self._find(tx_id, self._ids[tx_id])
+            if index is not None:
+                if self._timestamps[index] == ts and self._transactions[index] == tx:
+                    return False
+                del self._timestamps[index]
+                del self._transactions[index]
+
+        index = bisect.bisect_right(self._timestamps, ts)
+        self._timestamps.insert(index, ts)
+        self._transactions.insert(index, tx)
+        self._ids[tx_id] = ts
+        if len(self._timestamps) > self.max_transactions:
+            self._evict(len(self._timestamps) - self.max_transactions)
+        return True
+
+    def ingest(self, transactions: List[Dict[str, Any]], now: Optional[float] = None,
+               version: Optional[int] = None) -> int:
+        """Merge a newest-first transaction list, returning how many were new or changed.
+
+        ``version`` is the snapshot version the list came from; a version
+        that was already ingested is skipped without looking at the list.
+        """
+        if version is not None and version == self._synced_version:
+            return 0
+        now = now if now is not None else time.time()
+        added = 0
+        oldest = now
+        # Oldest first so undated transactions keep their relative order
+        for tx in reversed(transactions):
+            # Undated transactions keep the time they were first seen
+            ts = transaction_timestamp(tx, default=self._ids.get(transaction_key(tx), now))
+            oldest = min(oldest, ts)
+            # Store a copy so later in-place edits by the service show up as a change
+            if self.add(dict(tx), ts):
+                added += 1
+        self.prune(now, keep_from=oldest)
+        self._synced_version = version
+        return added
+
+    def prune(self, now: Optional[float] = None, keep_from: Optional[float] = None) -> int:
+        """Drop transactions older than the retention window (and than ``keep_from``)"""
+        now = now if now is not None else time.time()
+        cutoff = now - self.retention_seconds
+        if keep_from is not None:
+            cutoff = min(cutoff, keep_from)
+        count = bisect.bisect_left(self._timestamps, cutoff)
+        if count:
+            self._evict(count)
+        return count
+
+    def range(self, start: float, end: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Transactions with ``start <= timestamp <= end``, newest first"""
+        lo = bisect.bisect_left(self._timestamps, start)
+        hi = bisect.bisect_right(self._timestamps, end)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return self._transactions[lo:hi][::-1]
+
+    def since(self, seconds: float, now: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Transactions from the last ``seconds``, newest first"""
+        now = now if now is not None else time.time()
+        return self.range(now - seconds, float("inf"), limit)
+
+    def latest(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` most recent transactions, newest first"""
+        if limit <= 0:
+            return []
+        return self._transactions[-limit:][::-1]
+
+    def page(self, after: Optional[str] = None, limit: int = 50,
+             since: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of transactions older than the ``after`` cursor, newest first.
+
+        Returns the page and the cursor for the next page (None at the end).
+        Cursors address a position rather than an index, so pages stay
+        consistent while new transactions are being ingested. With ``since``
+        the walk ends at the first transaction older than that timestamp.
+        """
+        floor = bisect.bisect_left(self._timestamps, since) if since is not None else 0
+        hi = self._resolve_cursor(after) if after else len(self._timestamps)
+        lo = max(floor, hi - limit)
+        items = self._transactions[lo:hi][::-1]
+        next_cursor = self._cursor_at(lo) if lo > floor and items else None
+        return items, next_cursor
+
+    def iter_pages(
+        self,
+        after: Optional[str] = None,
+        page_size: int = 500,
+        limit: Optional[int] = None,
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Walk the history newest first, one bounded page at a time.
+
+        Yields ``(items, next_cursor)`` and stops after ``limit`` transactions
+        (all of them when None). The last cursor yielded resumes the walk.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            items, after = self.page(after, size)
+            if remaining is not None:
+                remaining -= len(items)
+            yield items, after
+            if after is None:
+                return
+
+    def _cursor_at(self, index: int) -> str:
+        ts = self._timestamps[index]
+        offset = index - bisect.bisect_left(self._timestamps, ts)
+        return encode_cursor(ts, transaction_key(self._transactions[index]), offset)
+
+    def _resolve_cursor(self, cursor: str) -> int:
+        ts, tx_id, offset = decode_cursor(cursor)
+        start = bisect.bisect_left(self._timestamps, ts)
+        if tx_id is not None:
+            index = self._find(tx_id, ts)
+            # A replaced or evicted transaction resumes below its timestamp
+            return index if index is not None else start
+        return min(start + offset, bisect.bisect_right(self._timestamps, ts))
+
+    def _find(self, tx_id: str, ts: float) -> Optional[int]:
+        index = bisect.bisect_left(self._timestamps, ts)
+        while index < len(self._timestamps) and self._timestamps[index] == ts:
+            if transaction_key(self._transactions[index]) == tx_id:
+                return index
+            index += 1
+        return None
+
+    def _evict(self, count: int):
+        for tx in self._transactions[:count]:
+            self._ids.pop(transaction_key(tx), None)
+        del self._timestamps[:count]
+        del self._transactions[:count]
+        self.evicted += count
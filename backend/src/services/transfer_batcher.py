@@ -0,0 +1,370 @@
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Set, Tuple, runtime_checkable
+
+from .profit_ledger import TRANSFER, profit_ledger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_SECONDS = float(os.getenv("TRANSFER_BATCH_MAX_AGE_SECONDS", "300"))
+DEFAULT_MAX_ITEMS = int(os.getenv("TRANSFER_BATCH_MAX_ITEMS", "50"))
+# Size trigger for tokens without a min amount, when their price is known
+DEFAULT_MIN_USD = float(os.getenv("TRANSFER_BATCH_MIN_USD", "100"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("TRANSFER_BATCH_MAX_ATTEMPTS", "5"))
+DEFAULT_RETRY_BASE_SECONDS = float(os.getenv("TRANSFER_BATCH_RETRY_BASE_SECONDS", "5"))
+DEFAULT_RETRY_MAX_SECONDS = float(os.getenv("TRANSFER_BATCH_RETRY_MAX_SECONDS", "600"))
+# Unresolved possibly-sent batches kept for review; the oldest is dropped (and logged) past this
+DEFAULT_MAX_UNCONFIRMED = int(os.getenv("TRANSFER_BATCH_MAX_UNCONFIRMED", "100"))
+
+# Flush as soon as this much of a token has accumulated
+DEFAULT_MIN_AMOUNTS = {
+    "ETH": 0.05,
+    "BTC": 0.002,
+    "MATIC": 50.0,
+    "BNB": 0.2,
+}
+
+BatchKey = Tuple[str, str]
+Sender = Callable[..., Awaitable[Optional[str]]]
+PriceLookup = Callable[[str, str], Awaitable[Optional[float]]]
+
+
+class TransferNotSent(Exception):
+    """Raised by a sender when the transfer was certainly not broadcast, so retrying can't double-send"""
+
+
+# Errors that happen before anything reaches the network
+RETRYABLE_ERRORS = (TransferNotSent, ConnectionRefusedError)
+
+
+class _PendingBatch:
+    __slots__ = ("amount", "count", "first_at", "timer", "attempts", "last_error")
+
+    def __init__(self):
+        self.amount = 0.0
+        self.count = 0
+        self.first_at = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+
+
+class TransferBatcher:
+    """Coalesces small automated profit transfers to Exodus per (network, token).
+
+    Pending amounts accumulate until the token's size threshold (or
+    ``min_usd`` worth, for tokens without one) or the item cap is reached,
+    the oldest contribution hits ``max_age`` seconds, or someone flushes
+    explicitly. Each network has one send pipeline (a lock), so a network's
+    transfers go out one at a time in nonce order while different networks
+    flush in parallel. A send that failed before broadcast
+    (``RETRYABLE_ERRORS``) goes back in the queue and is retried with
+    exponential backoff, up to ``max_attempts`` times. Any other failure may
+    have reached the network, so it is held as unconfirmed rather than
+    resent until someone resolves it (``resolve_unconfirmed``) as sent or
+    not sent. Explicit user transfers bypass the queue through ``send()``.
+    """
+
+    def __init__(
+        self,
+        sender: Optional[Sender] = None,
+        min_amounts: Optional[Dict[str, float]] = None,
+        max_items: int = DEFAULT_MAX_ITEMS,
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+        min_usd: float = DEFAULT_MIN_USD,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_base: float = DEFAULT_RETRY_BASE_SECONDS,
+        retry_max: float = DEFAULT_RETRY_MAX_SECONDS,
+        max_unconfirmed: int = DEFAULT_MAX_UNCONFIRMED,
+    ):
+        self.sender = sender
+        self.min_amounts = dict(DEFAULT_MIN_AMOUNTS if min_amounts is None else min_amounts)
+        self.max_items = max_items
+        self.max_age = max_age
+        self.min_usd = min_usd
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_unconfirmed = max(1, max_unconfirmed)
+        self.on_transfer: Optional[Callable[[], None]] = None
+        self.price_lookup: Optional[PriceLookup] = None
+
+        self._pending: Dict[BatchKey, _PendingBatch] = {}
+        self._pipelines: Dict[str, asyncio.Lock] = {}
+        self._unconfirmed: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._unconfirmed_ids = itertools.count(1)
+        self._timer_tasks: Set[asyncio.Task] = set()
+        self.unconfirmed_dropped = 0
+        self.flushes = 0
+        self.failures = 0
+        self.retries = 0
+        self.transfers_coalesced = 0
+        self.last_flush_latency_ms: Optional[float] = None
+        self._flush_latency_total_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+
+    async def enqueue(self, amount: float, token_symbol: str = "ETH", network: str = "ethereum") -> Dict[str, Any]:
+        """Add an amount to its batch, flushing the batch if it is now due"""
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError("Transfer amount must be a positive number")
+        key = (network, token_symbol)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = self._start_timer(key, self.max_age)
+        batch.amount += amount
+        batch.count += 1
+
+        # A batch past its retry cap waits for an explicit flush
+        if batch.attempts < self.max_attempts and await self._is_due(key, batch):
+            return await self.flush_batch(key)
+        return {
+            "status": "queued",
+            "network": network,
+            "token": token_symbol,
+            "pending_amount": batch.amount,
+            "pending_count": batch.count,
+        }
+
+    async def _is_due(self, key: BatchKey, batch: _PendingBatch) -> bool:
+        network, token_symbol = key
+        if batch.count >= self.max_items:
+            return True
+        min_amount = self.min_amounts.get(token_symbol)
+        if min_amount is not None:
+            return batch.amount >= min_amount
+        price = await self._price(network, token_symbol)
+        return price is not None and batch.amount * price >= self.min_usd
+
+    async def _price(self, network: str, token_symbol: str) -> Optional[float]:
+        if self.price_lookup is None:
+            return None
+        try:
+            return await self.price_lookup(network, token_symbol)
+        except Exception as e:
+            logger.warning(f"Price lookup for {token_symbol} on {network} failed: {e}")
+            return None
+
+    async def send(self, amount: float, token_symbol: str = "ETH", network: str = "ethereum") -> Dict[str, Any]:
+        """Send one transfer now, in the network's pipeline, without queueing or retrying it"""
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError("Transfer amount must be a positive number")
+        if self.sender is None:
+            raise RuntimeError("No transfer sender configured")
+        started = time.perf_counter()
+        async with self._pipelines.setdefault(network, asyncio.Lock()):
+            try:
+                tx_hash = await self.sender(amount=amount, token_symbol=token_symbol, network=network)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Transfer of {amount} {token_symbol} on {network} failed: {e}")
+                return {"status": "failed", "network": network, "token": token_symbol,
+                        "amount": amount, "error": str(e)}
+        return await self._sent(network, token_symbol, amount, 1, tx_hash, started)
+
+    async def flush(self, network: Optional[str] = None, token_symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Flush every pending batch (optionally only one network/token)"""
+        keys = [key for key in self._pending
+                if (network is None or key[0] == network) and (token_symbol is None or key[1] == token_symbol)]
+        return list(await asyncio.gather(*(self.flush_batch(key) for key in keys)))
+
+    async def flush_batch(self, key: BatchKey) -> Dict[str, Any]:
+        network, token_symbol = key
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return {"status": "empty", "network": network, "token": token_symbol}
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        if self.sender is None:
+            self._requeue(key, batch)
+            raise RuntimeError("No transfer sender configured")
+
+        started = time.perf_counter()
+        sending = False
+        try:
+            async with self._pipelines.setdefault(network, asyncio.Lock()):
+                batch.attempts += 1
+                sending = True
+                tx_hash = await self.sender(amount=batch.amount, token_symbol=token_symbol, network=network)
+        except asyncio.CancelledError:
+            # The batch is already out of the queue; don't let a cancelled caller lose it
+            if sending:
+                # The sender may have broadcast it before the cancel arrived
+                self._hold_unconfirmed({"status": "unconfirmed", "network": network, "token": token_symbol,
+                                        "amount": batch.amount, "attempts": batch.attempts,
+                                        "error": "Cancelled while sending", "coalesced": batch.count,
+                                        "failed_at": time.time()})
+                logger.error(f"Batched transfer of {batch.amount} {token_symbol} on {network} "
+                             f"was cancelled mid-send and may have been sent; not retrying")
+            else:
+                self._requeue(key, batch)
+            raise
+        except Exception as e:
+            self.failures += 1
+            batch.last_error = str(e)
+            failed = {"status": "failed", "network": network, "token": token_symbol,
+                      "amount": batch.amount, "attempts": batch.attempts, "error": str(e)}
+            if isinstance(e, RETRYABLE_ERRORS):
+                self._requeue(key, batch)
+                failed["retrying"] = batch.attempts < self.max_attempts
+                logger.error(f"Batched transfer of {batch.amount} {token_symbol} on {network} "
+                             f"failed before broadcast (attempt {batch.attempts}): {e}")
+            else:
+                # It may have been broadcast; resending could pay twice
+                failed["status"] = "unconfirmed"
+                failed["unconfirmed_id"] = self._hold_unconfirmed(
+                    {**failed, "coalesced": batch.count, "failed_at": time.time()})
+                logger.error(f"Batched transfer of {batch.amount} {token_symbol} on {network} "
+                             f"failed and may have been sent; not retrying: {e}")
+            return failed
+
+        return await self._sent(network, token_symbol, batch.amount, batch.count, tx_hash, started)
+
+    async def _sent(self, network: str, token_symbol: str, amount: float, count: int,
+                    tx_hash: Optional[str], started: float) -> Dict[str, Any]:
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.transfers_coalesced += count
+        self.last_flush_latency_ms = round(latency_ms, 2)
+        self._flush_latency_total_ms += latency_ms
+        self.max_flush_latency_ms = max(self.max_flush_latency_ms, round(latency_ms, 2))
+        price = await self._price(network, token_symbol)
+        profit_ledger.record(TRANSFER, amount, currency=token_symbol,
+                             amount_usd=amount * price if price is not None else None,
+                             metadata={"network": network, "tx_hash": tx_hash, "coalesced": count,
+                                       "priced": price is not None})
+        if self.on_transfer is not None:
+            self.on_transfer()
+        return {
+            "status": "transferred" if tx_hash else "submitted",
+            "tx_hash": tx_hash,
+            "network": network,
+            "token": token_symbol,
+            "amount": amount,
+            "coalesced": count,
+            "latency_ms": round(latency_ms, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "queue_depth": sum(batch.count for batch in self._pending.values()),
+            "pending": [
+                {
+                    "network": network,
+                    "token": token_symbol,
+                    "amount": batch.amount,
+                    "count": batch.count,
+                    "oldest_age_seconds": round(now - batch.first_at, 3),
+                    "attempts": batch.attempts,
+                    "last_error": batch.last_error,
+                }
+                for (network, token_symbol), batch in self._pending.items()
+            ],
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "unconfirmed": list(self._unconfirmed.values()),
+            "unconfirmed_dropped": self.unconfirmed_dropped,
+            "transfers_coalesced": self.transfers_coalesced,
+            "flush_latency_ms": {
+                "last": self.last_flush_latency_ms,
+                "avg": round(self._flush_latency_total_ms / self.flushes, 2) if self.flushes else None,
+                "max": self.max_flush_latency_ms if self.flushes else None,
+            },
+            "max_age_seconds": self.max_age,
+            "max_items": self.max_items,
+            "min_amounts": self.min_amounts,
+            "min_usd": self.min_usd,
+            "max_attempts": self.max_attempts,
+        }
+
+    def _requeue(self, key: BatchKey, batch: _PendingBatch):
+        existing = self._pending.get(key)
+        if existing is not None:
+            # Amounts queued while the send was in flight join the retried batch
+            if existing.timer is not None:
+                existing.timer.cancel()
+            batch.amount += existing.amount
+            batch.count += existing.count
+        self._pending[key] = batch
+        if batch.attempts >= self.max_attempts:
+            logger.error(f"Giving up retrying {batch.amount} {key[1]} on {key[0]} after "
+                         f"{batch.attempts} attempts; it stays queued for an explicit flush")
+            return
+        if batch.attempts:
+            self.retries += 1
+            delay = min(self.retry_max, self.retry_base * 2 ** (batch.attempts - 1))
+        else:
+            # Never attempted (no sender yet): keep the original age
+            delay = max(1.0, self.max_age - (time.monotonic() - batch.first_at))
+        batch.timer = self._start_timer(key, delay)
+
+    def _hold_unconfirmed(self, entry: Dict[str, Any]) -> int:
+        entry_id = next(self._unconfirmed_ids)
+        self._unconfirmed[entry_id] = {"id": entry_id, **entry}
+        while len(self._unconfirmed) > self.max_unconfirmed:
+            _, dropped = self._unconfirmed.popitem(last=False)
+            self.unconfirmed_dropped += 1
+            logger.error(f"Dropping unresolved unconfirmed transfer {dropped['id']} of {dropped['amount']} "
+                         f"{dropped['token']} on {dropped['network']}: more than {self.max_unconfirmed} held")
+        return entry_id
+
+    async def resolve_unconfirmed(self, entry_id: int, sent: bool) -> Dict[str, Any]:
+        """Settle a possibly-sent batch once its fate is known.
+
+        ``sent=True`` records it as transferred; ``sent=False`` puts its
+        amount back in the queue to go out with the next batch. Raises
+        KeyError for unknown ids.
+        """
+        entry = self._unconfirmed.pop(entry_id)
+        if sent:
+            result = await self._sent(entry["network"], entry["token"], entry["amount"], entry["coalesced"],
+                                      None, time.perf_counter())
+            return {**result, "status": "confirmed", "unconfirmed_id": entry_id}
+        key = (entry["network"], entry["token"])
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            batch.timer = self._start_timer(key, self.max_age)
+        batch.amount += entry["amount"]
+        batch.count += entry["coalesced"]
+        return {
+            "status": "requeued",
+            "unconfirmed_id": entry_id,
+            "network": entry["network"],
+            "token": entry["token"],
+            "pending_amount": batch.amount,
+            "pending_count": batch.count,
+        }
+
+    def _start_timer(self, key: BatchKey, delay: float) -> asyncio.TimerHandle:
+        return asyncio.get_running_loop().call_later(delay, self._flush_later, key)
+
+    def _flush_later(self, key: BatchKey):
+        # Keep a reference: the loop only holds tasks weakly
+        task = asyncio.ensure_future(self._flush_quietly(key))
+        self._timer_tasks.add(task)
+        task.add_done_callback(self._timer_tasks.discard)
+
+    async def _flush_quietly(self, key: BatchKey):
+        try:
+            await self.flush_batch(key)
+        except Exception as e:
+            logger.error(f"Max-age flush of {key} failed: {e}")
+
+
+@runtime_checkable
+class QueuesTransfers(Protocol):
+    """A service that enqueues its automated transfers on a batcher it is handed instead of sending them"""
+
+    transfer_batcher: Optional[TransferBatcher]
+
+
+transfer_batcher = TransferBatcher()
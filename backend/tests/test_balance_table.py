@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.services.balance_table import BalanceTable
+
+BALANCES = [
+    {"network": "ethereum", "token_symbol": "ETH", "balance": 2.0, "balance_usd": 5000.0,
+     "price_usd": 2500.0, "token_address": None, "decimals": 18},
+    # No price: derived for repricing, but must not appear in the output
+    {"network": "polygon", "token_symbol": "MATIC", "balance": 10.0, "balance_usd": 7.5},
+    {"network": "bitcoin", "token_symbol": "BTC", "balance": 0.0, "balance_usd": 0.0, "price_usd": 45000.0},
+]
+
+
+def test_to_balances_round_trips():
+    table = BalanceTable.from_balances(BALANCES)
+    assert table.to_balances() == BALANCES
+    assert table.price[1] == 0.75
+
+
+def test_concat_round_trips_and_keeps_derived_flags():
+    combined = BalanceTable.concat([BalanceTable.from_balances(BALANCES[:2]), BalanceTable.from_balances(BALANCES[2:])])
+    assert combined.to_balances() == BALANCES
+    assert combined.total_usd() == 5007.5
+    assert combined.by_network() == {"ethereum": 5000.0, "polygon": 7.5}
+
+
+def test_reprice_makes_price_explicit():
+    table = BalanceTable.from_balances(BALANCES)
+    table.reprice("MATIC", 1.0)
+    row = table.to_balances()[1]
+    assert row["price_usd"] == 1.0 and row["balance_usd"] == 10.0
+    assert np.isclose(table.total_usd(), 5010.0)
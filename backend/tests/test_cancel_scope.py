@@ -0,0 +1,34 @@
+import asyncio
+from collections import deque
+
+from src.services.cancel_scope import TaskScope
+
+
+def test_abandoned_reports_are_capped_and_the_rest_counted():
+    async def scenario():
+        scope = TaskScope()
+        loops = scope.child("loops")
+        loops.abandoned = deque(maxlen=2)
+        release = asyncio.Event()
+
+        async def stubborn():
+            # Swallows cancellation until released, so it overruns the deadline
+            while not release.is_set():
+                try:
+                    await release.wait()
+                except asyncio.CancelledError:
+                    pass
+
+        tasks = [loops.spawn(stubborn(), name=f"loop-{i}") for i in range(3)]
+        await asyncio.sleep(0)
+        try:
+            report = await scope.cancel(0.05)
+        finally:
+            release.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        assert len(report["overran"]) == 3 and not report["within_deadline"]
+        assert [entry["task"] for entry in loops.abandoned] == ["loop-1", "loop-2"]
+        stats = loops.stats()
+        assert stats["abandoned"] == 3 and stats["abandoned_dropped"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from src.services.coin_switcher import CoinSwitchScheduler, ProfitabilityFeed, StaticProfitabilityFeed
+
+
+class FakeMiner:
+    def __init__(self, running):
+        self.running = set(running)
+        self.stopped = []
+
+    def get_supported_coins(self):
+        return ["BTC", "LTC", "XMR"]
+
+    async def get_mining_status(self):
+        return {"operations": [{"coin": coin, "is_running": True} for coin in sorted(self.running)]}
+
+    async def start_mining_coin(self, coin):
+        self.running.add(coin)
+        return True
+
+    async def stop_mining_coin(self, coin):
+        self.running.discard(coin)
+        self.stopped.append(coin)
+        return True
+
+
+def test_feed_is_abstract():
+    with pytest.raises(TypeError):
+        ProfitabilityFeed()
+
+
+@pytest.mark.parametrize("inputs", [
+    {},
+    {"BTC": {"algorithm": "SHA256", "difficulty": None, "block_reward": 3.125, "price_usd": 60000.0}},
+])
+def test_unscorable_inputs_keep_the_current_coins_mining(inputs):
+    miner = FakeMiner(["BTC"])
+    scheduler = CoinSwitchScheduler(miner, StaticProfitabilityFeed(inputs), min_hold_seconds=0)
+    evaluation = asyncio.run(scheduler.evaluate(apply=True))
+    assert evaluation["chosen"] == ["BTC"] and not evaluation["switch"]
+    assert miner.running == {"BTC"} and miner.stopped == []
+
+
+def test_running_coin_without_data_is_not_replaced():
+    inputs = {"XMR": {"algorithm": "RandomX", "difficulty": 3.0e11, "block_reward": 0.6, "price_usd": 150.0,
+                      "hashrate": 5.0e3}}
+    miner = FakeMiner(["BTC"])
+    scheduler = CoinSwitchScheduler(miner, StaticProfitabilityFeed(inputs), min_hold_seconds=0)
+    evaluation = asyncio.run(scheduler.evaluate(apply=True))
+    assert evaluation["chosen"] == ["BTC"]
+    assert miner.stopped == []
+
+
+def test_running_set_over_the_cap_keeps_its_most_profitable_coins_while_held():
+    scheduler = CoinSwitchScheduler(FakeMiner([]), StaticProfitabilityFeed({}), max_coins=2, min_hold_seconds=900)
+    scheduler.last_switch_at = 1000.0
+    revenue = {"BTC": 1.0, "LTC": 5.0, "XMR": 3.0}
+    # Held, so no switching: the cut keeps LTC and XMR rather than the first two alphabetically
+    assert scheduler.choose(revenue, ["BTC", "DOGE", "LTC", "XMR"], now=1100.0) == ["LTC", "XMR"]
@@ -0,0 +1,51 @@
+from src.services import hashrate_counters
+from src.services.hashrate_counters import (HASH_RATE, MAX_READ_RETRIES, SEQ, SLOT_WIDTH, CounterWriter,
+                                           HashrateCounters)
+
+
+def _start_write(counters, slot, hash_rate):
+    # A writer preempted halfway through: seq odd, some fields already new
+    base = slot * SLOT_WIDTH
+    counters.block[base + SEQ] += 1
+    counters.block[base + HASH_RATE] = hash_rate
+
+
+def test_published_record_reads_back_and_released_slots_are_zeroed():
+    counters = HashrateCounters(2)
+    slot = counters.allocate()
+    CounterWriter(counters.block, slot).publish(125.5, 7, 1, 30.0, 4242)
+    record = counters.snapshot()[slot]
+    assert record["hash_rate"] == 125.5 and record["pid"] == 4242
+    assert (record["shares_accepted"], record["shares_rejected"]) == (7, 1)
+    counters.release(slot)
+    assert counters.snapshot([slot])[slot]["hash_rate"] == 0.0
+    assert counters.stats()["in_use"] == 0
+
+
+def test_torn_read_is_retried_until_the_writer_finishes(monkeypatch):
+    counters = HashrateCounters(2)
+    slot = counters.allocate()
+    CounterWriter(counters.block, slot).publish(100.0, 1, 0, 10.0, 11)
+    _start_write(counters, slot, 999.0)
+
+    def writer_finishes(_):
+        base = slot * SLOT_WIDTH
+        counters.block[base + SEQ] += 1
+
+    monkeypatch.setattr(hashrate_counters.time, "sleep", writer_finishes)
+    assert counters.snapshot()[slot]["hash_rate"] == 999.0
+    assert counters.stats()["torn_reads_retried"] == 1 and counters.stats()["fallback_reads"] == 0
+
+
+def test_writer_stuck_mid_update_falls_back_to_the_last_consistent_record(monkeypatch):
+    counters = HashrateCounters(2)
+    slot = counters.allocate()
+    CounterWriter(counters.block, slot).publish(100.0, 1, 0, 10.0, 11)
+    assert counters.snapshot()[slot]["hash_rate"] == 100.0
+    # seq is left odd for every retry
+    _start_write(counters, slot, 999.0)
+    monkeypatch.setattr(hashrate_counters.time, "sleep", lambda _: None)
+    record = counters.snapshot()[slot]
+    assert record["hash_rate"] == 100.0 and record["pid"] == 11
+    stats = counters.stats()
+    assert stats["torn_reads_retried"] == MAX_READ_RETRIES and stats["fallback_reads"] == 1
@@ -0,0 +1,31 @@
+from src.services.hashrate_telemetry import TOTAL, HashrateTelemetry
+
+
+def test_ring_wraps_at_capacity_and_windows_aggregate_what_is_left():
+    telemetry = HashrateTelemetry(interval=1.0, windows={"short": 4, "long": 10})
+    assert telemetry.capacity == 11
+    for ts in range(15):
+        telemetry.record({("BTC", "0"): float(ts), ("BTC", "1"): 2.0 * ts}, ts=float(ts))
+
+    summary = telemetry.summary(now=14.0)["BTC"]
+    # Samples 0-3 were overwritten by the wrap; the long window sees ts 4-14
+    long = summary["workers"]["0"]["long"]
+    assert long["samples"] == 11 and long["mean"] == 9.0
+    short = summary["workers"]["0"]["short"]
+    assert short["samples"] == 5 and short["mean"] == 12.0 and short["p50"] == 12.0
+    assert short["trend_per_minute"] == 60.0
+    assert summary[TOTAL]["short"]["mean"] == 36.0 and summary[TOTAL]["long"]["samples"] == 11
+    assert telemetry.stats()["samples_recorded"] == 15
+
+
+def test_missing_samples_are_skipped_and_the_stalest_series_is_evicted():
+    telemetry = HashrateTelemetry(interval=1.0, max_series=2, windows={"short": 4})
+    telemetry.record({("BTC", "0"): 10.0, ("LTC", "0"): 5.0}, ts=1.0)
+    telemetry.record({("BTC", "0"): 20.0}, ts=2.0)
+    window = telemetry.summary(coin="BTC", now=2.0)["BTC"]["workers"]["0"]["short"]
+    assert window["samples"] == 2 and window["mean"] == 15.0
+
+    # LTC was seen least recently, so XMR takes its row
+    telemetry.record({("BTC", "0"): 30.0, ("XMR", "0"): 1.0}, ts=3.0)
+    assert set(telemetry.summary(now=3.0)) == {"BTC", "XMR"}
+    assert telemetry.stats()["evictions"] == 1
@@ -0,0 +1,40 @@
+import asyncio
+
+from src.services.health_probes import HealthProber, snapshot_probe
+from src.services.snapshot_cache import SnapshotCache
+
+
+def test_snapshot_probe_reports_degraded_while_serving_a_stale_value():
+    async def scenario():
+        failing = False
+
+        async def fetch():
+            if failing:
+                raise ConnectionError("rpc down")
+            return {"balances": []}
+
+        cache = SnapshotCache(fetch, ttl=0, stale_while_revalidate=60, name="wallet_status")
+        prober = HealthProber(interval=60, timeout=1)
+        prober.register("wallet_manager", snapshot_probe(cache))
+        await prober.probe_all()
+        assert prober.readiness()["status"] == "ready"
+
+        failing = True
+        await prober.probe_all()  # serves the stale value and starts a refresh that fails
+        await asyncio.sleep(0)
+        assert cache.stats()["last_error"] == "rpc down"
+        await prober.probe_all()
+        readiness = prober.readiness()
+        assert readiness["ready"] and readiness["status"] == "degraded"
+        assert readiness["degraded"] == ["wallet_manager"]
+        assert "rpc down" in readiness["checks"]["wallet_manager"]["degraded"]
+
+        failing = False
+        await prober.probe_all()
+        await asyncio.sleep(0)
+        await prober.probe_all()
+        assert cache.last_error is None
+        assert prober.readiness()["status"] == "ready"
+        await prober.stop()
+
+    asyncio.run(scenario())
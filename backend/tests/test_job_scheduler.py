@@ -0,0 +1,51 @@
+import asyncio
+
+from src.services.job_scheduler import CANCELLED, FAILED, SUCCEEDED, JobScheduler
+
+
+def test_cancel_before_first_step_releases_slot_and_dedupe_key():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=1)
+        started = []
+
+        async def work():
+            started.append(True)
+            return "done"
+
+        job, created = scheduler.submit("sync", work)
+        assert created and job.status == "running"
+        # Cancelled in the same tick, before the task ever runs
+        scheduler.cancel_all()
+        await scheduler.wait(job.id)
+        assert job.status == CANCELLED and not started
+        assert scheduler.stats()["running"] == 0
+        assert scheduler.stats()["running_by_type"] == {}
+
+        again, created = scheduler.submit("sync", work)
+        assert created and again.id != job.id
+        await scheduler.wait(again.id)
+        assert again.status == SUCCEEDED and again.result == "done"
+
+    asyncio.run(scenario())
+
+
+def test_wait_covers_queued_and_failed_jobs():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        async def broken():
+            raise ValueError("boom")
+
+        first, _ = scheduler.submit("a", blocker)
+        second, _ = scheduler.submit("b", broken)
+        assert second.status == "queued"
+        release.set()
+        await asyncio.wait_for(scheduler.wait(second.id), 1)
+        assert first.status == SUCCEEDED
+        assert second.status == FAILED and second.error == "boom"
+
+    asyncio.run(scenario())
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+from src.services.mining_supervisor import CoinConfig, MinerOutputParser, MiningSupervisor, available_cpus
+
+
+def test_coin_without_miner_command_is_refused_unless_benchmarking():
+    supervisor = MiningSupervisor(configs={"BTC": CoinConfig("BTC", "SHA256")})
+    with pytest.raises(ValueError, match="No miner command"):
+        asyncio.run(supervisor.start_mining_coin("BTC"))
+    assert not supervisor.is_running
+    assert supervisor.counters.stats()["in_use"] == 0
+
+
+@pytest.mark.skipif(available_cpus() is None, reason="no CPU affinity API")
+def test_unavailable_cpu_is_rejected_before_any_worker_starts():
+    supervisor = MiningSupervisor(configs={"BTC": CoinConfig("BTC", "SHA256")}, benchmark=True)
+    bad_cpu = max(available_cpus()) + 1
+    with pytest.raises(ValueError, match="not available"):
+        asyncio.run(supervisor.start_mining_coin("BTC", cpus=[bad_cpu]))
+    assert not supervisor.is_running
+    assert supervisor.counters.stats()["in_use"] == 0
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs a sleep binary")
+def test_external_miner_command_runs_as_the_worker_and_stops_promptly():
+    async def scenario():
+        config = CoinConfig("XMR", "RandomX", workers=2, command=["sleep", "30"])
+        supervisor = MiningSupervisor(configs={"XMR": config}, stop_timeout=5)
+        assert await supervisor.start_mining_coin("XMR")
+        status = await supervisor.get_mining_status()
+        operation = status["operations"][0]
+        assert operation["mode"] == "miner" and operation["workers_alive"] == 2
+        assert operation["shares_accepted"] == 0
+        assert all(worker["pid"] for worker in operation["workers"])
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await supervisor.stop_mining_coin("XMR")
+        # Terminated straight away instead of waiting out the stop timeout
+        assert loop.time() - started < 2
+        assert supervisor.counters.stats()["in_use"] == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs a sleep binary")
+def test_hard_stop_joins_workers_before_releasing_their_slots():
+    async def scenario():
+        config = CoinConfig("XMR", "RandomX", workers=2, command=["sleep", "30"])
+        supervisor = MiningSupervisor(configs={"XMR": config})
+        await supervisor.start_mining_coin("XMR")
+        processes = [worker.process for worker in supervisor._workers["XMR"]]
+        cleanup = supervisor._terminate_all()
+        # Forgotten at once; the joins run off the event loop
+        assert not supervisor.is_running
+        await cleanup
+        assert not any(process.is_alive() for process in processes)
+        assert supervisor.counters.stats()["in_use"] == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs a sleep binary")
+def test_cancelled_or_stopped_start_reaps_its_workers():
+    async def scenario():
+        config = CoinConfig("XMR", "RandomX", workers=2, command=["sleep", "30"])
+        supervisor = MiningSupervisor(configs={"XMR": config}, stop_timeout=5)
+        start = asyncio.ensure_future(supervisor.start_mining_coin("XMR"))
+        await asyncio.sleep(0)
+        start.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await start
+        assert not supervisor.is_running and not supervisor._stop_events
+        assert supervisor.counters.stats()["in_use"] == 0
+
+        start = asyncio.ensure_future(supervisor.start_mining_coin("XMR"))
+        await asyncio.sleep(0)
+        pool = supervisor._workers["XMR"]
+        assert await supervisor.stop_mining_coin("XMR")
+        assert await start is False
+        assert all(not worker.process.is_alive() for worker in pool)
+        assert not supervisor.is_running
+        assert supervisor.counters.stats()["in_use"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_start_leaves_the_coin_config_unchanged():
+    async def scenario():
+        config = CoinConfig("XMR", "RandomX", workers=1, command=["/nonexistent/miner"])
+        supervisor = MiningSupervisor(configs={"XMR": config})
+        with pytest.raises(FileNotFoundError):
+            await supervisor.start_mining_coin("XMR", workers=3, cpus=[])
+        assert (config.workers, config.cpus) == (1, None)
+        assert not supervisor.is_running
+        assert supervisor.counters.stats()["in_use"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_miner_output_parser_reads_xmrig_and_cpuminer_lines():
+    parser = MinerOutputParser()
+    assert parser.feed("\x1b[1;37mspeed\x1b[0m 10s/60s/15m \x1b[1;36m1520.3\x1b[0m 1498.7 n/a H/s max 1540.0 H/s")
+    assert parser.hash_rate == 1520.3
+    assert parser.feed("[2024-01-01 00:00:00.000]  cpu      accepted (12/1) diff 10000 (48 ms)")
+    assert (parser.accepted, parser.rejected) == (12, 1)
+    assert not parser.feed("[2024-01-01 00:00:00.000]  net      new job from pool.example:3333 diff 10000")
+
+    parser = MinerOutputParser()
+    assert parser.feed("[2024-01-01 00:00:00] accepted: 9/10 (90.00%), 4930.13 khash/s (yay!!!)")
+    assert (parser.accepted, parser.rejected, parser.hash_rate) == (9, 1, 4930130.0)
+
+
+FAKE_MINER = """
+import time
+print("speed 10s/60s/15m 1500.0 n/a n/a H/s max 1500.0 H/s", flush=True)
+print("accepted (3/1) diff 10000 (40 ms)", flush=True)
+time.sleep(30)
+"""
+
+
+def test_miner_counters_come_from_the_miner_output():
+    async def scenario():
+        config = CoinConfig("XMR", "RandomX", workers=1, command=[sys.executable, "-c", FAKE_MINER])
+        supervisor = MiningSupervisor(configs={"XMR": config})
+        assert await supervisor.start_mining_coin("XMR")
+        process = supervisor._workers["XMR"][0].process
+        try:
+            for _ in range(50):
+                operation = (await supervisor.get_mining_status())["operations"][0]
+                if operation["shares_accepted"]:
+                    break
+                await asyncio.sleep(0.1)
+            assert operation["hash_rate"] == 1500.0
+            assert (operation["shares_accepted"], operation["shares_rejected"]) == (3, 1)
+            worker = operation["workers"][0]
+            assert worker["pid"] == process.pid and not worker["stale"]
+        finally:
+            await supervisor.stop_mining_coin("XMR")
+
+    asyncio.run(scenario())
+
+
+PID_MINER = """
+import os, sys, time
+with open(sys.argv[1], "w") as f:
+    f.write(str(os.getpid()))
+time.sleep(30)
+"""
+
+
+def test_killing_a_miner_worker_takes_its_miner_with_it(tmp_path):
+    async def scenario():
+        pid_file = tmp_path / "miner.pid"
+        config = CoinConfig("XMR", "RandomX", workers=1, command=[sys.executable, "-c", PID_MINER, str(pid_file)])
+        supervisor = MiningSupervisor(configs={"XMR": config})
+        assert await supervisor.start_mining_coin("XMR")
+        worker = supervisor._workers["XMR"][0]
+        try:
+            for _ in range(50):
+                if pid_file.exists() and pid_file.read_text():
+                    break
+                await asyncio.sleep(0.1)
+            miner_pid = int(pid_file.read_text())
+            # The miner runs under the worker process, not the API process
+            assert miner_pid != worker.process.pid
+            assert not any(thread.name == "miner-output" for thread in threading.enumerate())
+            worker.kill()
+            worker.process.join(5)
+            for _ in range(50):
+                try:
+                    os.kill(miner_pid, 0)
+                except ProcessLookupError:
+                    break
+                await asyncio.sleep(0.1)
+            else:
+                pytest.fail("miner outlived its killed worker")
+        finally:
+            await supervisor.stop_mining_coin("XMR")
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+from src.services.opportunity_dedup import OpportunityDeduplicator, RotatingBloomFilter
+
+
+def _listing(id, source, token_id="7"):
+    return {"id": id, "source": source, "chain": "eth", "contract_address": "0xABC", "token_id": token_id}
+
+
+def test_repeated_polls_do_not_inflate_counters():
+    dedup = OpportunityDeduplicator(bloom=RotatingBloomFilter(capacity=1000))
+    batch = [_listing("a", "opensea"), _listing("b", "magiceden"), _listing("c", "opensea", token_id="8")]
+    assert [o["id"] for o in dedup.filter_new(batch)] == ["a", "c"]
+    first = dedup.stats()
+    assert first["checks"] == 3 and first["duplicates"] == 1
+
+    for _ in range(10):
+        assert [o["id"] for o in dedup.filter_new(batch)] == ["a", "c"]
+    stats = dedup.stats()
+    assert stats["checks"] == 3 and stats["duplicates"] == 1
+    assert stats["duplicate_rate"] == first["duplicate_rate"]
+    assert stats["rechecks"] == 30
+
+    # A genuinely new listing still counts
+    dedup.filter_new(batch + [_listing("d", "rarible")])
+    assert dedup.stats()["checks"] == 4 and dedup.stats()["duplicates"] == 2
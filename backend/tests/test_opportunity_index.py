@@ -0,0 +1,19 @@
+from src.services.opportunity_index import OpportunityIndex, opportunity_score
+
+NOW = 1_700_000_000.0
+
+
+def test_non_finite_scores_rank_as_zero_and_keep_the_index_consistent():
+    assert opportunity_score({"score": "nan"}) == 0.0
+    assert opportunity_score({"score": float("inf")}) == 0.0
+
+    index = OpportunityIndex(ttl=3600)
+    for i, score in enumerate((9.0, "nan", 5.0, float("-inf"))):
+        assert index.upsert({"id": str(i), "source": "a", "score": score}, now=NOW)
+    assert [opportunity["id"] for opportunity in index.top(4)] == ["0", "2", "1", "3"]
+    summary = index.summary()
+    assert summary["count"] == 4
+    assert summary["average_score"] == 3.5
+    assert sum(summary["score_histogram"].values()) == 4
+    assert index.remove("1") is not None
+    assert index.summary()["count"] == 3
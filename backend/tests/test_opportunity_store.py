@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from src.services.opportunity_index import OpportunityIndex
+from src.services.opportunity_store import OpportunityStore
+
+
+def _opportunity(id, score, source="opensea", **extra):
+    return {"id": id, "source": source, "score": score, **extra}
+
+
+def test_flush_and_load_best_live_opportunities(tmp_path):
+    async def scenario():
+        store = OpportunityStore(path=str(tmp_path / "nft.db"), flush_interval=60)
+        now = time.time()
+        store.save("a", _opportunity("a", 3.0), 3.0, now + 100)
+        store.save("b", _opportunity("b", 9.0), 9.0, now + 100)
+        store.save("c", _opportunity("c", 7.0), 7.0, now - 1)
+        store.save("d", _opportunity("d", 5.0), 5.0, now + 100)
+        store.delete("d")
+        assert await store.flush() == 4
+        assert [row[0]["id"] for row in store.load(10, now)] == ["b", "a"]
+        assert store.stats()["rows_pruned"] == 1
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_merged_back_under_newer_changes(tmp_path):
+    async def scenario():
+        store = OpportunityStore(path=str(tmp_path / "nft.db"), flush_interval=60)
+        now = time.time()
+        write_batch = store._write_batch
+        started, release = asyncio.Event(), asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def failing(batch):
+            loop.call_soon_threadsafe(started.set)
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+            raise sqlite3.OperationalError("disk I/O error")
+
+        store._write_batch = failing
+        store.save("a", _opportunity("a", 1.0), 1.0, now + 100)
+        store.save("b", _opportunity("b", 2.0), 2.0, now + 100)
+        flushing = asyncio.ensure_future(store.flush())
+        await started.wait()
+        # Changed while the failing batch is being written
+        store.save("a", _opportunity("a", 6.0), 6.0, now + 100)
+        release.set()
+        with pytest.raises(sqlite3.OperationalError):
+            await flushing
+
+        store._write_batch = write_batch
+        assert await store.flush() == 2
+        loaded = {row[0]["id"]: row[0]["score"] for row in store.load(10, now)}
+        assert loaded == {"a": 6.0, "b": 2.0}
+        assert store.stats()["failed_batches"] == 1
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_mirror_sync_keeps_warm_loaded_opportunities_until_reported(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "nft.db")
+        now = time.time()
+        store = OpportunityStore(path=path, flush_interval=60)
+        before = OpportunityIndex(store=store)
+        before.sync([_opportunity("a", 4.0), _opportunity("b", 8.0, expires_at=now + 50)], now)
+        await store.close()
+
+        # Restart: a fresh mirrored index warm-loads, then syncs against a service that only knows "c"
+        store = OpportunityStore(path=path, flush_interval=60)
+        index = OpportunityIndex(store=store)
+        assert index.warm_load(now) == 2
+        index.sync([_opportunity("c", 6.0)], now)
+        assert [o["id"] for o in index.top(10)] == ["b", "c", "a"]
+
+        # Once the service reports a warm entry it is mirrored normally
+        index.sync([_opportunity("a", 4.0)], now)
+        index.sync([], now)
+        assert [o["id"] for o in index.top(10)] == ["b"]
+        # ...and warm entries still leave when they expire
+        index.sync([], now + 60)
+        assert len(index) == 0
+        await store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+import random
+
+from src.services.portfolio_aggregates import PortfolioAggregates
+
+NETWORKS = ["ethereum", "polygon", "bitcoin"]
+SYMBOLS = ["ETH", "MATIC", "BTC", "USDC"]
+
+
+def make_balance(rng, symbol=None, network=None):
+    balance = rng.choice([0, 0.5, 1.25, 10, 1000])
+    price = rng.choice([0, 1, 2500.5])
+    return {
+        "network": network or rng.choice(NETWORKS),
+        "token_symbol": symbol or rng.choice(SYMBOLS),
+        "token_address": None,
+        "balance": balance,
+        "price_usd": price,
+        "balance_usd": balance * price,
+    }
+
+
+def test_incremental_rollups_match_recompute():
+    rng = random.Random(7)
+    aggregates = PortfolioAggregates()
+    keys = []
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.5 or not keys:
+            keys.append(aggregates.upsert(make_balance(rng), key=("k", step)))
+        elif action < 0.7:
+            aggregates.remove(keys.pop(rng.randrange(len(keys))))
+        elif action < 0.85:
+            aggregates.update_price(rng.choice(SYMBOLS), rng.choice([0, 3, 1999.99]))
+        else:
+            aggregates.sync([make_balance(rng) for _ in range(rng.randrange(0, 12))])
+            keys = list(aggregates._positions)
+        assert aggregates.verify() == []
+
+
+def test_verify_reports_drift():
+    aggregates = PortfolioAggregates()
+    aggregates.upsert({"network": "ethereum", "token_symbol": "ETH", "balance": 1, "balance_usd": 100.0})
+    aggregates.total_usd_value += 5
+    assert any(m.startswith("total_usd_value") for m in aggregates.verify())
+
+
+def test_sync_picks_up_in_place_mutation_of_same_list():
+    aggregates = PortfolioAggregates()
+    balances = [{"network": "ethereum", "token_symbol": "ETH", "balance": 1, "balance_usd": 100.0}]
+    assert aggregates.sync(balances)
+    assert not aggregates.sync(balances)
+
+    balances[0]["balance_usd"] = 250.0
+    balances.append({"network": "polygon", "token_symbol": "MATIC", "balance": 2, "balance_usd": 2.0})
+    assert aggregates.sync(balances)
+    assert aggregates.total_usd_value == 252.0
+    assert aggregates.network_count == 2
+    assert aggregates.verify() == []
+
+
+def test_sync_skips_an_already_synced_snapshot_version():
+    aggregates = PortfolioAggregates()
+    balances = [{"network": "ethereum", "token_symbol": "ETH", "balance": 1, "balance_usd": 100.0}]
+    assert aggregates.sync(balances, version=1)
+    balances[0]["balance_usd"] = 250.0
+    # Same version: the list isn't even looked at
+    assert not aggregates.sync(balances, version=1)
+    assert aggregates.total_usd_value == 100.0
+    assert aggregates.sync(balances, version=2)
+    assert aggregates.total_usd_value == 250.0
+    assert not aggregates.sync(balances, version=3)
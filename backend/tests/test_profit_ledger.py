@@ -0,0 +1,116 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from src.services.profit_ledger import CONTRACT, HOUR, MINING, EarningsTracker, ProfitLedger, record_outcome
+
+
+def test_failed_flush_keeps_events_for_the_next_attempt(tmp_path):
+    async def scenario():
+        ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), batch_size=100, flush_interval=60)
+        write_batch = ledger._write_batch
+
+        def failing(batch):
+            raise sqlite3.OperationalError("database is locked")
+
+        ledger._write_batch = failing
+        ledger.record(MINING, 1.0, amount_usd=10.0, ts=1000.0)
+        ledger.record(MINING, 2.0, amount_usd=20.0, ts=1001.0)
+        with pytest.raises(sqlite3.OperationalError):
+            await ledger.flush()
+        ledger.record(MINING, 3.0, amount_usd=30.0, ts=1002.0)
+        assert ledger.stats()["buffered"] == 3
+        assert [event[0] for event in ledger._buffer] == [1000.0, 1001.0, 1002.0]
+
+        ledger._write_batch = write_batch
+        assert await ledger.flush() == 3
+        report = await ledger.report(0, 2000)
+        assert report["breakdown"][MINING] == 60.0
+        assert report["event_counts"][MINING] == 3
+        assert ledger.stats()["failed_batches"] == 1
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_earnings_tracker_records_increases_after_the_baseline(tmp_path):
+    async def scenario():
+        ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), batch_size=100, flush_interval=60)
+        tracker = EarningsTracker(ledger, MINING)
+        assert tracker.observe("XMR", 50.0) == 0.0
+        assert tracker.observe("XMR", 52.5, currency="XMR", price_usd=100.0) == 2.5
+        assert tracker.observe("XMR", 52.5) == 0.0
+        # A restarted miner starts counting again from zero
+        assert tracker.observe("XMR", 1.0) == 0.0
+        # Without a price the native amount is kept but adds nothing in USD
+        assert tracker.observe("XMR", 2.0, currency="XMR") == 1.0
+        report = await ledger.report(0, time.time() + HOUR)
+        assert report["breakdown"][MINING] == 250.0
+        assert report["event_counts"][MINING] == 2
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_record_outcome_only_records_reported_profit(tmp_path):
+    async def scenario():
+        ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), batch_size=100, flush_interval=60)
+        assert not record_outcome(ledger, CONTRACT, {"tx_hash": "0xa"})
+        assert not record_outcome(ledger, CONTRACT, True)
+        assert not record_outcome(ledger, CONTRACT, {"profit_usd": "n/a"})
+        assert record_outcome(ledger, CONTRACT, {"profit_usd": 12.0, "profit": 0.004, "currency": "ETH"})
+        report = await ledger.report(0, time.time() + HOUR)
+        assert report["breakdown"][CONTRACT] == 12.0
+        assert report["event_counts"][CONTRACT] == 1
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_earnings_tracker_polls_its_reader_without_other_pollers(tmp_path):
+    async def scenario():
+        ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), batch_size=100, flush_interval=60)
+        tracker = EarningsTracker(ledger, MINING, interval=0.01)
+        totals = iter([1.0, 1.5, 2.0])
+
+        async def reader():
+            return [{"key": "XMR", "total": next(totals, 2.0), "currency": "XMR", "price_usd": 10.0}]
+
+        tracker.attach(reader)
+        await asyncio.sleep(0.2)
+        tracker.detach()
+        report = await ledger.report(0, time.time() + HOUR)
+        assert report["breakdown"][MINING] == 10.0
+        assert report["event_counts"][MINING] == 2
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_non_finite_amounts_are_refused_and_rejected_batches_are_dropped(tmp_path):
+    async def scenario():
+        ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), batch_size=100, flush_interval=60)
+        with pytest.raises(ValueError):
+            ledger.record(MINING, float("nan"))
+        with pytest.raises(ValueError):
+            ledger.record(MINING, 1.0, amount_usd=float("inf"))
+        assert not record_outcome(ledger, CONTRACT, {"profit_usd": "nan"})
+        tracker = EarningsTracker(ledger, MINING)
+        tracker.observe("XMR", 1.0)
+        assert tracker.observe("XMR", float("nan")) == 0.0
+        assert tracker.observe("XMR", 2.0, price_usd=float("nan")) == 1.0
+        assert ledger.stats()["buffered"] == 1
+
+        # A batch the schema refuses is dropped and counted instead of blocking every later flush
+        ledger._buffer.append((1000.0, MINING, None, None, 0.0, None))
+        assert await ledger.flush() == 0
+        ledger.record(MINING, 1.0, amount_usd=5.0)
+        report = await ledger.report(0, time.time() + HOUR)
+        assert report["breakdown"][MINING] == 5.0
+        assert ledger.stats()["buffered"] == 0
+        assert ledger.stats()["rejected_events"] == 2
+        await ledger.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+import asyncio
+
+from src.services.snapshot_cache import SnapshotCache
+
+
+def test_concurrent_gets_share_one_fetch():
+    async def scenario():
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(True)
+            await release.wait()
+            return {"total": len(calls)}
+
+        cache = SnapshotCache(fetch, ttl=60, stale_while_revalidate=0)
+        waiters = [asyncio.ensure_future(cache.get()) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*waiters) == [{"total": 1}] * 5
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["misses"] == 1 and stats["coalesced"] == 4
+        assert await cache.get() == {"total": 1} and cache.hits == 1
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_during_a_fetch_keeps_its_value_out_of_the_cache():
+    async def scenario():
+        values = iter(["before", "after"])
+        release = asyncio.Event()
+
+        async def fetch():
+            value = next(values)
+            if value == "before":
+                await release.wait()
+            return value
+
+        cache = SnapshotCache(fetch, ttl=60, stale_while_revalidate=0)
+        first = asyncio.ensure_future(cache.get())
+        await asyncio.sleep(0)
+        cache.invalidate()
+        # Does not coalesce onto the fetch that began before the change
+        assert await cache.get() == "after"
+        release.set()
+        # The old fetch still answers its own caller but never lands in the cache
+        assert await first == "before"
+        assert await cache.get() == "after"
+        assert cache.discarded == 1 and cache.misses == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_serves_the_stale_value_and_records_the_error():
+    async def scenario():
+        fail = False
+
+        async def fetch():
+            if fail:
+                raise ConnectionError("node unreachable")
+            return "balances"
+
+        cache = SnapshotCache(fetch, ttl=0, stale_while_revalidate=60)
+        assert await cache.get() == "balances"
+        fail = True
+        # Stale: served at once while a background refresh runs, and fails
+        assert await cache.get() == "balances"
+        await asyncio.wait([cache._inflight])
+        stats = cache.stats()
+        assert stats["last_error"] == "node unreachable" and stats["errors"] == 1
+        assert stats["last_error_age_seconds"] is not None and stats["version"] == 1
+
+        fail = False
+        # Still the stale value; the refresh it starts succeeds and clears the error
+        assert await cache.get() == "balances"
+        await cache._inflight
+        assert cache.last_error is None and cache.version == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services.source_poller import SourceConfig, SourcePoller, load_sources
+
+
+class FakeSource:
+    """Paged JSON listing that honours If-None-Match, with switchable contents and failures"""
+
+    def __init__(self):
+        self.items = {1: [{"id": "a"}, {"id": "b"}], 2: [{"id": "c"}]}
+        self.status = 200
+        self.requests = []
+
+    async def handle(self, request):
+        page = int(request.query.get("page", 1))
+        self.requests.append((page, request.headers.get("If-None-Match")))
+        if self.status != 200:
+            return web.Response(status=self.status)
+        body = json.dumps({"items": self.items.get(page, [])})
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()[:16]
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+
+def test_conditional_polls_rate_limit_adaptive_interval_and_removals():
+    async def scenario():
+        source = FakeSource()
+        app = web.Application()
+        app.router.add_get("/items", source.handle)
+        server = TestServer(app)
+        await server.start_server()
+
+        seen, removed = [], []
+
+        async def on_items(name, items):
+            seen.append([item["id"] for item in items])
+
+        async def on_removed(name, keys):
+            removed.append(keys)
+
+        config = SourceConfig(name="market", url=str(server.make_url("/items")), pages=2,
+                              interval=8.0, min_interval=2.0, max_interval=20.0, rate=20.0, burst=1)
+        poller = SourcePoller([config], on_items=on_items, on_removed=on_removed)
+        try:
+            first = await poller.poll_source("market")
+            assert first["changed_pages"] == 2 and seen == [["a", "b", "c"]]
+            stats = poller.stats()["sources"]["market"]
+            assert stats["interval_seconds"] == 4.0  # changed: halved
+            # burst=1 at 20/s: the second page had to wait for a token
+            assert stats["rate_limit_wait_seconds"] > 0
+
+            second = await poller.poll_source("market")
+            assert second["changed_pages"] == 0 and len(seen) == 1
+            assert [etag is not None for _, etag in source.requests[-2:]] == [True, True]
+            stats = poller.stats()["sources"]["market"]
+            assert stats["not_modified"] == 2
+            assert stats["interval_seconds"] == 5.0  # unchanged: grows 25%
+
+            source.items[1] = [{"id": "a"}]
+            third = await poller.poll_source("market")
+            assert third["removed"] == 1 and removed == [["b"]]
+            assert seen[-1] == ["a"]
+
+            source.status = 500
+            failed = await poller.poll_source("market")
+            assert failed["failed"]
+            assert poller.stats()["sources"]["market"]["interval_seconds"] == 5.0  # 2.5 doubled on error
+        finally:
+            await poller.stop()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_items_are_not_removed_after_an_incomplete_poll():
+    async def scenario():
+        source = FakeSource()
+        calls = {"n": 0}
+
+        async def handle(request):
+            calls["n"] += 1
+            # Page 2 fails on the second poll, after page 1 lost an item
+            if calls["n"] == 4:
+                return web.Response(status=503)
+            return await source.handle(request)
+
+        app = web.Application()
+        app.router.add_get("/items", handle)
+        server = TestServer(app)
+        await server.start_server()
+        removed = []
+
+        async def on_removed(name, keys):
+            removed.append(keys)
+
+        config = SourceConfig(name="market", url=str(server.make_url("/items")), pages=2, rate=100.0)
+        poller = SourcePoller([config], on_removed=on_removed)
+        try:
+            await poller.poll_source("market")
+            source.items[1] = [{"id": "a"}]
+            result = await poller.poll_source("market")
+            assert result["failed"] and removed == []
+        finally:
+            await poller.stop()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_load_sources_reads_configs_and_ignores_a_missing_file(tmp_path):
+    path = tmp_path / "sources.json"
+    assert load_sources(str(path)) == []
+    path.write_text(json.dumps({"market": {"url": "http://example.test/items", "pages": 2}}))
+    [source] = load_sources(str(path))
+    assert (source.name, source.url, source.pages) == ("market", "http://example.test/items", 2)
+
+
+@pytest.mark.parametrize("contents", ["{not json", "[]", '{"market": {"url": "x", "colour": "red"}}',
+                                      '{"market": {"pages": 2}}'])
+def test_invalid_sources_file_disables_polling(tmp_path, contents):
+    path = tmp_path / "sources.json"
+    path.write_text(contents)
+    assert load_sources(str(path)) == []
@@ -0,0 +1,94 @@
+import asyncio
+
+from src.services.status_aggregator import EngineStatusCollector
+
+
+class Miner:
+    async def get_mining_status(self):
+        raise RuntimeError("miner offline")
+
+
+class Hunter:
+    async def get_top_opportunities(self, limit):
+        await asyncio.sleep(5)
+        return []
+
+
+class Wallets:
+    async def get_wallet_status(self):
+        return {"is_connected": True}
+
+
+class Contracts:
+    calls = 0
+
+    async def get_contract_status(self):
+        self.calls += 1
+        return {"total_contracts": 3}
+
+
+class Monitor:
+    async def get_status(self):
+        return {"service_status": {"system_healthy": True}}
+
+
+class Engine:
+    is_running = True
+    operation_status = {"nft_hunting": True, "crypto_mining": True, "wallet_monitoring": True,
+                        "smart_contracts": True, "system_monitoring": True}
+
+    def __init__(self):
+        self.nft_hunter = Hunter()
+        self.crypto_miner = Miner()
+        self.wallet_manager = Wallets()
+        self.smart_contract_manager = Contracts()
+        self.system_monitor = Monitor()
+
+    async def get_status(self):
+        raise AssertionError("get_status() queries every subsystem a second time")
+
+
+def test_each_subsystem_is_collected_once_without_the_engine_get_status():
+    async def scenario():
+        engine = Engine()
+        collector = EngineStatusCollector(engine, timeouts={"nft_hunter": 0.1})
+        status = await collector.get_status()
+        assert engine.smart_contract_manager.calls == 1
+        assert "engine" not in status["collection"]["errors"]
+        # Engine-level fields come from the engine's attributes
+        assert status["engine_running"] is True
+        assert status["operation_status"] is Engine.operation_status
+        assert status["summary"]["contracts_managed"] == 3
+        assert status["summary"]["wallet_connected"] is True
+        assert status["summary"]["total_earnings"] == 0
+        assert set(status["services"]) == set(EngineStatusCollector.SUBSYSTEMS)
+
+    asyncio.run(scenario())
+
+
+def test_one_slow_subsystem_is_stale_and_the_rest_are_fresh():
+    async def scenario():
+        collector = EngineStatusCollector(Engine(), timeouts={"nft_hunter": 0.1})
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        status = await collector.get_status()
+        assert loop.time() - started < 1
+        assert status["services"]["nft_hunter"]["stale"] is True
+        assert status["services"]["nft_hunter"]["top_opportunities"] == []
+        assert status["services"]["smart_contracts"]["stale"] is False
+        assert "nft_hunter" in status["collection"]["stale"]
+
+    asyncio.run(scenario())
+
+
+def test_one_failing_subsystem_reports_its_error_without_failing_the_status():
+    async def scenario():
+        collector = EngineStatusCollector(Engine(), timeouts={"nft_hunter": 0.1})
+        status = await collector.get_status()
+        assert status["services"]["crypto_miner"]["stale"] is True
+        assert status["collection"]["errors"]["crypto_miner"] == "miner offline"
+        assert status["summary"]["mining_active"] is False
+        assert status["services"]["system_monitor"]["stale"] is False
+        assert status["summary"]["system_healthy"] is True
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from src.services.status_stream import StatusBroadcaster, merge_patch
+
+
+def _event(encoded):
+    lines = dict(line.split(": ", 1) for line in encoded.strip().splitlines())
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_merge_patch_nulls_removed_keys_and_recurses_into_changed_dicts():
+    old = {"miner": {"hashrate": 10, "coins": ["BTC"]}, "gone": 1}
+    new = {"miner": {"hashrate": 12, "coins": ["BTC"]}, "added": True}
+    assert merge_patch(old, new) == {"miner": {"hashrate": 12}, "gone": None, "added": True}
+    assert merge_patch(old, old) is None
+
+
+def test_connect_gets_the_current_snapshot_then_deltas_without_volatile_fields():
+    async def scenario():
+        state = {"hashrate": 10, "last_update": 1}
+
+        async def miner():
+            return dict(state)
+
+        broadcaster = StatusBroadcaster(interval=3600)
+        broadcaster.add_source("miner", miner)
+        await broadcaster.poll()
+        stream = broadcaster.subscribe()
+        event, data = _event(await stream.__anext__())
+        assert event == "snapshot" and data == {"seq": 1, "state": {"miner": {"hashrate": 10}}}
+
+        state["last_update"] = 2
+        assert await broadcaster.poll() is None
+        state["hashrate"] = 12
+        await broadcaster.poll()
+        event, data = _event(await stream.__anext__())
+        assert event == "delta" and data == {"seq": 2, "changes": {"miner": {"hashrate": 12}}}
+
+        # Replacing a source drops its state from the snapshot the next client gets
+        broadcaster.add_source("miner", miner)
+        late = broadcaster.subscribe()
+        event, data = _event(await late.__anext__())
+        assert event == "snapshot" and data["state"] == {}
+        await late.aclose()
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_its_backlog_and_resyncs_from_a_snapshot():
+    async def scenario():
+        state = {"count": 0}
+
+        async def counter():
+            return dict(state)
+
+        broadcaster = StatusBroadcaster(interval=3600, max_pending=2)
+        broadcaster.add_source("counter", counter)
+        await broadcaster.poll()
+        stream = broadcaster.subscribe()
+        assert _event(await stream.__anext__())[0] == "snapshot"
+
+        # Three deltas while the client reads nothing: the third overflows its queue
+        for count in range(1, 4):
+            state["count"] = count
+            await broadcaster.poll()
+        assert broadcaster.stats()["dropped_deltas"] == 2
+        event, data = _event(await stream.__anext__())
+        assert event == "snapshot" and data == {"seq": 4, "state": {"counter": {"count": 3}}}
+        await stream.aclose()
+        assert broadcaster.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+from src.services.transaction_store import TransactionStore, transaction_key
+
+HOUR = 3600.0
+
+
+def test_undated_transactions_keep_first_seen_time():
+    store = TransactionStore()
+    undated = {"hash": "0xa", "value": 1, "transaction_type": "send"}
+    store.ingest([undated], now=1000.0)
+    # A later snapshot (a new list with the same content plus one more) must not re-date it
+    store.ingest([{"hash": "0xb", "timestamp": 5000.0}, dict(undated)], now=5000.0)
+    assert len(store) == 2
+    assert [tx["hash"] for tx in store.since(HOUR, now=1000.0 + 2 * HOUR)] == ["0xb"]
+    assert [tx["hash"] for tx in store.since(HOUR, now=5000.0)] == ["0xb"]
+
+
+def test_hashless_transactions_are_deduplicated_by_content():
+    store = TransactionStore()
+    tx = {"from": "a", "to": "b", "value": 2, "timestamp": 100.0, "status": "pending"}
+    assert store.ingest([tx], now=200.0) == 1
+    # Same transaction, new list and confirmation status: still one entry, updated in place
+    assert store.ingest([dict(tx, status="confirmed")], now=300.0) == 1
+    assert len(store) == 1
+    assert store.latest(5)[0]["status"] == "confirmed"
+    assert transaction_key(tx) == transaction_key(dict(tx, status="confirmed"))
+
+
+def test_retention_keeps_everything_in_the_current_snapshot():
+    store = TransactionStore(retention_seconds=HOUR)
+    now = 100 * HOUR
+    snapshot = [{"hash": f"0x{i}", "timestamp": now - i * HOUR} for i in range(5)]
+    store.ingest(snapshot, now=now)
+    assert [tx["hash"] for tx in store.latest(50)] == [tx["hash"] for tx in snapshot]
+
+    # Once a transaction leaves the snapshot, retention applies to it again
+    store.ingest(snapshot[:2], now=now)
+    assert [tx["hash"] for tx in store.latest(50)] == ["0x0", "0x1"]
+
+
+def test_reingesting_mutated_list_is_not_skipped():
+    store = TransactionStore()
+    transactions = [{"hash": "0xa", "timestamp": 10.0, "value": 1}]
+    store.ingest(transactions, now=20.0)
+    transactions[0]["value"] = 5
+    assert store.ingest(transactions, now=20.0) == 1
+    assert store.latest(1)[0]["value"] == 5
+
+
+def test_iter_pages_walks_everything_or_stops_at_limit():
+    store = TransactionStore()
+    store.ingest([{"hash": f"0x{i}", "timestamp": 1000.0 - i} for i in range(12)], now=1000.0)
+
+    pages = list(store.iter_pages(page_size=5))
+    assert [len(items) for items, _ in pages] == [5, 5, 2]
+    assert pages[-1][1] is None
+
+    pages = list(store.iter_pages(page_size=5, limit=7))
+    assert [len(items) for items, _ in pages] == [5, 2]
+    rest = [tx["hash"] for items, _ in store.iter_pages(pages[-1][1], page_size=5) for tx in items]
+    assert rest == [f"0x{i}" for i in range(7, 12)]
+
+
+def test_ingest_skips_an_already_ingested_snapshot_version():
+    store = TransactionStore()
+    transactions = [{"hash": "0xa", "timestamp": 10.0, "value": 1}]
+    assert store.ingest(transactions, now=20.0, version=1) == 1
+    transactions[0]["value"] = 5
+    assert store.ingest(transactions, now=20.0, version=1) == 0
+    assert store.latest(1)[0]["value"] == 1
+    assert store.ingest(transactions, now=20.0, version=2) == 1
+    assert store.latest(1)[0]["value"] == 5
+
+
+def test_page_since_stops_at_the_window_edge():
+    store = TransactionStore()
+    store.ingest([{"hash": f"0x{i}", "timestamp": 1000.0 - i} for i in range(12)], now=1000.0)
+
+    # 0x0..0x7 are inside the window
+    items, cursor = store.page(limit=5, since=993.0)
+    assert [tx["hash"] for tx in items] == [f"0x{i}" for i in range(5)]
+    items, cursor = store.page(cursor, limit=5, since=993.0)
+    assert [tx["hash"] for tx in items] == [f"0x{i}" for i in range(5, 8)]
+    assert cursor is None
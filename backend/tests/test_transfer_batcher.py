@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services import transfer_batcher as batcher_module
+from src.services.profit_ledger import TRANSFER, ProfitLedger
+from src.services.transfer_batcher import TransferBatcher, TransferNotSent
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = ProfitLedger(path=str(tmp_path / "ledger.db"), flush_interval=60)
+    monkeypatch.setattr(batcher_module, "profit_ledger", ledger)
+    return ledger
+
+
+def test_pre_broadcast_failures_back_off_and_stop_after_max_attempts(ledger):
+    async def scenario():
+        calls = []
+
+        async def sender(**kwargs):
+            calls.append(kwargs)
+            raise TransferNotSent("nonce too low")
+
+        batcher = TransferBatcher(sender=sender, max_attempts=3, retry_base=0.01, retry_max=1)
+        result = await batcher.enqueue(1.0, token_symbol="ETH")
+        assert result["status"] == "failed" and result["retrying"]
+        await asyncio.sleep(0.2)
+        assert len(calls) == 3
+        pending = batcher.stats()["pending"]
+        assert pending[0]["attempts"] == 3 and pending[0]["amount"] == 1.0
+        # Past the cap, new amounts accumulate without another automatic send
+        await batcher.enqueue(1.0, token_symbol="ETH")
+        await asyncio.sleep(0.05)
+        assert len(calls) == 3
+        assert batcher.stats()["pending"][0]["amount"] == 2.0
+
+    asyncio.run(scenario())
+
+
+def test_possibly_broadcast_failure_is_not_resent(ledger):
+    async def scenario():
+        calls = []
+
+        async def sender(**kwargs):
+            calls.append(kwargs)
+            raise TimeoutError("no receipt")
+
+        batcher = TransferBatcher(sender=sender, retry_base=0.01)
+        result = await batcher.enqueue(1.0, token_symbol="ETH")
+        assert result["status"] == "unconfirmed"
+        await asyncio.sleep(0.05)
+        assert len(calls) == 1
+        stats = batcher.stats()
+        assert stats["pending"] == [] and stats["unconfirmed"][0]["amount"] == 1.0
+
+    asyncio.run(scenario())
+
+
+def test_unlisted_token_flushes_on_usd_value_and_records_it(ledger):
+    async def scenario():
+        async def sender(**kwargs):
+            return "0xabc"
+
+        async def price(network, token_symbol):
+            return 2.0
+
+        batcher = TransferBatcher(sender=sender, min_amounts={}, min_usd=100)
+        batcher.price_lookup = price
+        assert (await batcher.enqueue(30, token_symbol="USDC"))["status"] == "queued"
+        result = await batcher.enqueue(25, token_symbol="USDC")
+        assert result["status"] == "transferred" and result["amount"] == 55
+        report = await ledger.report(0, 2 ** 32)
+        assert report["transferred_to_exodus"] == 110.0
+        assert report["event_counts"][TRANSFER] == 1
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_unconfirmed_batches_are_capped_and_can_be_resolved(ledger):
+    async def scenario():
+        async def sender(**kwargs):
+            raise TimeoutError("no receipt")
+
+        batcher = TransferBatcher(sender=sender, max_unconfirmed=2)
+        ids = [(await batcher.enqueue(1.0 + i, token_symbol="ETH"))["unconfirmed_id"] for i in range(3)]
+        stats = batcher.stats()
+        assert [entry["id"] for entry in stats["unconfirmed"]] == ids[1:]
+        assert stats["unconfirmed_dropped"] == 1
+
+        confirmed = await batcher.resolve_unconfirmed(ids[1], sent=True)
+        assert confirmed["status"] == "confirmed" and confirmed["amount"] == 2.0
+        report = await ledger.report(0, time.time() + 60)
+        assert report["event_counts"][TRANSFER] == 1
+
+        requeued = await batcher.resolve_unconfirmed(ids[2], sent=False)
+        assert requeued["status"] == "requeued" and requeued["pending_amount"] == 3.0
+        assert batcher.stats()["unconfirmed"] == []
+        with pytest.raises(KeyError):
+            await batcher.resolve_unconfirmed(ids[2], sent=True)
+        await ledger.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_flush_keeps_the_batch(ledger):
+    async def scenario():
+        sending = asyncio.Event()
+
+        async def sender(**kwargs):
+            sending.set()
+            await asyncio.sleep(10)
+
+        batcher = TransferBatcher(sender=sender, min_amounts={})
+        await batcher.enqueue(1.0, token_symbol="ETH")
+        await batcher.enqueue(2.0, token_symbol="BTC", network="bitcoin")
+        async with batcher._pipelines.setdefault("bitcoin", asyncio.Lock()):
+            # ETH is mid-send when cancelled; BTC is still waiting for its network's pipeline
+            flush = asyncio.ensure_future(batcher.flush())
+            await sending.wait()
+            flush.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await flush
+        stats = batcher.stats()
+        assert [entry["amount"] for entry in stats["unconfirmed"]] == [1.0]
+        assert [(batch["token"], batch["amount"]) for batch in stats["pending"]] == [("BTC", 2.0)]
+
+    asyncio.run(scenario())
+
+
+def test_non_finite_amounts_are_refused(ledger):
+    async def scenario():
+        batcher = TransferBatcher()
+        for amount in (float("nan"), float("inf")):
+            with pytest.raises(ValueError):
+                await batcher.enqueue(amount)
+            with pytest.raises(ValueError):
+                await batcher.send(amount)
+        assert batcher.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())